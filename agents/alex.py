@@ -1,3 +1,8 @@
+from finops.log import get_logger
+logger = get_logger("alex")
 def run(input_data):
-    print("[Alex] Handling user input:", input_data)
-    return {"project_id": "P0001"}  # Simulated user prompt
\ No newline at end of file
+    logger.debug("Handling user input", extra={"input": input_data})
+    return {"project_id": input_data.get("project_id", "P0001")}  # Simulated user prompt
+
+async def arun(input_data):
+    return run(input_data)
@@ -1,2 +1,5 @@
 def run(input_data):
-    return {"summary": "PO validated, budget and compliance passed, variance analyzed."}
\ No newline at end of file
+    return {"summary": "PO validated, budget and compliance passed, variance analyzed."}
+
+async def arun(input_data):
+    return run(input_data)
@@ -1,3 +1,17 @@
+from finops.compliance import get_engine
+from finops.log import get_logger
+from finops.records import PurchaseOrder
+from finops.registry import registry
+logger = get_logger("jordan")
+def _passes_rules(po):
+    return get_engine().check(po.project_id, po.cost_center, po.supplier, po.po_amount)
+
 def run(po_data):
-    print("[Jordan] Compliance check...")
-    return {"compliance_ok": po_data["supplier"] != "VendorY"}
\ No newline at end of file
+    po = PurchaseOrder.from_state(po_data)
+    logger.debug("Compliance check", extra={"project_id": po.project_id})
+    return {"compliance_ok": _passes_rules(po) and not registry.is_sanctioned(po.supplier)}
+
+async def arun(po_data):
+    po = PurchaseOrder.from_state(po_data)
+    logger.debug("Compliance check", extra={"project_id": po.project_id})
+    return {"compliance_ok": _passes_rules(po) and not await registry.ais_sanctioned(po.supplier)}
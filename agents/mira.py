@@ -1,3 +1,17 @@
+from finops.aio import offload
+from finops.budget import get_budget_ledger
+from finops.log import get_logger
+from finops.records import PurchaseOrder
+logger = get_logger("mira")
 def run(po_data):
-    print("[Mira] Budget check...")
-    return {"budget_ok": po_data["po_amount"] <= po_data["budget_remaining"]}
\ No newline at end of file
+    po = PurchaseOrder.from_state(po_data)
+    logger.debug("Budget check", extra={"project_id": po.project_id})
+    # One reservation per PO; re-submitting the same PO reuses it
+    ref = po_data.get("po_ref") or po.project_id
+    budget_ok = get_budget_ledger().reserve(po.project_id, ref, po.po_amount, po.budget_remaining)
+    if budget_ok:
+        return {"budget_ok": True, "reservation_id": ref}
+    return {"budget_ok": False}
+
+# Reserving and releasing budget may wait on SQLite locks (SharedBudgetLedger)
+arun = offload(run)
@@ -1,11 +1,6 @@
-import pandas as pd
+from finops.aio import offload
+from finops.sources import get_source
 def run(input_data):
-    df = pd.read_csv("data.csv")
-    record = df[df["Project_ID"] == input_data["project_id"]].iloc[0]
-    return {
-        "project_id": record["Project_ID"],
-        "po_amount": record["PO_Requested"],
-        "cost_center": record["Cost_Center"],
-        "supplier": record["Supplier"],
-        "budget_remaining": record["Budget_Remaining"]
-    }
\ No newline at end of file
+    return get_source().record(input_data["project_id"]).as_state()
+
+arun = offload(run)
@@ -1,6 +1,13 @@
+from finops.aio import offload
+from finops.budget import get_budget_ledger
 def run(mira_output, jordan_output):
     if not mira_output.get("budget_ok"):
         return {"approved": False, "reason": "Budget exceeded"}
     if not jordan_output.get("compliance_ok"):
-        return {"approved": False, "reason": "Compliance issue"}
-    return {"approved": True}
\ No newline at end of file
+        # Free the budget Mira reserved for a PO that will not go ahead
+        get_budget_ledger().release(mira_output["reservation_id"])
+        return {"approved": False, "reason": "Compliance issue", "reservation_id": None}
+    return {"approved": True}
+
+# Reserving and releasing budget may wait on SQLite locks (SharedBudgetLedger)
+arun = offload(run)
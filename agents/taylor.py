@@ -1,5 +1,8 @@
-import pandas as pd
+from finops.aio import offload
+from finops.sources import get_source
+from finops.variance import get_analytics
 def run(input_data):
-    df = pd.read_csv("data.csv")
-    record = df[df["Project_ID"] == input_data["project_id"]].iloc[0]
-    return {"variance": record["Variance"]}
\ No newline at end of file
+    record = get_source().record(input_data["project_id"])
+    return {"variance": record.variance, **get_analytics().describe(record)}
+
+arun = offload(run)
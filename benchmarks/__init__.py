@@ -0,0 +1,5 @@
+"""Benchmarks for the approval graph, its agents and the data layer.
+
+    python -m benchmarks --rows 2000 100000 --http --concurrency 1 16 --output bench.json
+    python -m benchmarks.compare baseline.json bench.json
+"""
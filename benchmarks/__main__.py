@@ -0,0 +1,247 @@
+"""Run the benchmark suite and write the results as JSON.
+
+For each synthetic ledger size this measures:
+
+- data layer: columnar cache compile, cold memory-mapped load, store load
+- per-node latency of every agents/*.run
+- end-to-end latency of the graph from main.py, uncached and cached
+- vectorized batch evaluation of one cost center
+- with --http: throughput and p50/p95/p99 latency of
+  /finops-workflow/invoke on a fresh local uvicorn instance per concurrency
+  level, first for distinct projects (every request a decision-cache miss)
+  and then for the same projects again (every request a hit)
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from finops.synthetic import project_ids, write_ledger
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def summarize(samples_ms):
+    ordered = sorted(samples_ms)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        "n": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "min": ordered[0],
+        "p50": pct(50),
+        "p95": pct(95),
+        "p99": pct(99),
+        "max": ordered[-1],
+    }
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def bench_in_process(ledger_path, rows, samples, workdir):
+    """Data-layer, per-node and end-to-end measurements in this process."""
+    os.environ["FINOPS_DATA_PATH"] = str(ledger_path)
+    os.environ["FINOPS_BUDGET_DB"] = str(workdir / f"budget_{rows}.sqlite3")
+    # Keep synthetic decisions out of the repository's audit log and checkpoints
+    os.environ["FINOPS_AUDIT_DIR"] = str(workdir / f"audit_{rows}")
+    os.environ["FINOPS_CHECKPOINT_DB"] = str(workdir / f"checkpoints_{rows}.sqlite3")
+
+    from agents import alex, alex_summary, jordan, mira, sam, sam_decision, taylor
+    from finops.batch import run_batch
+    from finops.columnar import compile_ledger, load_ledger
+    from finops.store import get_store
+    from main import graph
+
+    results = []
+
+    def record(name, samples_ms, **extra):
+        results.append({"name": name, "rows": rows, "latency_ms": summarize(samples_ms), **extra})
+
+    _, ms = timed(compile_ledger, ledger_path)
+    record("data.columnar_compile", [ms])
+    _, ms = timed(load_ledger, ledger_path)
+    record("data.columnar_load", [ms])
+    _, ms = timed(get_store().frame)
+    record("data.store_load", [ms])
+
+    ids = project_ids(rows, samples)
+    nodes = {name: [] for name in ("alex", "sam", "mira", "jordan", "sam_decision", "taylor", "alex_summary")}
+    for project_id in ids:
+        request = {"project_id": project_id}
+        state, ms = timed(alex.run, request)
+        nodes["alex"].append(ms)
+        po_data, ms = timed(sam.run, request)
+        nodes["sam"].append(ms)
+        mira_output, ms = timed(mira.run, po_data)
+        nodes["mira"].append(ms)
+        jordan_output, ms = timed(jordan.run, po_data)
+        nodes["jordan"].append(ms)
+        _, ms = timed(sam_decision.run, mira_output, jordan_output)
+        nodes["sam_decision"].append(ms)
+        _, ms = timed(taylor.run, request)
+        nodes["taylor"].append(ms)
+        _, ms = timed(alex_summary.run, state)
+        nodes["alex_summary"].append(ms)
+    for name, samples_ms in nodes.items():
+        record(f"node.{name}", samples_ms)
+
+    record("graph.uncached", [timed(graph.graph.run, {"project_id": pid})[1] for pid in ids])
+    # graph.graph.run bypasses the decision cache, so fill it first
+    for pid in ids:
+        graph.run({"project_id": pid})
+    record("graph.cached", [timed(graph.run, {"project_id": pid})[1] for pid in ids])
+
+    output, ms = timed(run_batch, None, "HR")
+    record("batch.cost_center", [ms], projects=len(output), projects_per_s=len(output) / (ms / 1000))
+    return results
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def local_server(ledger_path, workdir, name):
+    port = _free_port()
+    env = dict(
+        os.environ,
+        FINOPS_DATA_PATH=str(ledger_path),
+        FINOPS_BUDGET_DB=str(workdir / f"budget_http_{name}.sqlite3"),
+        FINOPS_AUDIT_DIR=str(workdir / f"audit_http_{name}"),
+        FINOPS_CHECKPOINT_DB=str(workdir / f"checkpoints_http_{name}.sqlite3"),
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "langgraph_server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL,
+    )
+    import requests
+
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 120
+        while True:
+            try:
+                if requests.get(url + "/", timeout=1).ok:
+                    break
+            except requests.ConnectionError:
+                pass
+            if proc.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("benchmark server failed to start")
+            time.sleep(0.2)
+        yield url
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def _invoke_load(url, ids, concurrency):
+    """POST /finops-workflow/invoke once per ID; returns (elapsed seconds, [(ms, ok)])."""
+    import requests
+
+    invoke = url + "/finops-workflow/invoke"
+    sessions = [requests.Session() for _ in range(concurrency)]
+
+    def call(i):
+        start = time.perf_counter()
+        try:
+            response = sessions[i % concurrency].post(invoke, json={"input": {"project_id": ids[i]}})
+            ok = response.ok
+        except requests.RequestException:
+            ok = False
+        return (time.perf_counter() - start) * 1000, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        calls = list(pool.map(call, range(len(ids))))
+    return time.perf_counter() - start, calls
+
+
+def bench_http(ledger_path, rows, requests_per_level, concurrencies, workdir):
+    results = []
+    for concurrency in concurrencies:
+        # A fresh server (empty decision cache, own budget database) per
+        # level, so levels are comparable; distinct IDs so the first pass
+        # never hits the cache and the second always does
+        ids = project_ids(rows, requests_per_level, seed=2 + concurrency, unique=True)
+        with local_server(ledger_path, workdir, f"{rows}_c{concurrency}") as url:
+            for name in ("http.invoke.uncached", "http.invoke.cached"):
+                elapsed, calls = _invoke_load(url, ids, concurrency)
+                results.append({
+                    "name": name,
+                    "rows": rows,
+                    "concurrency": concurrency,
+                    "throughput_rps": len(ids) / elapsed,
+                    "errors": sum(1 for _, ok in calls if not ok),
+                    "latency_ms": summarize([ms for ms, _ in calls]),
+                })
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[2_000], help="synthetic ledger sizes")
+    parser.add_argument("--samples", type=int, default=200, help="lookups per node benchmark")
+    parser.add_argument("--http", action="store_true", help="also benchmark /finops-workflow/invoke")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=500, help="HTTP requests per concurrency level")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, str(REPO_ROOT))
+    results = []
+    with tempfile.TemporaryDirectory(prefix="finops-bench-") as tmp:
+        workdir = Path(tmp)
+        for rows in args.rows:
+            ledger_path = workdir / f"ledger_{rows}.csv"
+            _, ms = timed(write_ledger, ledger_path, rows)
+            print(f"[bench] generated {rows} rows in {ms:.0f} ms", file=sys.stderr)
+            results.extend(bench_in_process(ledger_path, rows, args.samples, workdir))
+            if args.http:
+                results.extend(bench_http(ledger_path, rows, args.requests, args.concurrency, workdir))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "benchmarks": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for result in results:
+        latency = result["latency_ms"]
+        label = result["name"] + (f"[c={result['concurrency']}]" if "concurrency" in result else "")
+        errors = f" errors={result['errors']}" if result.get("errors") else ""
+        print(f"{label:<28} rows={result['rows']:<10} p50={latency['p50']:.3f}ms p99={latency['p99']:.3f}ms{errors}")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
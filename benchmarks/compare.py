@@ -0,0 +1,50 @@
+"""Compare two benchmark JSON reports and flag latency regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 10]
+
+Exits with status 1 if any benchmark's p50 or p99 got slower by more than
+the threshold (percent).
+"""
+import argparse
+import json
+import sys
+
+
+def _key(result):
+    return result["name"], result["rows"], result.get("concurrency")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = {_key(r): r for r in json.load(f)["benchmarks"]}
+    with open(args.candidate) as f:
+        candidate = json.load(f)["benchmarks"]
+
+    regressions = 0
+    for result in candidate:
+        before = baseline.get(_key(result))
+        if before is None:
+            continue
+        changes = []
+        for stat in ("p50", "p99"):
+            old, new = before["latency_ms"][stat], result["latency_ms"][stat]
+            change = (new - old) / old * 100 if old else 0.0
+            changes.append(f"{stat} {old:.3f} -> {new:.3f} ms ({change:+.1f}%)")
+            if change > args.threshold:
+                regressions += 1
+        name, rows, concurrency = _key(result)
+        label = name + (f"[c={concurrency}]" if concurrency else "")
+        print(f"{label:<28} rows={rows:<10} " + ", ".join(changes))
+    if regressions:
+        print(f"{regressions} regression(s) above {args.threshold}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Shared runtime services for the FinOps approval workflow."""
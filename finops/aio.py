@@ -0,0 +1,25 @@
+"""Async agent protocol.
+
+Every module in agents/ exposes a synchronous run() and an async arun()
+with the same arguments. Agents that only compute on their inputs define
+arun() directly; agents that block (file I/O, pandas, network) get an
+arun() from offload(), which runs run() in a worker thread so the event
+loop stays free.
+"""
+import asyncio
+import functools
+from typing import Any, Dict, Protocol
+
+
+class Agent(Protocol):
+    def run(self, *args: Any) -> Dict[str, Any]: ...
+
+    async def arun(self, *args: Any) -> Dict[str, Any]: ...
+
+
+def offload(fn):
+    """Return an async counterpart of fn that runs it off the event loop."""
+    @functools.wraps(fn)
+    async def arun(*args, **kwargs):
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return arun
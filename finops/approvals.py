@@ -0,0 +1,164 @@
+"""Approval rates by cost center and supplier, precomputed for dashboards.
+
+ApprovalStats evaluates mira's and jordan's checks over the whole ledger,
+vectorized over one chunk of the source's frames() at a time
+(finops.batch.decide), and aggregates the outcomes per cost center and
+per supplier:
+
+- count, approved, rejected_budget, rejected_compliance, approval_rate
+- requested (sum of PO_Requested) and approved_amount
+
+Requests are answered from the last snapshot. Once it is older than
+FINOPS_APPROVAL_STATS_TTL seconds (default 30), or the ledger, rules or
+sanctioned list changed, the next request starts a rebuild in a
+background thread and keeps getting the previous snapshot until the
+rebuild finishes, so no request waits on a full pass except the very
+first one.
+"""
+import contextvars
+import os
+import threading
+import time
+
+import numpy as np
+
+from finops import tenants
+from finops.batch import decide
+from finops.compliance import get_engine
+from finops.log import get_logger
+from finops.registry import registry
+from finops.sources import get_source
+
+DIMENSIONS = {"cost_center": "Cost_Center", "supplier": "Supplier"}
+TTL = float(os.environ.get("FINOPS_APPROVAL_STATS_TTL", 30))
+
+logger = get_logger("approvals")
+
+
+# Per-group tallies, in this order, summed across ledger chunks
+TALLIES = ("count", "approved", "rejected_budget", "requested", "approved_amount")
+
+
+def tally(frame, budget_ok, compliance_ok, column, totals):
+    """Add the outcomes of frame's rows, grouped by a frame column, into totals.
+
+    totals maps each group name to an array of TALLIES.
+    """
+    names = frame[column].astype("category")
+    codes = names.cat.codes.to_numpy()
+    size = len(names.cat.categories)
+    approved = budget_ok & compliance_ok
+    po_amount = frame["PO_Requested"].to_numpy()
+    counts = np.stack([
+        np.bincount(codes, minlength=size),
+        np.bincount(codes, weights=approved, minlength=size),
+        np.bincount(codes, weights=~budget_ok, minlength=size),
+        np.bincount(codes, weights=po_amount, minlength=size),
+        np.bincount(codes, weights=np.where(approved, po_amount, 0), minlength=size),
+    ], axis=1).astype(float)
+    for i, name in enumerate(names.cat.categories):
+        if counts[i, 0]:
+            if name in totals:
+                totals[name] += counts[i]
+            else:
+                totals[name] = counts[i]
+    return totals
+
+
+def aggregate(totals):
+    """{name: counts and amounts} from the tallies of tally()."""
+    views = {}
+    for name, values in sorted(totals.items()):
+        count, approved, rejected_budget, requested, approved_amount = values.tolist()
+        views[name] = {
+            "count": int(count),
+            "approved": int(approved),
+            "rejected_budget": int(rejected_budget),
+            "rejected_compliance": int(count - approved - rejected_budget),
+            "approval_rate": round(approved / count, 4),
+            "requested": round(requested, 2),
+            "approved_amount": round(approved_amount, 2),
+        }
+    return views
+
+
+class ApprovalStats:
+    """Stale-while-revalidate snapshot of approval aggregates for one source."""
+
+    def __init__(self, source, ttl=TTL):
+        self.source = source
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot = None   # (inputs key, built at, {dimension: groups})
+        self._rebuilding = None  # pid running a background rebuild
+
+    def _key(self):
+        self.source.refresh()
+        return self.source.version, get_engine().rules().version, tuple(sorted(registry.sanctioned))
+
+    def _build(self):
+        key = self._key()
+        totals = {dimension: {} for dimension in DIMENSIONS}
+        # A chunk at a time, so a SqliteSource ledger is never one frame
+        for frame in self.source.frames():
+            budget_ok, compliance_ok = decide(frame)
+            for dimension, column in DIMENSIONS.items():
+                tally(frame, budget_ok, compliance_ok, column, totals[dimension])
+        views = {dimension: aggregate(totals[dimension]) for dimension in DIMENSIONS}
+        self._snapshot = (key, time.time(), views)
+        return self._snapshot
+
+    def _rebuild_in_background(self):
+        try:
+            self._build()
+        except Exception as exc:
+            # Keep serving the previous snapshot; the next request retries
+            logger.warning("approval stats rebuild failed", extra={"error": repr(exc)})
+        finally:
+            self._rebuilding = None
+
+    def snapshot(self):
+        """Return (built at, {dimension: {name: stats}}), rebuilding if stale."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshot or self._build()
+        elif time.time() - snapshot[1] > self.ttl or snapshot[0] != self._key():
+            with self._lock:
+                # A rebuild started before a fork never finishes in the child
+                if self._rebuilding != os.getpid():
+                    self._rebuilding = os.getpid()
+                    # In the caller's context, so the rebuild sees its tenant's rules and budgets
+                    threading.Thread(
+                        target=contextvars.copy_context().run, args=(self._rebuild_in_background,),
+                        name="approval-stats", daemon=True,
+                    ).start()
+        return snapshot[1], snapshot[2]
+
+    def view(self, dimension):
+        """{"as_of", "groups"} for a dimension of DIMENSIONS."""
+        built_at, views = self.snapshot()
+        return {"as_of": built_at, "groups": views[dimension]}
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+@tenants.on_evict
+def _evict(tenant):
+    _stats.pop(tenant.data_path, None)
+    _stats.pop(tenant.sqlite_path, None)
+
+
+def get_approval_stats(source=None):
+    """Return the shared ApprovalStats for source (the configured one by default)."""
+    if source is None:
+        source = get_source()
+    stats = _stats.get(source.path)
+    if stats is None:
+        with _stats_lock:
+            stats = _stats.get(source.path)
+            if stats is None:
+                stats = _stats[source.path] = ApprovalStats(source)
+    return stats
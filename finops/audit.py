@@ -0,0 +1,394 @@
+"""Append-only audit log of approval decisions.
+
+Every completed workflow run, and every decision replayed from the
+decision cache, is recorded: sam_decision's outcome (approved, reason,
+budget and compliance results), the PO it was about, alex_summary's
+summary, the tenant and when it was made. Recording is a queue put on the
+request path. A background writer thread takes whatever has queued up, appends it
+to the current segment in one write and makes it durable with one fsync
+(group commit), so a busy server pays one fsync per batch rather than per
+decision and no request ever waits on the disk. A batch that fails to
+write, sync or index (a full disk, a locked index) is retried until it
+succeeds; records are never dropped.
+
+Records are NDJSON lines in segment files under FINOPS_AUDIT_DIR (defaults
+to audit/ next to the ledger). Each process appends to its own segment, so
+workers never interleave writes, and starts a new one once the current
+reaches FINOPS_AUDIT_SEGMENT_BYTES (default 64 MiB). Segments are never
+modified once written.
+
+After each fsync the batch's (tenant, project ID, time, segment, offset)
+entries are committed to a SQLite index in the same directory, so query()
+reads exactly the matching lines instead of scanning segments. A query
+only ever sees one tenant's records (the default tenant's by default). Segments left
+behind by a process that died between fsync and index commit are indexed
+when the next process starts.
+
+    python -m finops.audit [--tenant NAME] [--project-id CUST-0001] [--since TS] [--until TS] [--limit N]
+
+prints matching records as NDJSON.
+"""
+import argparse
+import atexit
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+import orjson
+
+from finops import tenants
+from finops.log import get_logger
+from finops.store import DEFAULT_DATA_PATH
+
+DEFAULT_DIR = DEFAULT_DATA_PATH.with_name("audit")
+SEGMENT_BYTES = int(os.environ.get("FINOPS_AUDIT_SEGMENT_BYTES", 64 * 1024 * 1024))
+MAX_WRITE_BATCH = 1000
+WRITE_INTERVAL = 0.01
+RETRY_DELAY = 0.1
+MAX_RETRY_DELAY = 5
+FLUSH_TIMEOUT = 30
+BUSY_TIMEOUT = 30
+INDEX_NAME = "index.sqlite3"
+
+# Workflow state fields kept in a record, besides ts and cache_hit
+FIELDS = (
+    "project_id", "po_ref", "run_id", "cost_center", "supplier", "po_amount", "budget_remaining",
+    "budget_ok", "compliance_ok", "approved", "reason", "reservation_id", "summary",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    name TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    indexed_bytes INTEGER NOT NULL DEFAULT 0,
+    sealed_at REAL
+);
+CREATE TABLE IF NOT EXISTS records (
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    project_id TEXT,
+    ts REAL NOT NULL,
+    tenant TEXT,
+    PRIMARY KEY (segment, offset)
+) WITHOUT ROWID;
+"""
+# Created after _migrate() has added the tenant column to an older index
+INDEXES = """
+CREATE INDEX IF NOT EXISTS records_tenant_project_ts ON records (tenant, project_id, ts);
+CREATE INDEX IF NOT EXISTS records_tenant_ts ON records (tenant, ts);
+DROP INDEX IF EXISTS records_project_ts;
+DROP INDEX IF EXISTS records_ts;
+"""
+INSERT_SQL = "INSERT OR IGNORE INTO records (segment, offset, length, project_id, ts, tenant) VALUES (?, ?, ?, ?, ?, ?)"
+
+logger = get_logger("audit")
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _init_schema(conn):
+    with conn:
+        conn.executescript(SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(records)")}
+        if "tenant" not in columns:
+            # Indexes written before tenants existed hold default-tenant records
+            conn.execute("ALTER TABLE records ADD COLUMN tenant TEXT")
+        conn.executescript(INDEXES)
+
+
+def _entries(data, start):
+    """(offset, length, record) of the complete lines in data, which begins at start."""
+    offset = 0
+    while True:
+        end = data.find(b"\n", offset)
+        if end < 0:
+            return
+        try:
+            record = orjson.loads(data[offset:end])
+        except orjson.JSONDecodeError:
+            # A torn write from a crash; later lines are still usable
+            record = None
+        if record is not None:
+            yield start + offset, end + 1 - offset, record
+        offset = end + 1
+
+
+class AuditLog:
+    """Segmented NDJSON audit log with a group-committing writer thread."""
+
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.directory / INDEX_NAME, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _ensure(self):
+        # Started lazily, and again in a forked worker, which must write
+        # its own segment with its own thread. record() is called on the
+        # event loop, so this only starts the thread; the writer itself
+        # creates the directory and index and recovers orphaned segments.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._writer = threading.Thread(target=self._write_loop, name="audit-writer", daemon=True)
+            self._writer.start()
+            self._pid = os.getpid()
+
+    def _open_index(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            _init_schema(conn)
+            self._recover(conn)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    def _recover(self, conn):
+        """Index what dead processes wrote to their segments but did not index."""
+        unsealed = conn.execute("SELECT name, pid, indexed_bytes FROM segments WHERE sealed_at IS NULL").fetchall()
+        for name, pid, indexed in unsealed:
+            if pid == os.getpid() or _alive(pid):
+                continue
+            try:
+                with open(self.directory / name, "rb") as f:
+                    f.seek(indexed)
+                    data = f.read()
+            except FileNotFoundError:
+                data = b""
+            entries = list(_entries(data, indexed))
+            with conn:
+                # OR IGNORE: another starting worker may be recovering it too
+                conn.executemany(
+                    INSERT_SQL,
+                    [(name, offset, length, record.get("project_id"), record["ts"], record.get("tenant"))
+                     for offset, length, record in entries],
+                )
+                conn.execute(
+                    "UPDATE segments SET indexed_bytes = ?, sealed_at = ? WHERE name = ?",
+                    (indexed + len(data), time.time(), name),
+                )
+            if entries:
+                logger.info("indexed orphaned audit records", extra={"segment": name, "records": len(entries)})
+
+    def _open_segment(self, conn, sequence):
+        name = f"{time.time_ns() // 1_000_000:013d}-{os.getpid()}-{sequence:04d}.ndjson"
+        # Registered before it is created, so _recover() knows every segment
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO segments (name, pid, created_at) VALUES (?, ?, ?)",
+                         (name, os.getpid(), time.time()))
+        fd = os.open(self.directory / name, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return name, fd, os.fstat(fd).st_size
+
+    def _seal(self, conn, name, size):
+        with conn:
+            conn.execute("UPDATE segments SET indexed_bytes = ?, sealed_at = ? WHERE name = ?",
+                         (size, time.time(), name))
+
+    def _write_loop(self):
+        conn = None
+        name, fd, size, sequence = None, None, 0, 0
+        records = []
+        delay = RETRY_DELAY
+        while True:
+            if not records:
+                records = [self._queue.get()]
+                # Let more decisions queue up behind the first rather than
+                # paying a write, fsync and index commit for each
+                time.sleep(WRITE_INTERVAL)
+                while len(records) < MAX_WRITE_BATCH:
+                    try:
+                        records.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                lines = [orjson.dumps(record, default=str, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n"
+                         for record in records]
+                entries = None
+            try:
+                if conn is None:
+                    conn = self._open_index()
+                if entries is None:
+                    if fd is not None and os.fstat(fd).st_size != size:
+                        # An earlier attempt left part of this batch behind.
+                        # Skip past it in a new segment rather than append
+                        # after a torn line or index records written twice.
+                        self._seal(conn, name, os.fstat(fd).st_size)
+                        os.close(fd)
+                        fd, sequence = None, sequence + 1
+                    batch_bytes = sum(len(line) for line in lines)
+                    if fd is not None and size and size + batch_bytes > self.segment_bytes:
+                        self._seal(conn, name, size)
+                        os.close(fd)
+                        fd, sequence = None, sequence + 1
+                    if fd is None:
+                        name, fd, size = self._open_segment(conn, sequence)
+                    data = b"".join(lines)
+                    written = 0
+                    while written < len(data):
+                        written += os.write(fd, data[written:])
+                    os.fdatasync(fd)
+                    entries = []
+                    offset = size
+                    for record, line in zip(records, lines):
+                        entries.append((name, offset, len(line), record.get("project_id"), record["ts"],
+                                        record.get("tenant")))
+                        offset += len(line)
+                    size = offset
+                # Once durable, only the index commit is retried; should the
+                # process die first, _recover() indexes the unsealed segment
+                with conn:
+                    conn.executemany(INSERT_SQL, entries)
+                    conn.execute("UPDATE segments SET indexed_bytes = ? WHERE name = ?", (size, name))
+            except (OSError, sqlite3.Error) as exc:
+                # Auditors need every decision: keep the batch and retry
+                logger.error("audit write failed; retrying",
+                             extra={"records": len(records), "error": repr(exc), "retry_in": delay})
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+                continue
+            delay = RETRY_DELAY
+            for _ in records:
+                self._queue.task_done()
+            records = []
+
+    def record(self, state, cache_hit=False):
+        """Queue the decision in a final workflow state; returns without waiting for disk."""
+        self._ensure()
+        record = {"ts": time.time(), "cache_hit": cache_hit}
+        tenant = tenants.current_name()
+        if tenant is not None:
+            record["tenant"] = tenant
+        for field in FIELDS:
+            if field in state:
+                record[field] = state[field]
+        self._queue.put(record)
+
+    def query(self, project_id=None, since=None, until=None, limit=100, tenant=None):
+        """Records (oldest first) of tenant (None: the default tenant) for project_id, or all, with since <= ts < until.
+
+        Only sees committed records; call flush() first to include queued ones.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            _init_schema(conn)
+            # IS, unlike =, matches the default tenant's NULL
+            clauses, params = ["tenant IS ?"], [tenant]
+            if project_id is not None:
+                clauses.append("project_id = ?")
+                params.append(project_id)
+            if since is not None:
+                clauses.append("ts >= ?")
+                params.append(since)
+            if until is not None:
+                clauses.append("ts < ?")
+                params.append(until)
+            where = f"WHERE {' AND '.join(clauses)}"
+            rows = conn.execute(
+                f"SELECT segment, offset, length FROM records {where} ORDER BY ts LIMIT ?", (*params, limit),
+            ).fetchall()
+        finally:
+            conn.close()
+        results = [None] * len(rows)
+        by_segment = {}
+        for i, (segment, offset, length) in enumerate(rows):
+            by_segment.setdefault(segment, []).append((i, offset, length))
+        for segment, entries in by_segment.items():
+            fd = os.open(self.directory / segment, os.O_RDONLY)
+            try:
+                for i, offset, length in entries:
+                    results[i] = orjson.loads(os.pread(fd, length, offset))
+            finally:
+                os.close(fd)
+        return results
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """Block until every queued record is durable and indexed, or timeout seconds.
+
+        Returns False if records were still pending at the timeout.
+        """
+        if self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.error("audit flush timed out", extra={"pending": self._queue.unfinished_tasks})
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _after_fork(self):
+        # The lock may have been held by a parent thread at the time of fork
+        self._lock = threading.Lock()
+        self._pid = None
+
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+
+def _after_fork():
+    global _logs_lock
+    _logs_lock = threading.Lock()
+    for log in _logs.values():
+        log._after_fork()
+
+
+# Compiled graphs keep their audit log, so reset it rather than drop it
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def get_audit_log(directory=None):
+    """Return the shared AuditLog for directory (FINOPS_AUDIT_DIR by default)."""
+    directory = Path(directory or os.environ.get("FINOPS_AUDIT_DIR", DEFAULT_DIR)).resolve()
+    log = _logs.get(directory)
+    if log is None:
+        with _logs_lock:
+            log = _logs.get(directory)
+            if log is None:
+                log = _logs[directory] = AuditLog(directory)
+                atexit.register(log.flush)
+    return log
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the approval audit log")
+    parser.add_argument("--dir", help="audit directory (defaults to FINOPS_AUDIT_DIR)")
+    parser.add_argument("--tenant", help="tenant whose records to print (defaults to the default tenant)")
+    parser.add_argument("--project-id")
+    parser.add_argument("--since", type=float, help="epoch seconds")
+    parser.add_argument("--until", type=float, help="epoch seconds")
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args(argv)
+    for record in get_audit_log(args.dir).query(args.project_id, args.since, args.until, args.limit, args.tenant):
+        sys.stdout.write(orjson.dumps(record).decode() + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Vectorized evaluation of the approval workflow over many projects.
+
+Computes the same fields as a per-project run of the graph in main.py
+(sam -> mira/jordan -> sam_decision -> taylor -> alex_summary), but as
+column operations over the ledger frame instead of one graph run per PO.
+
+The budget check accounts for reservations already held in the budget
+ledger but does not place new ones, so batch states carry no
+reservation_id.
+"""
+import numpy as np
+
+from agents import alex_summary
+from finops.budget import get_budget_ledger
+from finops.compliance import get_engine
+from finops.records import PurchaseOrders
+from finops.registry import registry
+from finops.sources import get_source
+from finops.variance import get_analytics
+
+
+def decide(frame):
+    """mira's and jordan's checks for every row of frame: (budget_ok, compliance_ok) arrays."""
+    project_ids = frame["Project_ID"].tolist()
+    reserved = np.asarray(get_budget_ledger().reserved_by_others_many(project_ids, project_ids))
+    budget_ok = frame["PO_Requested"].to_numpy() <= frame["Budget_Remaining"].to_numpy() - reserved
+    suppliers = frame["Supplier"]
+    sanctioned = registry.screen(suppliers.unique().tolist())
+    compliance_ok = get_engine().check_frame(frame) & ~suppliers.isin(sanctioned).to_numpy()
+    return budget_ok, compliance_ok
+
+
+def evaluate(frame):
+    """Return one final workflow state dict per ledger row in frame."""
+    orders = PurchaseOrders.from_frame(frame)
+
+    # mira, jordan and sam_decision
+    budget_ok, compliance_ok = decide(frame)
+    approved = budget_ok & compliance_ok
+    reason = np.where(~budget_ok, "Budget exceeded", "Compliance issue")
+
+    # taylor
+    analytics = get_analytics().describe_frame(frame)
+
+    summary = alex_summary.run({})["summary"]
+    columns = zip(
+        orders.states(),
+        budget_ok.tolist(),
+        compliance_ok.tolist(),
+        approved.tolist(),
+        reason.tolist(),
+        orders.variance.tolist(),
+        analytics,
+    )
+    results = []
+    for state, b_ok, c_ok, ok, why, variance, variance_analytics in columns:
+        state["budget_ok"] = b_ok
+        state["compliance_ok"] = c_ok
+        state["approved"] = ok
+        if not ok:
+            state["reason"] = why
+        state["variance"] = variance
+        state.update(variance_analytics)
+        state["summary"] = summary
+        results.append(state)
+    return results
+
+
+def run_batch(project_ids=None, cost_center=None):
+    """Evaluate the workflow for the selected projects of the ledger source.
+
+    Raises KeyError listing any project IDs missing from the ledger.
+    """
+    return evaluate(get_source().select(project_ids, cost_center))
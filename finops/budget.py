@@ -0,0 +1,335 @@
+"""Concurrency-safe budget ledger with atomic check-and-reserve.
+
+mira used to compare po_amount against the static Budget_Remaining
+snapshot, so two concurrent approvals could both pass and overspend. The
+ledger now records a reservation per PO (reference) against a budget key
+(the project). Check-and-reserve is atomic under a per-key lock (striped,
+so unrelated projects never contend), and a PO only fits if
+
+    amount <= budget_remaining - reservations held by other POs
+
+Reserving again under the same reference is idempotent, so retries and
+re-submissions of the same PO do not consume budget twice.
+
+The in-memory state is authoritative. Reservations are persisted to SQLite
+(WAL mode) by a single writer thread that commits queued changes in
+batches, so callers never wait on disk. A batch that fails to commit (a
+locked database, say) is retried until it succeeds. The database is
+replayed on startup.
+
+That only holds within one process. When several server workers share
+the database (FINOPS_BUDGET_SHARED=1, set by the multi-worker launcher),
+SharedBudgetLedger is used instead: each check-and-reserve is a SQLite
+IMMEDIATE transaction, which serializes it across processes.
+"""
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from finops import tenants
+from finops.log import get_logger
+from finops.store import DEFAULT_DATA_PATH
+
+DEFAULT_DB_PATH = DEFAULT_DATA_PATH.with_name("budget_reservations.sqlite3")
+LOCK_STRIPES = 256
+MAX_WRITE_BATCH = 1000
+RETRY_DELAY = 0.1
+MAX_RETRY_DELAY = 5
+FLUSH_TIMEOUT = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reservations (
+    ref TEXT PRIMARY KEY,
+    budget_key TEXT NOT NULL,
+    amount REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reservations_budget_key ON reservations (budget_key);
+CREATE TABLE IF NOT EXISTS budget_versions (
+    budget_key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+# SQLite's default limit on host parameters per statement is 999
+MAX_PARAMS = 900
+BUSY_TIMEOUT = 30
+
+logger = get_logger("budget")
+
+
+class BudgetLedger:
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._stripes = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._holds = {}     # budget key -> {ref: amount}
+        self._totals = {}    # budget key -> sum of holds
+        self._refs = {}      # ref -> budget key
+        self._versions = {}  # budget key -> change counter
+        self._queue = queue.Queue()
+
+        conn = self._connect()
+        with conn:
+            conn.executescript(SCHEMA)
+        for ref, key, amount in conn.execute("SELECT ref, budget_key, amount FROM reservations"):
+            self._hold(key, ref, amount)
+        conn.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name="budget-ledger-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _write_loop(self):
+        conn = self._connect()
+        ops = []
+        delay = RETRY_DELAY
+        while True:
+            if not ops:
+                ops.append(self._queue.get())
+            while len(ops) < MAX_WRITE_BATCH:
+                try:
+                    ops.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    for op, args in ops:
+                        if op == "put":
+                            conn.execute("INSERT OR REPLACE INTO reservations VALUES (?, ?, ?, ?)", args)
+                        else:
+                            conn.execute("DELETE FROM reservations WHERE ref = ?", args)
+            except sqlite3.Error as exc:
+                # The in-memory state already reflects these changes, so keep
+                # them (in order) and retry rather than lose them
+                logger.error("budget ledger write failed; retrying",
+                             extra={"changes": len(ops), "error": repr(exc), "retry_in": delay})
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+                continue
+            delay = RETRY_DELAY
+            for _ in ops:
+                self._queue.task_done()
+            ops = []
+
+    def _lock(self, key):
+        return self._stripes[hash(key) % LOCK_STRIPES]
+
+    def _hold(self, key, ref, amount):
+        holds = self._holds.setdefault(key, {})
+        self._totals[key] = self._totals.get(key, 0) - holds.get(ref, 0) + amount
+        holds[ref] = amount
+        self._refs[ref] = key
+        self._versions[key] = self._versions.get(key, 0) + 1
+
+    def _drop(self, key, ref):
+        amount = self._holds[key].pop(ref)
+        self._totals[key] -= amount
+        del self._refs[ref]
+        self._versions[key] = self._versions.get(key, 0) + 1
+
+    def reserve(self, key, ref, amount, budget_remaining):
+        """Atomically reserve amount for PO ref against key's budget.
+
+        Returns True if the PO fits (and is now reserved). If ref already
+        holds a reservation for a different amount it is re-checked with
+        the new amount, and dropped if it no longer fits.
+        """
+        amount = float(amount)
+        with self._lock(key):
+            current = self._holds.get(key, {}).get(ref)
+            if current == amount:
+                return True
+            others = self._totals.get(key, 0) - (current or 0)
+            if amount <= budget_remaining - others:
+                self._hold(key, ref, amount)
+                self._queue.put(("put", (ref, key, amount, time.time())))
+                return True
+            if current is not None:
+                self._drop(key, ref)
+                self._queue.put(("del", (ref,)))
+            return False
+
+    def release(self, ref):
+        """Drop the reservation held by ref, if any."""
+        key = self._refs.get(ref)
+        if key is None:
+            return False
+        with self._lock(key):
+            if self._refs.get(ref) != key:
+                return False
+            self._drop(key, ref)
+            self._queue.put(("del", (ref,)))
+            return True
+
+    def reserved_by_others(self, key, ref):
+        """Total held against key by reservations other than ref."""
+        with self._lock(key):
+            return self._totals.get(key, 0) - self._holds.get(key, {}).get(ref, 0)
+
+    def reserved_by_others_many(self, keys, refs):
+        """reserved_by_others() for parallel sequences of keys and refs."""
+        totals = self._totals
+        holds = self._holds
+        return [
+            totals.get(key, 0) - holds.get(key, {}).get(ref, 0) if key in totals else 0
+            for key, ref in zip(keys, refs)
+        ]
+
+    def version(self, key):
+        """Counter that changes whenever key's reservations change."""
+        return self._versions.get(key, 0)
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """Block until every queued change has been committed, or timeout seconds.
+
+        Returns False if changes were still uncommitted at the timeout.
+        """
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.error("budget ledger flush timed out",
+                                 extra={"uncommitted": self._queue.unfinished_tasks})
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+
+class SharedBudgetLedger:
+    """BudgetLedger for several processes sharing one database.
+
+    Every operation runs against SQLite: reservations are checked and
+    written in one IMMEDIATE transaction, which takes the database's write
+    lock, so two workers can never both grant the last of a budget.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _bump(conn, key):
+        conn.execute(
+            "INSERT INTO budget_versions VALUES (?, 1) "
+            "ON CONFLICT (budget_key) DO UPDATE SET version = version + 1",
+            (key,),
+        )
+
+    def reserve(self, key, ref, amount, budget_remaining):
+        """Atomically reserve amount for PO ref against key's budget (see BudgetLedger)."""
+        amount = float(amount)
+        with self._transaction() as conn:
+            row = conn.execute("SELECT amount FROM reservations WHERE ref = ?", (ref,)).fetchone()
+            current = row[0] if row is not None else None
+            if current == amount:
+                return True
+            (others,) = conn.execute(
+                "SELECT total(amount) FROM reservations WHERE budget_key = ? AND ref != ?", (key, ref)
+            ).fetchone()
+            if amount <= budget_remaining - others:
+                conn.execute("INSERT OR REPLACE INTO reservations VALUES (?, ?, ?, ?)", (ref, key, amount, time.time()))
+                self._bump(conn, key)
+                return True
+            if current is not None:
+                conn.execute("DELETE FROM reservations WHERE ref = ?", (ref,))
+                self._bump(conn, key)
+            return False
+
+    def release(self, ref):
+        """Drop the reservation held by ref, if any."""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT budget_key FROM reservations WHERE ref = ?", (ref,)).fetchone()
+            if row is None:
+                return False
+            conn.execute("DELETE FROM reservations WHERE ref = ?", (ref,))
+            self._bump(conn, row[0])
+            return True
+
+    def reserved_by_others(self, key, ref):
+        """Total held against key by reservations other than ref."""
+        (total,) = self._connection().execute(
+            "SELECT total(amount) FROM reservations WHERE budget_key = ? AND ref != ?", (key, ref)
+        ).fetchone()
+        return total
+
+    def reserved_by_others_many(self, keys, refs):
+        """reserved_by_others() for parallel sequences of keys and refs."""
+        keys = list(keys)
+        conn = self._connection()
+        holds = {}
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), MAX_PARAMS):
+            chunk = unique[start:start + MAX_PARAMS]
+            sql = f"SELECT budget_key, ref, amount FROM reservations WHERE budget_key IN ({', '.join('?' * len(chunk))})"
+            for key, ref, amount in conn.execute(sql, chunk):
+                holds.setdefault(key, {})[ref] = amount
+        return [
+            sum(holds[key].values()) - holds[key].get(ref, 0) if key in holds else 0
+            for key, ref in zip(keys, refs)
+        ]
+
+    def version(self, key):
+        """Counter that changes whenever key's reservations change."""
+        row = self._connection().execute(
+            "SELECT version FROM budget_versions WHERE budget_key = ?", (key,)
+        ).fetchone()
+        return row[0] if row is not None else 0
+
+    def flush(self, timeout=None):
+        """Writes are synchronous; nothing to wait for."""
+        return True
+
+
+_ledgers = {}
+_ledgers_lock = threading.Lock()
+# A forked worker must not inherit the parent's writer thread or connections
+os.register_at_fork(after_in_child=_ledgers.clear)
+
+
+def get_budget_ledger(db_path=None):
+    """Return the shared ledger for db_path (the current tenant's or FINOPS_BUDGET_DB by default).
+
+    With FINOPS_BUDGET_SHARED=1 this is a SharedBudgetLedger.
+    """
+    db_path = Path(db_path or tenants.setting("budget_db") or os.environ.get("FINOPS_BUDGET_DB", DEFAULT_DB_PATH)).resolve()
+    ledger = _ledgers.get(db_path)
+    if ledger is None:
+        with _ledgers_lock:
+            ledger = _ledgers.get(db_path)
+            if ledger is None:
+                shared = os.environ.get("FINOPS_BUDGET_SHARED", "0") == "1"
+                ledger = _ledgers[db_path] = (SharedBudgetLedger if shared else BudgetLedger)(db_path)
+    return ledger
@@ -0,0 +1,291 @@
+"""Durable per-node checkpoints of graph runs, for resuming after a crash.
+
+A graph run whose input carries a run_id records each node's output under
+(run_id, step, node) as the node completes. Running the graph again with
+the same run_id and input replays the recorded outputs instead of calling
+those nodes, so a retry after a worker crash picks up after the last
+completed node. Retrying a finished run replays it entirely.
+
+Checkpoints are written to SQLite (WAL mode) by a background writer thread
+that commits whatever has queued up in one transaction, so recording a
+node is a queue put on the request path. The cost is that a crash loses
+the checkpoints of the last moments (at most one batch), which are then
+re-executed on retry. Recorded but not yet committed checkpoints are kept
+in memory, so an in-process retry sees them. A batch that fails to commit
+is retried; while the backlog is over MAX_PENDING checkpoints, new ones
+are dropped (their nodes simply re-execute on resume) instead of
+accumulating in memory.
+
+Configure the database with FINOPS_CHECKPOINT_DB (defaults to
+checkpoints.sqlite3 next to the ledger). Run IDs are scoped to the current
+tenant (see finops.tenants), so tenants cannot resume each other's runs.
+"""
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from finops import tenants
+from finops.log import get_logger
+from finops.store import DEFAULT_DATA_PATH
+
+DEFAULT_DB_PATH = DEFAULT_DATA_PATH.with_name("checkpoints.sqlite3")
+MAX_WRITE_BATCH = 1000
+WRITE_INTERVAL = 0.01
+MAX_PENDING = 100_000
+RETRY_DELAY = 0.1
+MAX_RETRY_DELAY = 5
+FLUSH_TIMEOUT = 30
+BUSY_TIMEOUT = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    input TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    run_id TEXT NOT NULL,
+    step INTEGER NOT NULL,
+    node TEXT NOT NULL,
+    output TEXT NOT NULL,
+    elapsed_ms REAL NOT NULL,
+    PRIMARY KEY (run_id, step, node)
+) WITHOUT ROWID;
+"""
+
+logger = get_logger("checkpoint")
+
+
+def _default(value):
+    # numpy scalars from the ledger frame
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _encode(value):
+    return json.dumps(value, sort_keys=True, default=_default)
+
+
+def _scoped(run_id):
+    tenant = tenants.current_name()
+    return f"{tenant}/{run_id}" if tenant is not None else run_id
+
+
+class RunMismatch(ValueError):
+    """A run_id was reused with a different input."""
+
+
+class Checkpointer:
+    """SQLite checkpoint store with a batching writer thread."""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _ensure(self):
+        # Started lazily, and again in a forked worker: the writer thread
+        # and connections do not survive fork.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            conn = self._connect()
+            with conn:
+                conn.executescript(SCHEMA)
+            self._reader = conn
+            self._reader_lock = threading.Lock()
+            self._queue = queue.Queue()
+            self._pending = {}  # run_id -> {(step, node): (output, elapsed_ms)} not yet committed
+            self._inputs = {}   # run_id -> encoded input, until the run is committed
+            self._dropping = False
+            self._writer = threading.Thread(target=self._write_loop, name="checkpoint-writer", daemon=True)
+            self._writer.start()
+            self._pid = os.getpid()
+
+    def _write_loop(self):
+        conn = self._connect()
+        ops = []
+        delay = RETRY_DELAY
+        while True:
+            if not ops:
+                ops.append(self._queue.get())
+                # Let the rest of the run's nodes queue up behind the first
+                # rather than waking up (and committing) once per node
+                time.sleep(WRITE_INTERVAL)
+            while len(ops) < MAX_WRITE_BATCH:
+                try:
+                    ops.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = []
+            for op, args in ops:
+                if op == "node":
+                    run_id, step, node, output, elapsed = args
+                    try:
+                        args = (run_id, step, node, _encode(output), elapsed)
+                    except (TypeError, ValueError) as exc:
+                        # Not retryable; the node re-executes on resume
+                        logger.error("checkpoint not serializable", extra={"node": node, "error": repr(exc)})
+                        continue
+                rows.append((op, args))
+            try:
+                with conn:
+                    for op, args in rows:
+                        if op == "start":
+                            conn.execute("INSERT OR IGNORE INTO runs VALUES (?, ?, ?, NULL)", args)
+                        elif op == "node":
+                            conn.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?)", args)
+                        elif op == "finish":
+                            conn.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", args)
+                        else:
+                            conn.execute("DELETE FROM checkpoints WHERE run_id = ?", args)
+                            conn.execute("DELETE FROM runs WHERE run_id = ?", args)
+            except sqlite3.Error as exc:
+                # Keep the batch (pending checkpoints stay readable) and retry
+                logger.error("checkpoint write failed; retrying",
+                             extra={"checkpoints": len(ops), "error": repr(exc), "retry_in": delay})
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+                continue
+            delay = RETRY_DELAY
+            self._committed(ops)
+            for _ in ops:
+                self._queue.task_done()
+            ops = []
+
+    def _committed(self, ops):
+        """Forget the in-memory copies of ops, which are now in the database (or dropped)."""
+        with self._lock:
+            self._dropping = False
+            for op, args in ops:
+                if op == "start":
+                    self._inputs.pop(args[0], None)
+                elif op == "node":
+                    pending = self._pending.get(args[0])
+                    if pending is not None:
+                        pending.pop((args[1], args[2]), None)
+                        if not pending:
+                            del self._pending[args[0]]
+
+    def load(self, run_id, input):
+        """Return {(step, node): (output, elapsed_ms)} recorded for run_id.
+
+        Registers run_id with input if it is new. Raises RunMismatch if the
+        run was started with a different input.
+        """
+        self._ensure()
+        run_id = _scoped(run_id)
+        encoded = _encode(input)
+        # Snapshot the pending writes before reading the database, so a
+        # batch committed in between is seen in one or the other.
+        with self._lock:
+            pending = dict(self._pending.get(run_id, {}))
+            started = self._inputs.get(run_id)
+        with self._reader_lock:
+            row = self._reader.execute("SELECT input FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            saved = {
+                (step, node): (json.loads(output), elapsed)
+                for step, node, output, elapsed in self._reader.execute(
+                    "SELECT step, node, output, elapsed_ms FROM checkpoints WHERE run_id = ?", (run_id,)
+                )
+            }
+        if row is not None:
+            started = row[0]
+        if started is None:
+            with self._lock:
+                self._inputs[run_id] = encoded
+            self._queue.put(("start", (run_id, encoded, time.time())))
+        elif started != encoded:
+            raise RunMismatch(f"Run {run_id!r} was started with a different input")
+        saved.update(pending)
+        return saved
+
+    def record(self, run_id, step, node, output, elapsed_ms):
+        """Queue node's output for run_id; returns without waiting for disk."""
+        self._ensure()
+        run_id = _scoped(run_id)
+        with self._lock:
+            if self._queue.unfinished_tasks >= MAX_PENDING:
+                # The writer is stuck retrying; do not hold every checkpoint in memory
+                if not self._dropping:
+                    self._dropping = True
+                    logger.warning("checkpoint backlog full; dropping checkpoints",
+                                   extra={"backlog": self._queue.unfinished_tasks})
+                return
+            self._pending.setdefault(run_id, {})[(step, node)] = (output, elapsed_ms)
+        self._queue.put(("node", (run_id, step, node, output, elapsed_ms)))
+
+    def finish(self, run_id):
+        """Mark run_id as completed."""
+        self._ensure()
+        self._queue.put(("finish", (time.time(), _scoped(run_id))))
+
+    def delete(self, run_id):
+        """Forget run_id and its checkpoints."""
+        self._ensure()
+        self._queue.put(("delete", (_scoped(run_id),)))
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        """Block until every queued checkpoint has been committed, or timeout seconds.
+
+        Returns False if checkpoints were still uncommitted at the timeout.
+        """
+        if self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.error("checkpoint flush timed out", extra={"uncommitted": self._queue.unfinished_tasks})
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _after_fork(self):
+        # The lock may have been held by a parent thread at the time of fork
+        self._lock = threading.Lock()
+        self._pid = None
+
+
+_checkpointers = {}
+_checkpointers_lock = threading.Lock()
+
+
+def _after_fork():
+    global _checkpointers_lock
+    _checkpointers_lock = threading.Lock()
+    for checkpointer in _checkpointers.values():
+        checkpointer._after_fork()
+
+
+# Compiled graphs keep their checkpointer, so reset it rather than drop it
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def get_checkpointer(db_path=None):
+    """Return the shared Checkpointer for db_path (FINOPS_CHECKPOINT_DB by default)."""
+    db_path = Path(db_path or os.environ.get("FINOPS_CHECKPOINT_DB", DEFAULT_DB_PATH)).resolve()
+    checkpointer = _checkpointers.get(db_path)
+    if checkpointer is None:
+        with _checkpointers_lock:
+            checkpointer = _checkpointers.get(db_path)
+            if checkpointer is None:
+                checkpointer = _checkpointers[db_path] = Checkpointer(db_path)
+                atexit.register(checkpointer.flush)
+    return checkpointer
@@ -0,0 +1,139 @@
+"""Client-side helpers for the FinOps workflow API.
+
+FinOpsClient keeps a pool of keep-alive connections to one server, so
+repeated calls skip TCP (and TLS) setup. Every call has a bounded connect
+and read timeout. Connection failures and 502/503/504 responses are
+retried with exponential backoff. That includes POSTs: re-submitting a
+PO reuses its budget reservation, so a retried approval cannot spend
+twice.
+
+One client can be shared by many threads (the Streamlit app keeps a
+single one for all sessions):
+
+    client = FinOpsClient("http://localhost:8000")
+    for project_id, state, error in client.invoke_many(["CUST-0001", "CUST-0002"]):
+        ...
+
+invoke_many() sends the approvals concurrently and yields each result as
+soon as it arrives, so one slow approval does not hold up the rest.
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (3.05, 30)
+STREAM_TIMEOUT = (3.05, 60)
+POOL_SIZE = 32
+RETRIES = 3
+BACKOFF = 0.3
+MAX_CONCURRENCY = 8
+
+
+def iter_sse(response):
+    """Yield (event, data) pairs from a streaming server-sent-events response."""
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+    if data:
+        yield event, json.loads("\n".join(data))
+
+
+def events_url(invoke_url):
+    """Map a .../finops-workflow/invoke URL to its streaming events URL."""
+    base = invoke_url.rstrip("/")
+    if base.endswith("/invoke"):
+        base = base[: -len("/invoke")]
+    return base + "/events"
+
+
+def api_base_url(invoke_url):
+    """Map a .../finops-workflow/invoke URL to the server's base URL."""
+    return invoke_url.split("/finops-workflow")[0].rstrip("/")
+
+
+class FinOpsClient:
+    """Pooled, retrying HTTP client for one FinOps server."""
+
+    def __init__(self, base_url, timeout=DEFAULT_TIMEOUT, pool_size=POOL_SIZE, retries=RETRIES, backoff=BACKOFF):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "POST"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _request(self, method, path, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def get(self, path, **params):
+        return self._request("GET", path, params=params)
+
+    def post(self, path, payload):
+        return self._request("POST", path, json=payload)
+
+    def invoke(self, project_id, **input):
+        """Run the workflow for one project; returns the final state."""
+        return self.post("/finops-workflow/invoke", {"input": {"project_id": project_id, **input}})["output"]
+
+    def invoke_many(self, project_ids, max_workers=MAX_CONCURRENCY, **input):
+        """Run the workflow for several projects concurrently.
+
+        Yields (project_id, state, error) in completion order; error is the
+        exception of a failed call (and state None).
+        """
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="finops-client") as pool:
+            futures = {pool.submit(self.invoke, project_id, **input): project_id for project_id in project_ids}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as exc:
+                    yield futures[future], None, exc
+
+    def events(self, project_id, **input):
+        """Run the workflow for one project, yielding its (event, data) progress events."""
+        payload = {"input": {"project_id": project_id, **input}}
+        with self.session.post(
+            f"{self.base_url}/finops-workflow/events", json=payload, stream=True, timeout=STREAM_TIMEOUT,
+        ) as response:
+            response.raise_for_status()
+            yield from iter_sse(response)
+
+    def batch(self, project_ids=None, cost_center=None):
+        """Vectorized evaluation (no budget reservations); returns the states."""
+        return self.post("/finops-workflow/batch", {"project_ids": project_ids, "cost_center": cost_center})["output"]
+
+    def projects(self, prefix="", cost_center=None, after=None, limit=50):
+        """One page of projects: {"items": [...], "next": cursor or None}."""
+        params = {"prefix": prefix, "limit": limit}
+        if cost_center is not None:
+            params["cost_center"] = cost_center
+        if after is not None:
+            params["after"] = after
+        return self.get("/projects", **params)
+
+    def approval_rates(self, dimension):
+        return self.get(f"/analytics/approvals/{dimension}")
+
+    def close(self):
+        self.session.close()
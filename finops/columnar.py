@@ -0,0 +1,173 @@
+"""Typed, memory-mapped columnar cache of the project ledger.
+
+compile_ledger() converts the tab-separated CSV into one .npy file per
+column next to it (data.csv -> data.csv.columns/). Cost_Center and Supplier
+are dictionary encoded (small integer codes plus a category list) and the
+amount columns keep their int64/float64 dtype. load_ledger() memory-maps the
+files read-only, so every process reading the same cache shares its pages
+through the OS page cache instead of holding a private parsed copy. The
+cache is rebuilt automatically when the CSV's mtime or size changes.
+Builds hold an exclusive lock on the cache directory, so processes that
+find the cache stale at the same time compile it once, and a build never
+deletes another's half-written files.
+
+    python -m finops.columnar [path/to/data.csv]
+"""
+import fcntl
+import json
+import os
+import shutil
+import sys
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+SEPARATOR = "\t"
+CATEGORICAL_COLUMNS = ("Cost_Center", "Supplier")
+MANIFEST = "manifest.json"
+LOCK = ".lock"
+FORMAT_VERSION = 1
+
+
+def cache_dir(csv_path):
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.name + ".columns")
+
+
+def source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def _read_manifest(directory):
+    try:
+        with open(directory / MANIFEST) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def compile_ledger(csv_path, force=True):
+    """Build the columnar cache for csv_path and return its manifest.
+
+    With force=False, returns the current manifest instead if another
+    process compiled a fresh cache while this one waited for the lock.
+    """
+    csv_path = Path(csv_path)
+    directory = cache_dir(csv_path)
+    directory.mkdir(exist_ok=True)
+    with open(directory / LOCK, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not force:
+            manifest = _read_manifest(directory)
+            if is_fresh(csv_path, manifest):
+                return manifest
+        return _compile(csv_path, directory)
+
+
+def _compile(csv_path, directory):
+    # pandas is imported on first use rather than with this module (which
+    # the store imports at startup); see finops.startup
+    import pandas as pd
+
+    signature = source_signature(csv_path)
+    df = pd.read_csv(
+        csv_path, sep=SEPARATOR,
+        dtype={name: "category" for name in CATEGORICAL_COLUMNS},
+    )
+
+    # Each build goes to its own directory and is published by atomically
+    # replacing the manifest, so readers never see a half-written cache.
+    build = f"build-{uuid.uuid4().hex}"
+    build_dir = directory / build
+    build_dir.mkdir()
+    columns = {}
+    for name in df.columns:
+        series = df[name]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            np.save(build_dir / f"{name}.npy", series.cat.codes.to_numpy())
+            columns[name] = {
+                "kind": "category",
+                "categories": series.cat.categories.tolist(),
+            }
+        elif pd.api.types.is_numeric_dtype(series.dtype):
+            dtype = "float64" if pd.api.types.is_float_dtype(series.dtype) else "int64"
+            np.save(build_dir / f"{name}.npy", series.to_numpy(dtype=dtype))
+            columns[name] = {"kind": "numeric", "dtype": dtype}
+        else:
+            np.save(build_dir / f"{name}.npy", series.to_numpy(dtype=str))
+            columns[name] = {"kind": "string"}
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "build": build,
+        "source": signature,
+        "rows": len(df),
+        "columns": columns,
+    }
+    tmp = directory / f"{MANIFEST}.{build}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, directory / MANIFEST)
+
+    # Readers that already mapped an older build keep their pages (the
+    # files are unlinked, not truncated), so old builds can go right away.
+    # No other build is in progress while we hold the lock.
+    for old in directory.glob("build-*"):
+        if old.name != build:
+            shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+def is_fresh(csv_path, manifest):
+    return (
+        manifest is not None
+        and manifest.get("format") == FORMAT_VERSION
+        and manifest.get("source") == source_signature(csv_path)
+    )
+
+
+def load_ledger(csv_path):
+    """Return the ledger as a DataFrame backed by the memory-mapped cache.
+
+    Compiles (or recompiles) the cache first if it is missing or stale.
+    """
+    csv_path = Path(csv_path)
+    directory = cache_dir(csv_path)
+    for attempt in range(2):
+        manifest = _read_manifest(directory)
+        if not is_fresh(csv_path, manifest):
+            manifest = compile_ledger(csv_path, force=False)
+        try:
+            return _map_build(directory / manifest["build"], manifest)
+        except FileNotFoundError:
+            # Another process replaced the build between reading the
+            # manifest and mapping its files; read the new manifest.
+            if attempt:
+                raise
+
+
+def _map_build(build_dir, manifest):
+    import pandas as pd
+
+    data = {}
+    for name, spec in manifest["columns"].items():
+        values = np.load(build_dir / f"{name}.npy", mmap_mode="r")
+        if spec["kind"] == "category":
+            # Codes were produced by compile_ledger; skipping validation
+            # keeps them mapped instead of copied.
+            data[name] = pd.Categorical.from_codes(
+                values, categories=spec["categories"], validate=False
+            )
+        else:
+            data[name] = values
+    return pd.DataFrame(data, copy=False)
+
+
+if __name__ == "__main__":
+    from finops.store import DEFAULT_DATA_PATH
+
+    path = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("FINOPS_DATA_PATH", DEFAULT_DATA_PATH)
+    result = compile_ledger(path)
+    print(f"Compiled {result['rows']} rows from {path} into {cache_dir(path)}")
@@ -0,0 +1,259 @@
+"""Compliance rule engine used by jordan and the batch/vectorized paths.
+
+Rules come from a JSON file (FINOPS_RULES_PATH, default
+compliance_rules.json next to data.csv):
+
+    {
+      "blocklist": ["VendorY"],            # suppliers that always fail
+      "allowlist": [],                     # if non-empty, only these pass
+      "cost_center_restrictions": {        # suppliers barred per cost center
+        "Marketing": ["Venom"]
+      },
+      "blocked_amount_ranges": [           # PO amounts barred per supplier
+        {"supplier": "Saxon", "min": 50000, "max": null}
+      ],
+      "honor_compliance_flag": false       # fail ledger rows with Compliance_Flag=1
+    }
+
+They are compiled into hash sets and per-supplier sorted, merged interval
+arrays. A check is therefore a few set probes plus one binary search,
+however many rules there are, and check_frame() applies the same rules to
+a whole ledger frame as column operations. The file is re-read when its
+mtime or size changes, so rule edits take effect without a restart.
+
+Replace the file atomically (write a temporary file next to it, then
+rename it over the rules file) rather than editing it in place. A file
+that cannot be read or compiled, such as a half-written one, is logged and
+ignored: checks keep using the previous rules until the file changes again.
+"""
+import bisect
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from finops import tenants
+from finops.log import get_logger
+from finops.sources import get_source
+from finops.store import DEFAULT_DATA_PATH
+
+DEFAULT_RULES_PATH = DEFAULT_DATA_PATH.with_name("compliance_rules.json")
+
+logger = get_logger("compliance")
+
+
+def _merge_ranges(ranges):
+    """Merge [min, max] ranges into sorted, disjoint start/end lists."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [start for start, _ in merged], [end for _, end in merged]
+
+
+class CompiledRules:
+    """Immutable, lookup-ready form of one version of the rules file."""
+
+    def __init__(self, spec, version):
+        self.version = version
+        # Unlike version, the same for the same rules in every engine
+        self.digest = hashlib.blake2b(json.dumps(spec, sort_keys=True).encode(), digest_size=16).hexdigest()
+        self.blocked = frozenset(spec.get("blocklist", ()))
+        self.allowed = frozenset(spec.get("allowlist", ()))
+        self.restricted = {
+            cost_center: frozenset(suppliers)
+            for cost_center, suppliers in spec.get("cost_center_restrictions", {}).items()
+        }
+        ranges = {}
+        for rule in spec.get("blocked_amount_ranges", ()):
+            start = rule.get("min")
+            end = rule.get("max")
+            ranges.setdefault(rule["supplier"], []).append((
+                float("-inf") if start is None else start,
+                float("inf") if end is None else end,
+            ))
+        self.amount_ranges = {supplier: _merge_ranges(r) for supplier, r in ranges.items()}
+        self.honor_compliance_flag = bool(spec.get("honor_compliance_flag", False))
+
+    def _in_blocked_range(self, supplier, amount):
+        ranges = self.amount_ranges.get(supplier)
+        if ranges is None:
+            return False
+        starts, ends = ranges
+        i = bisect.bisect_right(starts, amount) - 1
+        return i >= 0 and amount <= ends[i]
+
+    def check(self, cost_center, supplier, amount, flagged=False):
+        if supplier in self.blocked:
+            return False
+        if self.allowed and supplier not in self.allowed:
+            return False
+        if supplier in self.restricted.get(cost_center, ()):
+            return False
+        if self._in_blocked_range(supplier, amount):
+            return False
+        return not (self.honor_compliance_flag and flagged)
+
+    def check_frame(self, frame):
+        """Return a boolean array: does each ledger row pass the rules?"""
+        suppliers = frame["Supplier"]
+        ok = self.supplier_mask(suppliers) & self.row_mask(frame)
+        if self.amount_ranges:
+            ok &= ~self.amount_blocked(suppliers.to_numpy(), frame["PO_Requested"].to_numpy())
+        return ok
+
+    def supplier_mask(self, suppliers, blocked=None):
+        """Supplier-level rules (blocklist, allowlist) for a supplier Series.
+
+        blocked overrides the blocklist, for what-if evaluation.
+        """
+        ok = ~suppliers.isin(self.blocked if blocked is None else blocked).to_numpy()
+        if self.allowed:
+            ok &= suppliers.isin(self.allowed).to_numpy()
+        return ok
+
+    def row_mask(self, frame):
+        """Rules that depend on the row but not its amount: cost center restrictions, flag."""
+        suppliers = frame["Supplier"]
+        cost_centers = frame["Cost_Center"]
+        ok = np.ones(len(frame), dtype=bool)
+        present = set(cost_centers.unique())
+        for cost_center, barred in self.restricted.items():
+            if cost_center in present:
+                ok &= ~((cost_centers == cost_center) & suppliers.isin(barred)).to_numpy()
+        if self.honor_compliance_flag:
+            ok &= frame["Compliance_Flag"].to_numpy() == 0
+        return ok
+
+    def amount_blocked(self, suppliers, amounts):
+        """Boolean array: is each amount in a blocked range for its supplier?
+
+        suppliers is a 1-d array; amounts has it as its last axis and may
+        have leading axes (one row of amounts per what-if scenario).
+        """
+        amounts = np.asarray(amounts)
+        hit = np.zeros(amounts.shape, dtype=bool)
+        present = set(np.unique(suppliers).tolist()) if len(suppliers) else set()
+        for supplier, (starts, ends) in self.amount_ranges.items():
+            if supplier not in present:
+                continue
+            mask = suppliers == supplier
+            values = amounts[..., mask]
+            i = np.searchsorted(starts, values, side="right") - 1
+            hit[..., mask] = (i >= 0) & (values <= np.asarray(ends)[np.maximum(i, 0)])
+        return hit
+
+
+class ComplianceEngine:
+    """Hot-reloading rules plus the ledger's flagged-project set."""
+
+    def __init__(self, rules_path, source):
+        self.rules_path = Path(rules_path)
+        self.source = source
+        self._lock = threading.Lock()
+        self._signature = None
+        self._rejected = None  # signature of a file that failed to load
+        self._rules = None
+        self._flagged = None
+        self._flag_version = 0
+        source.subscribe(self._on_ledger_change)
+
+    def _on_ledger_change(self, rows):
+        if rows is None or self._flagged is None:
+            self._flagged = None
+        else:
+            for row in rows:
+                if row["Compliance_Flag"]:
+                    self._flagged.add(row["Project_ID"])
+                else:
+                    self._flagged.discard(row["Project_ID"])
+        self._flag_version += 1
+
+    def _flagged_projects(self):
+        self.source.refresh()
+        flagged = self._flagged
+        if flagged is None:
+            flagged = self._flagged = self.source.flagged_projects()
+        return flagged
+
+    def rules(self):
+        """Return the current CompiledRules, recompiling if the file changed."""
+        try:
+            stat = os.stat(self.rules_path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+        if self._rules is not None and signature in (self._signature, self._rejected):
+            return self._rules
+        with self._lock:
+            if self._rules is None or signature not in (self._signature, self._rejected):
+                version = self._rules.version + 1 if self._rules is not None else 1
+                try:
+                    spec = {}
+                    if signature is not None:
+                        with open(self.rules_path) as f:
+                            spec = json.load(f)
+                    rules = CompiledRules(spec, version)
+                except (OSError, ValueError, KeyError, TypeError, AttributeError) as exc:
+                    if self._rules is None:
+                        raise
+                    # Keep the last good rules; a later write is picked up
+                    # because _signature still names the old file
+                    logger.error("invalid compliance rules; keeping the previous version",
+                                 extra={"path": str(self.rules_path), "error": repr(exc)})
+                    self._rejected = signature
+                    return self._rules
+                self._rules = rules
+                self._signature = signature
+                self._rejected = None
+        return self._rules
+
+    def warm(self):
+        """Compile the rules and load the flagged set now, not on first check."""
+        self.rules()
+        self._flagged_projects()
+
+    @property
+    def version(self):
+        """Changes whenever the rules or the ledger's flags may have changed."""
+        return self.rules().version, self._flag_version
+
+    def check(self, project_id, cost_center, supplier, amount):
+        rules = self.rules()
+        flagged = rules.honor_compliance_flag and project_id in self._flagged_projects()
+        return rules.check(cost_center, supplier, amount, flagged)
+
+    def check_frame(self, frame):
+        return self.rules().check_frame(frame)
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+@tenants.on_evict
+def _evict(tenant):
+    for key in [key for key in list(_engines) if key[1] in (tenant.data_path, tenant.sqlite_path)]:
+        _engines.pop(key, None)
+
+
+def get_engine(rules_path=None, source=None):
+    """Return the shared engine for rules_path (the current tenant's rules or FINOPS_RULES_PATH by default)."""
+    if source is None:
+        source = get_source()
+    rules_path = Path(
+        rules_path or tenants.setting("rules_path") or os.environ.get("FINOPS_RULES_PATH", DEFAULT_RULES_PATH)
+    ).resolve()
+    key = (rules_path, source.path)
+    engine = _engines.get(key)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(key)
+            if engine is None:
+                engine = _engines[key] = ComplianceEngine(rules_path, source)
+    return engine
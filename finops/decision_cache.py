@@ -0,0 +1,210 @@
+"""Memoized approval decisions in front of the compiled graph.
+
+The workflow is deterministic given the ledger row it resolves (and, for
+taylor's variance analytics, the ledger version), the compliance rules,
+the registry's sanctioned list and the project's budget reservations.
+CachedGraph therefore keys each run on a hash of exactly those inputs and
+replays the stored final state on a hit. Any change to the ledger, the
+rules or the reservations changes the key, so stale entries are never
+served; they simply age out of the bounded LRU/TTL cache. A run during
+which the ledger or the rules changed is not cached at all.
+
+Every state returned carries run_metadata = {"cache_hit": ..., "cache_key": ...}.
+Configure with FINOPS_DECISION_CACHE_SIZE (0 disables) and
+FINOPS_DECISION_CACHE_TTL (seconds).
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from langchain_core.runnables import ConfigurableFieldSpec, Runnable
+
+from finops import metrics, tenants
+from finops.budget import get_budget_ledger
+from finops.compliance import get_engine
+from finops.graph import GraphRun
+from finops.registry import registry
+from finops.sources import get_source
+
+DEFAULT_MAXSIZE = int(os.environ.get("FINOPS_DECISION_CACHE_SIZE", 10_000))
+DEFAULT_TTL = float(os.environ.get("FINOPS_DECISION_CACHE_TTL", 300))
+
+CACHE_LOOKUPS = metrics.counter("finops_decision_cache_lookups_total", "Decision cache lookups", ("result",))
+
+
+def _hit_ratio():
+    hits = CACHE_LOOKUPS.value("hit")
+    total = hits + CACHE_LOOKUPS.value("miss")
+    return hits / total if total else None
+
+
+metrics.gauge("finops_decision_cache_hit_ratio", "Share of decision cache lookups that hit", fn=_hit_ratio)
+
+
+class DecisionCache:
+    """Thread-safe LRU cache whose entries also expire after ttl seconds."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    CACHE_LOOKUPS.inc("hit")
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            CACHE_LOOKUPS.inc("miss")
+            return None
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def decision_inputs(input):
+    """Everything a run's outcome depends on, as a JSON-encodable dict.
+
+    Raises KeyError if the project is not in the ledger.
+    """
+    project_id = input["project_id"]
+    source = get_source()
+    row = source.record(project_id)
+    return {
+        # run_id names a (resumable) run, it does not change the outcome
+        "input": {key: value for key, value in input.items() if key != "run_id"},
+        "row": row.to_dict(),
+        # taylor's variance analytics depend on the whole ledger. File
+        # signatures and a rules digest rather than version counters,
+        # which restart when an evicted tenant's store or engine is rebuilt
+        "ledger": source.signature,
+        "rules": get_engine().rules().digest,
+        "sanctioned": sorted(registry.sanctioned),
+        "budget": get_budget_ledger().version(project_id),
+        # Tenants' ledgers may share project IDs and even rows
+        "tenant": tenants.current_name(),
+    }
+
+
+def _digest(payload):
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def decision_key(input):
+    """Hash of decision_inputs(input); raises KeyError for an unknown project."""
+    return _digest(decision_inputs(input))
+
+
+class CachedGraph(Runnable[Dict[str, Any], Dict[str, Any]]):
+    """Wraps a CompiledGraph with a DecisionCache."""
+
+    def __init__(self, graph, cache=None):
+        self.graph = graph
+        self.cache = cache if cache is not None else DecisionCache()
+
+    def _lookup(self, input):
+        """(decision inputs, key, cached state or None) before a run."""
+        try:
+            before = decision_inputs(input)
+        except KeyError:
+            # Unknown project: let the graph raise its usual error
+            return None, None, None
+        key = _digest(before)
+        return before, key, self.cache.get(key)
+
+    def _hit(self, input, key, state):
+        state = copy.deepcopy(state)
+        state.pop("run_id", None)
+        if "run_id" in input:
+            state["run_id"] = input["run_id"]
+        state["run_metadata"] = {"cache_hit": True, "cache_key": key}
+        # A replayed decision is still a decision served
+        if self.graph.audit is not None:
+            self.graph.audit.record(state, cache_hit=True)
+        return GraphRun(state, {})
+
+    def _store(self, input, before, result):
+        # Key on the budget as it is after the run: mira's reservation
+        # bumps its version, and the next identical request sees that.
+        # Everything else must be what the run started from; if the rules
+        # or the ledger changed under it, its verdict may already be stale.
+        after = decision_inputs(input)
+        key = _digest(after)
+        if before is not None and all(after[name] == before[name] for name in after if name != "budget"):
+            self.cache.put(key, copy.deepcopy(result.state))
+        result.state["run_metadata"] = {"cache_hit": False, "cache_key": key}
+        return result
+
+    def run(self, input):
+        before, key, state = self._lookup(input)
+        if state is not None:
+            return self._hit(input, key, state)
+        return self._store(input, before, self.graph.run(input))
+
+    async def arun(self, input):
+        """Run (or replay) on the event loop, within the current tenant's quota."""
+        async with tenants.quota():
+            before, key, state = await asyncio.to_thread(self._lookup, input)
+            if state is not None:
+                return self._hit(input, key, state)
+            result = await self.graph.arun(input)
+            return await asyncio.to_thread(self._store, input, before, result)
+
+    async def astream_nodes(self, input):
+        """Graph node events; a cache hit yields only the final event."""
+        async with tenants.quota():
+            before, key, state = await asyncio.to_thread(self._lookup, input)
+            if state is not None:
+                result = self._hit(input, key, state)
+                yield {"event": "end", "state": result.state, "timings": result.timings}
+                return
+            async for event in self.graph.astream_nodes(input):
+                if event["event"] == "end":
+                    result = GraphRun(event["state"], event["timings"])
+                    await asyncio.to_thread(self._store, input, before, result)
+                yield event
+
+    @property
+    def config_specs(self):
+        return [ConfigurableFieldSpec(
+            id=tenants.TENANT_KEY, annotation=Optional[str], name="Tenant", default=None,
+            description="Business unit whose ledger, rules and budgets the run uses",
+        )]
+
+    # The configurable tenant key selects the tenant (see finops.tenants)
+    def invoke(self, input, config=None, **kwargs):
+        with tenants.use(tenants.from_config(config)):
+            return self.run(input).state
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        with tenants.use(tenants.from_config(config)):
+            return (await self.arun(input)).state
@@ -0,0 +1,343 @@
+"""Step-wise graph runner that executes independent branches concurrently.
+
+Nodes run in supersteps: every node routed to by the previous step runs in
+the current step, at the same time. Sync nodes go to a thread pool and
+async nodes run on the event loop, so the fan-out from sam to mira and
+jordan costs max(mira, jordan) rather than their sum.
+
+Nodes may be registered with an async counterpart (the agents' arun());
+arun()/ainvoke() await it directly and run()/invoke() use the sync one.
+A node may also be given as a "module:attribute" string, which is
+imported on the node's first call, so building a graph does not import
+its nodes' modules.
+
+A node routed to by several nodes of the same step (a join, such as
+sam_decision) receives their outputs as positional arguments in routing
+order. Every other node receives the accumulated state.
+
+Every run is traced (a root span plus one child span per node, see
+finops.tracing), and each node call updates the finops_node_* latency,
+in-flight and error metrics.
+
+With a checkpointer (see finops.checkpoint), a run whose input carries a
+run_id records every node output as it completes, and a later run with
+the same run_id replays the recorded outputs instead of calling those
+nodes again. With an audit log (see finops.audit), every completed run's
+decision is recorded.
+"""
+import asyncio
+import contextvars
+import importlib
+import inspect
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from langchain_core.runnables import Runnable
+
+from finops import metrics, tracing
+from finops.log import get_logger
+
+logger = get_logger("graph")
+NODE_LATENCY = metrics.histogram("finops_node_latency_seconds", "Wall-clock time of graph node calls", ("node",))
+NODE_IN_FLIGHT = metrics.gauge("finops_node_in_flight", "Graph node calls currently executing", ("node",))
+NODE_ERRORS = metrics.counter("finops_node_errors_total", "Graph node calls that raised", ("node",))
+RUN_LATENCY = metrics.histogram("finops_graph_run_latency_seconds", "Wall-clock time of whole graph runs")
+RUN_ERRORS = metrics.counter("finops_graph_run_errors_total", "Graph runs that raised")
+
+
+@contextmanager
+def _instrumented(name, parent):
+    """Trace and meter one node call."""
+    NODE_IN_FLIGHT.inc(name)
+    start = time.perf_counter()
+    try:
+        with tracing.span(name, parent, node=name):
+            yield
+    except Exception as exc:
+        NODE_ERRORS.inc(name)
+        # The exception propagates to the caller; log it without the traceback
+        logger.warning("node failed", extra={"node": name, "error": repr(exc)})
+        raise
+    finally:
+        NODE_IN_FLIGHT.dec(name)
+        NODE_LATENCY.observe(time.perf_counter() - start, name)
+
+
+def _resolve(target):
+    """Return target, importing it first if it is a "module:attribute" string."""
+    if not isinstance(target, str):
+        return target
+    module, _, attribute = target.partition(":")
+    return getattr(importlib.import_module(module), attribute)
+
+
+class GraphRun:
+    """Final state of one graph run plus per-node wall-clock timings."""
+
+    __slots__ = ("state", "timings")
+
+    def __init__(self, state, timings):
+        self.state = state
+        self.timings = timings  # node name -> elapsed milliseconds
+
+
+class StateGraph:
+    """Builder for a CompiledGraph."""
+
+    def __init__(self):
+        self.nodes: Dict[str, Callable] = {}
+        self.async_nodes: Dict[str, Callable] = {}
+        self.routers: Dict[str, Callable[[Dict[str, Any]], List[str]]] = {}
+        self.entry_node: Optional[str] = None
+        self.exit_node: Optional[str] = None
+
+    def add_node(self, name, fn, async_fn=None):
+        """Register fn under name, with an optional coroutine counterpart.
+
+        Either may be a "module:attribute" string, resolved on first call.
+        """
+        self.nodes[name] = fn
+        if async_fn is not None:
+            self.async_nodes[name] = async_fn
+
+    def set_entry_node(self, name):
+        self.entry_node = name
+
+    def set_conditional(self, name, router):
+        """Route from name to the node names returned by router(state)."""
+        self.routers[name] = router
+
+    def set_exit_node(self, name):
+        self.exit_node = name
+
+    def compile(self, max_workers=None, checkpointer=None, audit=None):
+        if self.entry_node not in self.nodes:
+            raise ValueError(f"Entry node {self.entry_node!r} is not a registered node")
+        if self.exit_node not in self.nodes:
+            raise ValueError(f"Exit node {self.exit_node!r} is not a registered node")
+        return CompiledGraph(
+            self.nodes, self.routers, self.entry_node, self.exit_node,
+            async_nodes=self.async_nodes, max_workers=max_workers, checkpointer=checkpointer, audit=audit,
+        )
+
+
+class CompiledGraph(Runnable[Dict[str, Any], Dict[str, Any]]):
+    """Runnable graph; invoke/ainvoke return the final state."""
+
+    def __init__(self, nodes, routers, entry_node, exit_node, async_nodes=None, max_workers=None,
+                 checkpointer=None, audit=None):
+        self.nodes = dict(nodes)
+        self.async_nodes = dict(async_nodes or {})
+        self.routers = dict(routers)
+        self.entry_node = entry_node
+        self.exit_node = exit_node
+        self.max_workers = max_workers
+        self.checkpointer = checkpointer
+        self.audit = audit
+        self._pool = None
+        self._pool_pid = None
+
+    @property
+    def _executor(self):
+        # Created lazily, and again in a forked worker: pool threads do not
+        # survive fork, so a pool inherited from the parent would hang.
+        if self._pool_pid != os.getpid():
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="graph")
+            self._pool_pid = os.getpid()
+        return self._pool
+
+    def _next_step(self, step, state):
+        """Return the next step as a list of (node, triggering nodes)."""
+        triggers: Dict[str, List[str]] = {}
+        for name in step:
+            if name == self.exit_node or name not in self.routers:
+                continue
+            for target in self.routers[name](state):
+                if target not in self.nodes:
+                    raise ValueError(f"Node {name!r} routed to unknown node {target!r}")
+                triggers.setdefault(target, []).append(name)
+        return list(triggers.items())
+
+    def _node(self, name, use_async=False):
+        """Return the callable for name, importing it on first use."""
+        nodes = self.async_nodes if use_async and name in self.async_nodes else self.nodes
+        fn = nodes[name]
+        if isinstance(fn, str):
+            # Racing first calls import the same module; either result is fine
+            fn = nodes[name] = _resolve(fn)
+        return fn
+
+    def _checkpoints(self, state):
+        """Return (run_id, recorded outputs) for a run; run_id is None when not checkpointing."""
+        run_id = state.get("run_id") if self.checkpointer is not None else None
+        if run_id is None:
+            return None, {}
+        return run_id, self.checkpointer.load(run_id, state)
+
+    @staticmethod
+    def _arguments(triggered_by, state, outputs):
+        if len(triggered_by) > 1:
+            return tuple(outputs[name] for name in triggered_by)
+        return (dict(state),)
+
+    def _call(self, name, args, parent=None):
+        """Run one node synchronously; returns (output, elapsed ms)."""
+        start = time.perf_counter()
+        fn = self._node(name)
+        with _instrumented(name, parent):
+            if inspect.iscoroutinefunction(fn):
+                output = asyncio.run(fn(*args))
+            else:
+                output = fn(*args)
+        return output or {}, (time.perf_counter() - start) * 1000
+
+    async def _acall(self, name, args, parent=None):
+        start = time.perf_counter()
+        fn = self._node(name, use_async=True)
+        with _instrumented(name, parent):
+            if inspect.iscoroutinefunction(fn):
+                output = await fn(*args)
+            else:
+                loop = asyncio.get_running_loop()
+                ctx = contextvars.copy_context()
+                output = await loop.run_in_executor(self._executor, ctx.run, fn, *args)
+        return output or {}, (time.perf_counter() - start) * 1000
+
+    def run(self, input: Dict[str, Any]) -> GraphRun:
+        """Run the graph in the calling thread, fanning branches out to the pool."""
+        state = dict(input or {})
+        run_id, saved = self._checkpoints(state)
+        outputs: Dict[str, Any] = {}
+        timings: Dict[str, float] = {}
+        step = [(self.entry_node, [])]
+        step_no = 0
+        start = time.perf_counter()
+        with tracing.span("graph.run") as root:
+            try:
+                while step:
+                    todo = [(name, triggered_by) for name, triggered_by in step if (step_no, name) not in saved]
+                    args = [self._arguments(triggered_by, state, outputs) for _, triggered_by in todo]
+                    if len(todo) == 1 and not inspect.iscoroutinefunction(self._node(todo[0][0])):
+                        results = [self._call(todo[0][0], args[0], root)]
+                    else:
+                        futures = [
+                            self._executor.submit(contextvars.copy_context().run, self._call, name, node_args, root)
+                            for (name, _), node_args in zip(todo, args)
+                        ]
+                        results = [future.result() for future in futures]
+                    results = dict(zip((name for name, _ in todo), results))
+                    for name, _ in step:
+                        if name in results:
+                            output, elapsed = results[name]
+                            if run_id is not None:
+                                self.checkpointer.record(run_id, step_no, name, output, elapsed)
+                        else:
+                            output, elapsed = saved[(step_no, name)]
+                        outputs[name] = output
+                        timings[name] = elapsed
+                        state.update(output)
+                    step = self._next_step([name for name, _ in step], state)
+                    step_no += 1
+                if run_id is not None:
+                    self.checkpointer.finish(run_id)
+                if self.audit is not None:
+                    self.audit.record(state)
+            except Exception:
+                RUN_ERRORS.inc()
+                raise
+            finally:
+                RUN_LATENCY.observe(time.perf_counter() - start)
+        return GraphRun(state, timings)
+
+    async def astream_nodes(self, input: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Run the graph on the event loop, yielding an event per completed node.
+
+        Node events are {"event": "node", "node", "output", "elapsed_ms",
+        "state"} and arrive as soon as each node finishes, so parallel
+        branches report in completion order. Nodes replayed from a
+        checkpoint report first, with "resumed": True. The last event is
+        {"event": "end", "state", "timings"}.
+        """
+        state = dict(input or {})
+        run_id, saved = None, {}
+        if self.checkpointer is not None:
+            run_id, saved = await asyncio.to_thread(self._checkpoints, state)
+        outputs: Dict[str, Any] = {}
+        timings: Dict[str, float] = {}
+        step = [(self.entry_node, [])]
+        step_no = 0
+        start = time.perf_counter()
+        # The span is passed down explicitly rather than made current: an
+        # async generator shares its consumer's context across yields.
+        root = tracing.start_span("graph.run")
+        error = None
+        try:
+            while step:
+                tasks = {
+                    asyncio.ensure_future(self._acall(name, self._arguments(triggered_by, state, outputs), root)): name
+                    for name, triggered_by in step
+                    if (step_no, name) not in saved
+                }
+                pending = set(tasks)
+                try:
+                    for name, _ in step:
+                        if (step_no, name) in saved:
+                            output, elapsed = saved[(step_no, name)]
+                            outputs[name] = output
+                            timings[name] = elapsed
+                            state.update(output)
+                            yield {
+                                "event": "node", "node": name, "output": output,
+                                "elapsed_ms": elapsed, "state": dict(state), "resumed": True,
+                            }
+                    while pending:
+                        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            name = tasks[task]
+                            output, elapsed = task.result()
+                            outputs[name] = output
+                            timings[name] = elapsed
+                            state.update(output)
+                            if run_id is not None:
+                                self.checkpointer.record(run_id, step_no, name, output, elapsed)
+                            yield {
+                                "event": "node", "node": name, "output": output,
+                                "elapsed_ms": elapsed, "state": dict(state),
+                            }
+                finally:
+                    for task in pending:
+                        task.cancel()
+                # Merge in routing order so the final state does not depend on
+                # which parallel branch happened to finish first.
+                for name, _ in step:
+                    state.update(outputs[name])
+                step = self._next_step([name for name, _ in step], state)
+                step_no += 1
+            if run_id is not None:
+                self.checkpointer.finish(run_id)
+            if self.audit is not None:
+                self.audit.record(state)
+        except BaseException as exc:
+            error = exc
+            if isinstance(exc, Exception):
+                RUN_ERRORS.inc()
+            raise
+        finally:
+            RUN_LATENCY.observe(time.perf_counter() - start)
+            root.end(error)
+        yield {"event": "end", "state": state, "timings": timings}
+
+    async def arun(self, input: Dict[str, Any]) -> GraphRun:
+        """Run the graph on the event loop; sync nodes run in the thread pool."""
+        async for event in self.astream_nodes(input):
+            pass
+        return GraphRun(event["state"], event["timings"])
+
+    def invoke(self, input, config=None, **kwargs):
+        return self.run(input).state
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        return (await self.arun(input)).state
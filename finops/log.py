@@ -0,0 +1,114 @@
+"""Structured, level-filtered logging for the agents and the finops package.
+
+    logger = get_logger("mira")
+    logger.debug("budget check", extra={"project_id": project_id})
+
+Records are emitted as one JSON object per line on stderr: timestamp,
+level, logger, message, the current trace/span IDs and any extra fields.
+A call below FINOPS_LOG_LEVEL (default INFO) costs a single level check.
+Records that pass are handed to a queue, and a background listener thread
+formats and writes them, so request threads never block on stderr.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+ROOT = "finops"
+# Attributes every LogRecord has; anything else came from extra={...}
+_STANDARD = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_configured = False
+_configure_lock = threading.Lock()
+_handler = None
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Resolve everything that depends on the caller's thread before the
+        # record crosses to the listener; leave the JSON encoding to it.
+        from finops.tracing import current_span
+
+        span = current_span()
+        if span is not None:
+            record.trace_id = span.trace_id
+            record.span_id = span.span_id
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _configure():
+    global _configured, _handler, _listener
+    with _configure_lock:
+        if _configured:
+            return
+        root = logging.getLogger(ROOT)
+        root.setLevel(os.environ.get("FINOPS_LOG_LEVEL", "INFO").upper())
+        root.propagate = False
+        records = queue.SimpleQueue()
+        _handler = _QueueHandler(records)
+        root.addHandler(_handler)
+        output = logging.StreamHandler(sys.stderr)
+        output.setFormatter(JsonFormatter())
+        _listener = logging.handlers.QueueListener(records, output)
+        _listener.start()
+        _configured = True
+
+
+def shutdown():
+    """Write out queued records and stop the listener thread."""
+    global _configured, _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            logging.getLogger(ROOT).removeHandler(_handler)
+        _configured = False
+        _listener = None
+
+
+def _after_fork():
+    # The listener thread does not survive fork; give the child its own
+    global _configured, _configure_lock, _listener
+    _configure_lock = threading.Lock()
+    if _configured:
+        logging.getLogger(ROOT).removeHandler(_handler)
+        _configured = False
+        _listener = None
+        _configure()
+
+
+atexit.register(shutdown)
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def get_logger(name):
+    """Return the logger finops.<name>."""
+    if not _configured:
+        _configure()
+    return logging.getLogger(f"{ROOT}.{name}")
@@ -0,0 +1,166 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms are registered once at import time by the
+modules that own them and rendered by render() for the server's /metrics
+endpoint. Updates take one short lock per metric, so instrumenting a hot
+path costs a dict lookup and an add.
+
+    NODE_LATENCY = histogram("finops_node_latency_seconds", "...", ("node",))
+    NODE_LATENCY.observe(0.003, "mira")
+"""
+import bisect
+import math
+import threading
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return labels
+
+    def samples(self):
+        """Yield (suffix, label values, extra labels, value) tuples."""
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield "", labels, (), value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, labels, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+
+class Gauge(Metric):
+    """Settable gauge, or computed at scrape time if fn is given."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), fn=None):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        if self.fn is None:
+            yield from super().samples()
+            return
+        value = self.fn()
+        if value is not None:
+            yield "", (), (), value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[i] += 1
+            state[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(state)) for labels, state in self._values.items()]
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), state):
+                cumulative += count
+                yield "_bucket", labels, (("le", _format_value(bound)),), cumulative
+            yield "_sum", labels, (), state[-1]
+            yield "_count", labels, (), cumulative
+
+
+def _register(cls, name, *args, **kwargs):
+    with _metrics_lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name!r} is already registered as a {metric.kind}")
+    return metric
+
+
+def counter(name, help, labelnames=()):
+    return _register(Counter, name, help, labelnames)
+
+
+def gauge(name, help, labelnames=(), fn=None):
+    return _register(Gauge, name, help, labelnames, fn=fn)
+
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram, name, help, labelnames, buckets=buckets)
+
+
+def render():
+    """All registered metrics in the Prometheus text format (version 0.0.4)."""
+    with _metrics_lock:
+        metrics = list(_metrics.values())
+    return "\n".join(metric.render() for metric in metrics) + "\n"
@@ -0,0 +1,118 @@
+"""Typed purchase-order records.
+
+PurchaseOrder is one ledger row as a __slots__ object of native Python
+scalars (str and int), built straight from the ledger's column arrays
+instead of through a pandas Series, so a request allocates neither a
+Series nor numpy scalars and its state serializes to JSON as it is.
+sam puts a PurchaseOrder's as_state() fields into the graph state, and
+mira and jordan read them back with PurchaseOrder.from_state().
+
+PurchaseOrders is the batch form: one array per field over many rows, for
+the vectorized paths (see finops.batch).
+"""
+
+# (attribute, ledger column) in ledger column order
+FIELDS = (
+    ("project_id", "Project_ID"),
+    ("cost_center", "Cost_Center"),
+    ("supplier", "Supplier"),
+    ("po_amount", "PO_Requested"),
+    ("forecast_amount", "Forecast_Amount"),
+    ("actuals_amount", "Actuals_Amount"),
+    ("budget_remaining", "Budget_Remaining"),
+    ("compliance_flag", "Compliance_Flag"),
+    ("variance", "Variance"),
+)
+ATTRIBUTES = tuple(attribute for attribute, _ in FIELDS)
+COLUMNS = tuple(column for _, column in FIELDS)
+# The fields sam passes on to the rest of the workflow
+STATE_FIELDS = ("project_id", "po_amount", "cost_center", "supplier", "budget_remaining")
+
+_ATTRIBUTE = {column: attribute for attribute, column in FIELDS}
+
+
+def native(value):
+    """value as a plain Python scalar (numpy scalars are unwrapped)."""
+    return value.item() if hasattr(value, "item") else value
+
+
+class PurchaseOrder:
+    """One ledger row. Fields a workflow state does not carry are None."""
+
+    __slots__ = ATTRIBUTES
+
+    def __init__(self, project_id, cost_center, supplier, po_amount, forecast_amount=None,
+                 actuals_amount=None, budget_remaining=None, compliance_flag=None, variance=None):
+        self.project_id = project_id
+        self.cost_center = cost_center
+        self.supplier = supplier
+        self.po_amount = po_amount
+        self.forecast_amount = forecast_amount
+        self.actuals_amount = actuals_amount
+        self.budget_remaining = budget_remaining
+        self.compliance_flag = compliance_flag
+        self.variance = variance
+
+    @classmethod
+    def from_row(cls, row):
+        """Build from a mapping (dict, Series) keyed by ledger column."""
+        return cls(*(native(row[column]) for column in COLUMNS))
+
+    @classmethod
+    def from_state(cls, state):
+        """Build from the PO fields of a workflow state (see as_state()).
+
+        Raises KeyError if one is missing.
+        """
+        return cls(**{field: state[field] for field in STATE_FIELDS})
+
+    def as_state(self):
+        """The fields sam contributes to the workflow state."""
+        return {field: getattr(self, field) for field in STATE_FIELDS}
+
+    def to_dict(self):
+        """{ledger column: value}, like the row it was built from."""
+        return {column: getattr(self, attribute) for attribute, column in FIELDS}
+
+    def __getitem__(self, column):
+        # Lets code written against ledger rows read a record unchanged
+        return getattr(self, _ATTRIBUTE[column])
+
+    def __eq__(self, other):
+        if not isinstance(other, PurchaseOrder):
+            return NotImplemented
+        return all(getattr(self, attribute) == getattr(other, attribute) for attribute in ATTRIBUTES)
+
+    def __repr__(self):
+        fields = ", ".join(f"{attribute}={getattr(self, attribute)!r}" for attribute in ATTRIBUTES)
+        return f"PurchaseOrder({fields})"
+
+
+class PurchaseOrders:
+    """Many ledger rows as one array per PurchaseOrder field."""
+
+    __slots__ = ATTRIBUTES
+
+    def __init__(self, **arrays):
+        for attribute in ATTRIBUTES:
+            setattr(self, attribute, arrays[attribute])
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Arrays over the rows of a ledger frame (no copies of numeric columns)."""
+        return cls(**{attribute: frame[column].to_numpy() for attribute, column in FIELDS})
+
+    def __len__(self):
+        return len(self.project_id)
+
+    def __getitem__(self, i):
+        return PurchaseOrder(*(native(getattr(self, attribute)[i]) for attribute in ATTRIBUTES))
+
+    def __iter__(self):
+        columns = (getattr(self, attribute).tolist() for attribute in ATTRIBUTES)
+        return (PurchaseOrder(*values) for values in zip(*columns))
+
+    def states(self):
+        """as_state() of every row, as a list of dicts."""
+        columns = [getattr(self, field).tolist() for field in STATE_FIELDS]
+        return [dict(zip(STATE_FIELDS, values)) for values in zip(*columns)]
@@ -0,0 +1,46 @@
+"""Local stand-in for the external sanctions / vendor registry.
+
+The real registry is a network service; the stub simulates its round-trip
+latency (FINOPS_REGISTRY_LATENCY_MS) and answers from a comma-separated
+FINOPS_SANCTIONED_SUPPLIERS list.
+"""
+import asyncio
+import os
+import time
+
+
+class RegistryStub:
+    def __init__(self, sanctioned=(), latency_ms=0.0):
+        self.sanctioned = frozenset(sanctioned)
+        self.latency_ms = latency_ms
+
+    @classmethod
+    def from_env(cls):
+        sanctioned = os.environ.get("FINOPS_SANCTIONED_SUPPLIERS", "")
+        return cls(
+            sanctioned=[s.strip() for s in sanctioned.split(",") if s.strip()],
+            latency_ms=float(os.environ.get("FINOPS_REGISTRY_LATENCY_MS", "0")),
+        )
+
+    def _round_trip(self):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def is_sanctioned(self, supplier):
+        """Look up one supplier (one round trip)."""
+        self._round_trip()
+        return supplier in self.sanctioned
+
+    async def ais_sanctioned(self, supplier):
+        """Async is_sanctioned(); waits on the event loop, not a thread."""
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return supplier in self.sanctioned
+
+    def screen(self, suppliers):
+        """Return the sanctioned subset of suppliers (one round trip)."""
+        self._round_trip()
+        return {supplier for supplier in suppliers if supplier in self.sanctioned}
+
+
+registry = RegistryStub.from_env()
@@ -0,0 +1,96 @@
+"""Fast response encoding for the HTTP API.
+
+Routes that return plain dicts go through FastAPI's jsonable_encoder, which
+walks and copies the whole payload before the stdlib json encoder walks it
+again (and cannot encode numpy scalars). The hot routes instead return an
+ORJSONResponse, which encodes in one pass with orjson, numpy scalars and
+arrays included.
+
+Approval results can also be requested in two leaner shapes:
+
+- format=compact: only the decision fields of each state (COMPACT_FIELDS),
+  and for a list of states the field names once plus one row per state:
+  {"fields": [...], "rows": [[...], ...]}
+- format=ndjson (or Accept: application/x-ndjson), for bulk clients: one
+  full state per line, streamed as it is encoded, so neither side holds
+  the whole encoded response in memory.
+"""
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+
+OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+NDJSON = "application/x-ndjson"
+FORMATS = ("json", "compact", "ndjson")
+# States encoded per chunk of a streamed NDJSON response
+NDJSON_CHUNK = 1000
+
+COMPACT_FIELDS = (
+    "project_id", "approved", "reason", "po_amount", "budget_remaining",
+    "budget_ok", "compliance_ok", "variance", "variance_anomaly",
+)
+
+
+def dumps(value):
+    """Encode value as JSON bytes."""
+    return orjson.dumps(value, option=OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson (numpy values included)."""
+
+    def render(self, content):
+        return dumps(content)
+
+
+def response_format(request, format=None):
+    """The requested format: the format query parameter, else the Accept header.
+
+    Raises a 422 HTTPException for an unknown format.
+    """
+    if format is None:
+        return "ndjson" if NDJSON in request.headers.get("accept", "") else "json"
+    if format not in FORMATS:
+        raise HTTPException(status_code=422, detail=f"Unknown format; expected one of {', '.join(FORMATS)}")
+    return format
+
+
+def compact(state):
+    """The decision fields of one approval state."""
+    return {field: state.get(field) for field in COMPACT_FIELDS}
+
+
+def compact_rows(states):
+    """Approval states as {"fields": COMPACT_FIELDS, "rows": [[...], ...]}."""
+    return {
+        "fields": list(COMPACT_FIELDS),
+        "rows": [[state.get(field) for field in COMPACT_FIELDS] for state in states],
+    }
+
+
+def _ndjson_chunks(items):
+    lines = []
+    for item in items:
+        lines.append(dumps(item))
+        if len(lines) == NDJSON_CHUNK:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+def ndjson_response(items, headers=None):
+    """Stream items as newline-delimited JSON."""
+    return StreamingResponse(_ndjson_chunks(items), media_type=NDJSON, headers=headers)
+
+
+def states_response(states, format, metadata):
+    """Response for a list of approval states in the requested format.
+
+    json and compact wrap them as {"output": ..., "metadata": metadata};
+    ndjson streams one state per line and puts metadata in headers.
+    """
+    if format == "ndjson":
+        return ndjson_response(states, headers={f"X-FinOps-{key.title()}": str(value) for key, value in metadata.items()})
+    output = compact_rows(states) if format == "compact" else states
+    return ORJSONResponse({"output": output, "metadata": metadata})
@@ -0,0 +1,227 @@
+"""Pre-forking multi-worker server with state built once in the parent.
+
+serve() loads the ledger, compiles the compliance rules, builds the variance
+and approval aggregates and the app's lazily mounted routes (and with them
+the compiled graph, see finops.startup) in the parent process, then forks
+the workers. They share that state copy-on-write: the ledger's columns are memory-mapped from the
+columnar cache, and gc.freeze() keeps the collector from touching (and so
+copying) the parent's objects. Each worker runs uvicorn on the shared
+listening socket and, on Linux, is pinned to its own core.
+
+Budget reservations must be atomic across workers, so serve() switches the
+budget ledger to its shared SQLite mode (see finops.budget).
+
+Signals to the parent:
+
+- SIGHUP: graceful reload. The parent refreshes the ledger and rules, then
+  replaces the workers one at a time, starting each replacement and
+  waiting until it serves before the old one drains and exits.
+- SIGTERM / SIGINT: graceful shutdown; in-flight requests are finished.
+
+Workers that die are restarted.
+"""
+import gc
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+from finops import tracing
+from finops.approvals import get_approval_stats
+from finops.budget import get_budget_ledger
+from finops.compliance import get_engine
+from finops.log import get_logger, shutdown as shutdown_logging
+from finops.sources import SqliteSource, get_source
+from finops.startup import preload
+from finops.variance import get_analytics
+
+GRACEFUL_TIMEOUT = 30
+STARTUP_TIMEOUT = 60
+RESTART_BACKOFF = 1.0
+BACKLOG = 2048
+
+logger = get_logger("server")
+_context = multiprocessing.get_context("fork")
+
+
+def warm(app=None):
+    """Build the ledger view, compiled rules, aggregates and app routes that requests would otherwise build lazily."""
+    source = get_source()
+    source.refresh()
+    if not isinstance(source, SqliteSource):
+        source.frame()
+        source.page(limit=1)
+    get_engine().warm()
+    get_analytics().groups()
+    get_approval_stats().snapshot()
+    if app is not None:
+        preload(app)
+
+
+def readiness():
+    """Run the readiness checks; returns (ready, {check: "ok" or error})."""
+    checks = {}
+    for name, check in (("ledger", _check_ledger), ("rules", _check_rules), ("budget", _check_budget)):
+        try:
+            check()
+            checks[name] = "ok"
+        except Exception as exc:
+            checks[name] = f"{type(exc).__name__}: {exc}"
+    return all(result == "ok" for result in checks.values()), checks
+
+
+def _check_ledger():
+    source = get_source()
+    source.refresh()
+    if isinstance(source, SqliteSource):
+        with source.pool.connection() as conn:
+            conn.execute("SELECT 1 FROM ledger LIMIT 1").fetchall()
+    else:
+        source.frame()
+
+
+def _check_rules():
+    get_engine().rules()
+
+
+def _check_budget():
+    get_budget_ledger().version("")
+
+
+class _WorkerServer(uvicorn.Server):
+    """uvicorn server that reports when it has started listening."""
+
+    def __init__(self, config, ready):
+        super().__init__(config)
+        self._ready = ready
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets=sockets)
+        if not self.should_exit:
+            self._ready.set()
+
+
+def _run_worker(app, sock, cpu, ready, options):
+    # uvicorn installs its own SIGTERM/SIGINT handlers while serving and
+    # re-raises the signal afterwards; ignoring it then lets us exit cleanly.
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+    try:
+        _WorkerServer(uvicorn.Config(app, **options), ready).run(sockets=[sock])
+    finally:
+        tracing.flush()
+        shutdown_logging()
+
+
+def _listen(host, port):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Arbiter:
+    """Parent process: forks, supervises, reloads and stops the workers."""
+
+    def __init__(self, app, host, port, workers, pin_cores=True, **uvicorn_options):
+        self.app = app
+        self.workers = workers
+        self.sock = _listen(host, port)
+        self.options = {"timeout_graceful_shutdown": GRACEFUL_TIMEOUT, **uvicorn_options}
+        self.cpus = sorted(os.sched_getaffinity(0)) if pin_cores and hasattr(os, "sched_setaffinity") else None
+        self.procs = {}    # slot -> Process
+        self.started = {}  # slot -> monotonic start time
+        self._reload = False
+        self._stop = False
+
+    def _cpu(self, slot):
+        return self.cpus[slot % len(self.cpus)] if self.cpus else None
+
+    def _prepare(self):
+        gc.unfreeze()
+        warm(self.app)
+        gc.collect()
+        gc.freeze()
+
+    def _spawn(self, slot):
+        ready = _context.Event()
+        proc = _context.Process(
+            target=_run_worker,
+            args=(self.app, self.sock, self._cpu(slot), ready, self.options),
+            name=f"finops-worker-{slot}",
+        )
+        proc.start()
+        self.started[slot] = time.monotonic()
+        logger.info("worker started", extra={"slot": slot, "pid": proc.pid, "cpu": self._cpu(slot)})
+        return proc, ready
+
+    def _retire(self, proc):
+        proc.terminate()
+        proc.join(GRACEFUL_TIMEOUT + 5)
+        if proc.is_alive():
+            logger.warning("worker did not stop in time; killing", extra={"pid": proc.pid})
+            proc.kill()
+            proc.join()
+
+    def _reload_workers(self):
+        logger.info("reloading")
+        self._prepare()
+        for slot in list(self.procs):
+            old = self.procs[slot]
+            proc, ready = self._spawn(slot)
+            if not ready.wait(STARTUP_TIMEOUT):
+                logger.error("replacement worker failed to start; keeping the old one", extra={"slot": slot})
+                self._retire(proc)
+                continue
+            self.procs[slot] = proc
+            self._retire(old)
+        logger.info("reload complete")
+
+    def _on_signal(self, sig, frame):
+        if sig == signal.SIGHUP:
+            self._reload = True
+        else:
+            self._stop = True
+
+    def run(self):
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self._on_signal)
+        self._prepare()
+        for slot in range(self.workers):
+            self.procs[slot], _ = self._spawn(slot)
+        try:
+            while not self._stop:
+                if self._reload:
+                    self._reload = False
+                    self._reload_workers()
+                for slot, proc in list(self.procs.items()):
+                    if proc.is_alive() or self._stop:
+                        continue
+                    logger.warning("worker exited; restarting", extra={"slot": slot, "exitcode": proc.exitcode})
+                    if time.monotonic() - self.started[slot] < RESTART_BACKOFF:
+                        time.sleep(RESTART_BACKOFF)
+                    self.procs[slot], _ = self._spawn(slot)
+                time.sleep(0.2)
+        finally:
+            logger.info("shutting down", extra={"workers": len(self.procs)})
+            for proc in self.procs.values():
+                proc.terminate()
+            for proc in self.procs.values():
+                proc.join(GRACEFUL_TIMEOUT + 5)
+                if proc.is_alive():
+                    proc.kill()
+            self.sock.close()
+
+
+def serve(app, host="0.0.0.0", port=8000, workers=2, pin_cores=True, **uvicorn_options):
+    """Serve app with workers pre-forked uvicorn processes (see module docstring)."""
+    os.environ["FINOPS_BUDGET_SHARED"] = "1"
+    Arbiter(app, host, port, workers, pin_cores, **uvicorn_options).run()
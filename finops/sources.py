@@ -0,0 +1,338 @@
+"""Pluggable project-ledger data sources.
+
+sam, taylor, the compliance engine and the batch evaluator read the ledger
+through get_source(), which returns either:
+
+- the in-memory ProjectStore over data.csv (FINOPS_DATA_SOURCE=csv, the
+  default), or
+- a SqliteSource over an indexed SQLite copy of the ledger
+  (FINOPS_DATA_SOURCE=sqlite, database at FINOPS_SQLITE_PATH), for
+  ledgers too large to hold as a pandas frame in every worker.
+
+Both offer get(project_id), record(project_id) (the row as a
+PurchaseOrder, see finops.records), select(project_ids, cost_center),
+page(prefix, cost_center, after, limit), frame(), frames(),
+flagged_projects(), append(rows), refresh() and subscribe(listener).
+frames() yields the ledger a chunk at a time, so whole-ledger aggregates
+(finops.variance, finops.approvals) never hold a SqliteSource's table as
+one frame.
+
+Build the SQLite database from the CSV with
+
+    python -m finops.sources [data.csv] [ledger.sqlite3]
+"""
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from finops import tenants
+from finops.columnar import CATEGORICAL_COLUMNS, SEPARATOR
+from finops.records import PurchaseOrder
+from finops.store import DEFAULT_DATA_PATH, PREFIX_END, get_store
+
+DEFAULT_SQLITE_PATH = DEFAULT_DATA_PATH.with_name("ledger.sqlite3")
+POOL_SIZE = 8
+# SQLite's default limit on host parameters per statement is 999
+MAX_PARAMS = 900
+BUILD_CHUNK_ROWS = 100_000
+# Rows per frame yielded by SqliteSource.frames()
+FRAME_CHUNK_ROWS = 100_000
+
+COLUMNS = (
+    "Project_ID", "Cost_Center", "Supplier", "PO_Requested", "Forecast_Amount",
+    "Actuals_Amount", "Budget_Remaining", "Compliance_Flag", "Variance",
+)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ledger (
+    Project_ID TEXT PRIMARY KEY,
+    Cost_Center TEXT NOT NULL,
+    Supplier TEXT NOT NULL,
+    PO_Requested INTEGER NOT NULL,
+    Forecast_Amount INTEGER NOT NULL,
+    Actuals_Amount INTEGER NOT NULL,
+    Budget_Remaining INTEGER NOT NULL,
+    Compliance_Flag INTEGER NOT NULL,
+    Variance INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ledger_cost_center_supplier ON ledger (Cost_Center, Supplier);
+CREATE INDEX IF NOT EXISTS ledger_compliance_flag ON ledger (Compliance_Flag) WHERE Compliance_Flag != 0;
+"""
+
+# Statements are kept as constants so each pooled connection compiles them
+# once and reuses the prepared form from its statement cache.
+_SELECT = f"SELECT {', '.join(COLUMNS)} FROM ledger"
+GET_SQL = f"{_SELECT} WHERE Project_ID = ?"
+COST_CENTER_SQL = f"{_SELECT} WHERE Cost_Center = ?"
+FLAGGED_SQL = "SELECT Project_ID FROM ledger WHERE Compliance_Flag != 0"
+UPSERT_SQL = f"INSERT OR REPLACE INTO ledger VALUES ({', '.join('?' * len(COLUMNS))})"
+TEXT_COLUMNS = ("Project_ID", "Cost_Center", "Supplier")
+BUSY_TIMEOUT = 30
+
+
+def build_sqlite(csv_path, db_path):
+    """Load the tab-separated ledger at csv_path into an indexed database."""
+    import pandas as pd
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    with conn:
+        conn.executescript(SCHEMA)
+        for chunk in pd.read_csv(csv_path, sep=SEPARATOR, chunksize=BUILD_CHUNK_ROWS):
+            conn.executemany(UPSERT_SQL, chunk[list(COLUMNS)].itertuples(index=False, name=None))
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+class ConnectionPool:
+    """Bounded pool of read-only connections shared by a process's threads."""
+
+    def __init__(self, db_path, size=POOL_SIZE):
+        self.db_path = Path(db_path)
+        self.size = size
+        self._reset()
+
+    def _reset(self):
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro", uri=True,
+            check_same_thread=False, cached_statements=64,
+        )
+        conn.execute("PRAGMA query_only=ON")
+        conn.execute("PRAGMA mmap_size=268435456")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        if self._pid != os.getpid():
+            # Forked worker: SQLite connections must not cross a fork
+            self._reset()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            conn = self._connect() if create else self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+
+class SqliteSource:
+    """Ledger source answering lookups from indexed SQLite queries."""
+
+    def __init__(self, path, pool_size=POOL_SIZE):
+        self.path = Path(path)
+        self.version = 0
+        self.pool = ConnectionPool(self.path, pool_size)
+        self._lock = threading.Lock()
+        self._signature = self._stat_signature()
+        self._listeners = []
+
+    def _stat_signature(self):
+        signature = []
+        for suffix in ("", "-wal"):
+            try:
+                stat = os.stat(f"{self.path}{suffix}")
+            except FileNotFoundError:
+                stat = None
+            # Opening the first connection creates an empty WAL, which is
+            # not a change to the ledger
+            if stat is None or (suffix and not stat.st_size):
+                signature.append(None)
+            else:
+                signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    @property
+    def signature(self):
+        """Identifies the database contents as of the last refresh(), across source instances."""
+        return self._signature
+
+    def subscribe(self, listener):
+        """Call listener(None) whenever the database file changes."""
+        self._listeners.append(listener)
+
+    def refresh(self):
+        """Notice writes by other processes; returns True if the database changed.
+
+        Reads call this first, like ProjectStore's, so signature and the
+        aggregates built on the source follow the file.
+        """
+        signature = self._stat_signature()
+        if signature == self._signature:
+            return False
+        with self._lock:
+            if signature == self._signature:
+                return False
+            self._signature = signature
+            self.version += 1
+            for listener in self._listeners:
+                listener(None)
+            return True
+
+    def get(self, project_id):
+        """Return the ledger row for project_id; raises KeyError if absent."""
+        self.refresh()
+        with self.pool.connection() as conn:
+            row = conn.execute(GET_SQL, (project_id,)).fetchone()
+        if row is None:
+            raise KeyError(project_id)
+        return dict(zip(COLUMNS, row))
+
+    def record(self, project_id):
+        """Return the ledger row for project_id as a PurchaseOrder; raises KeyError if absent."""
+        return PurchaseOrder.from_row(self.get(project_id))
+
+    def __contains__(self, project_id):
+        try:
+            self.get(project_id)
+        except KeyError:
+            return False
+        return True
+
+    def _frame(self, rows):
+        # Not imported at module level, to keep importing sources cheap
+        import pandas as pd
+
+        frame = pd.DataFrame.from_records(rows, columns=COLUMNS)
+        for name in CATEGORICAL_COLUMNS:
+            frame[name] = frame[name].astype("category")
+        return frame.set_index("Project_ID", drop=False)
+
+    def select(self, project_ids=None, cost_center=None):
+        """Return the rows for project_ids and/or a cost center as a frame.
+
+        Raises KeyError listing any project IDs missing from the ledger.
+        """
+        if project_ids is None and cost_center is None:
+            return self.frame()
+        self.refresh()
+        with self.pool.connection() as conn:
+            if project_ids is None:
+                rows = conn.execute(COST_CENTER_SQL, (cost_center,)).fetchall()
+                return self._frame(rows)
+            unique = list(dict.fromkeys(project_ids))
+            rows = []
+            for start in range(0, len(unique), MAX_PARAMS):
+                chunk = unique[start:start + MAX_PARAMS]
+                sql = f"{_SELECT} WHERE Project_ID IN ({', '.join('?' * len(chunk))})"
+                rows.extend(conn.execute(sql, chunk).fetchall())
+        frame = self._frame(rows)
+        missing = [pid for pid in unique if pid not in frame.index]
+        if missing:
+            raise KeyError(f"Unknown project IDs: {', '.join(missing)}")
+        frame = frame.loc[list(project_ids)]
+        if cost_center is not None:
+            frame = frame[frame["Cost_Center"] == cost_center]
+        return frame
+
+    def page(self, prefix="", cost_center=None, after=None, limit=50):
+        """Return up to limit rows in Project_ID order (see ProjectStore.page)."""
+        conditions = []
+        params = []
+        if prefix:
+            conditions.append("Project_ID >= ? AND Project_ID < ?")
+            params += [prefix, prefix + PREFIX_END]
+        if after is not None:
+            conditions.append("Project_ID > ?")
+            params.append(after)
+        if cost_center is not None:
+            # Unary + keeps the planner walking the primary key in order
+            # instead of sorting every row of the cost center by index
+            conditions.append("+Cost_Center = ?")
+            params.append(cost_center)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        self.refresh()
+        with self.pool.connection() as conn:
+            rows = conn.execute(f"{_SELECT}{where} ORDER BY Project_ID LIMIT ?", params + [limit]).fetchall()
+        return self._frame(rows)
+
+    def append(self, rows):
+        """Upsert ledger rows (dicts keyed by column) by Project_ID.
+
+        Returns the number of rows written; raises ValueError, writing
+        nothing, if a row is missing columns or has a non-integer amount.
+        """
+        missing = [name for name in COLUMNS if any(name not in row for row in rows)]
+        if missing:
+            raise ValueError(f"Rows are missing ledger columns: {', '.join(sorted(set(missing)))}")
+        records = []
+        for row in rows:
+            try:
+                records.append([
+                    str(row[name]) if name in TEXT_COLUMNS else int(row[name]) for name in COLUMNS
+                ])
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Invalid ledger row {row.get('Project_ID')!r}: {e}") from e
+        # The pool's connections are read-only
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+        try:
+            with conn:
+                conn.executemany(UPSERT_SQL, records)
+        finally:
+            conn.close()
+        self.refresh()
+        return len(rows)
+
+    def frame(self):
+        """Return the whole ledger as a frame (avoid on very large ledgers)."""
+        self.refresh()
+        with self.pool.connection() as conn:
+            return self._frame(conn.execute(_SELECT).fetchall())
+
+    def frames(self, chunk_rows=FRAME_CHUNK_ROWS):
+        """Yield the whole ledger as frames of up to chunk_rows rows."""
+        self.refresh()
+        with self.pool.connection() as conn:
+            cursor = conn.execute(_SELECT)
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    return
+                yield self._frame(rows)
+
+    def flagged_projects(self):
+        self.refresh()
+        with self.pool.connection() as conn:
+            return {project_id for (project_id,) in conn.execute(FLAGGED_SQL)}
+
+
+_sources = {}
+_sources_lock = threading.Lock()
+tenants.on_evict(lambda tenant: _sources.pop(tenant.sqlite_path, None))
+
+
+def get_source():
+    """Return the configured ledger source (see module docstring) of the current tenant."""
+    kind = os.environ.get("FINOPS_DATA_SOURCE", "csv")
+    if kind == "csv":
+        return get_store()
+    if kind != "sqlite":
+        raise ValueError(f"Unknown FINOPS_DATA_SOURCE {kind!r}; expected 'csv' or 'sqlite'")
+    path = Path(tenants.setting("sqlite_path") or os.environ.get("FINOPS_SQLITE_PATH", DEFAULT_SQLITE_PATH)).resolve()
+    source = _sources.get(path)
+    if source is None:
+        with _sources_lock:
+            source = _sources.get(path)
+            if source is None:
+                source = _sources[path] = SqliteSource(path)
+    return source
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("FINOPS_DATA_PATH", DEFAULT_DATA_PATH)
+    db_path = sys.argv[2] if len(sys.argv) > 2 else os.environ.get("FINOPS_SQLITE_PATH", DEFAULT_SQLITE_PATH)
+    build_sqlite(csv_path, db_path)
+    print(f"Built {db_path} from {csv_path}")
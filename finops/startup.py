@@ -0,0 +1,116 @@
+"""Cold-start support: lazily built sub-apps and an import-time profile.
+
+Importing langgraph_server used to cost well over a second before the
+first request could be served, most of it in langserve (and the langsmith
+and langchain_core modules it pulls in) and pandas, plus every agent and
+the compiled graph. Now:
+
+- the langserve routes are a LazyApp mounted at /finops-workflow, built
+  on the first request under that prefix (or by preload(), which the
+  pre-forking server calls in the parent so workers inherit it);
+- main.graph is compiled on first access, and its nodes import their
+  agent modules on first call;
+- pandas is imported by the ledger modules only when a ledger is loaded.
+
+Measure what is still paid at import time with
+
+    python -m finops.startup [module] [--top 15]
+
+which imports module (langgraph_server by default) in a fresh interpreter
+under -X importtime and reports the wall-clock import time, the time per
+top-level package and the slowest individual modules.
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import threading
+import time
+
+DEFAULT_MODULE = "langgraph_server"
+
+
+class LazyApp:
+    """ASGI app that calls factory() to build the real app on its first request."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._app = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Build the app now (idempotent); returns it."""
+        if self._app is None:
+            with self._lock:
+                if self._app is None:
+                    self._app = self.factory()
+        return self._app
+
+    async def __call__(self, scope, receive, send):
+        app = self._app
+        if app is None:
+            # Building imports modules for a second or so; keep the event
+            # loop serving other requests meanwhile.
+            app = await asyncio.to_thread(self.load)
+        await app(scope, receive, send)
+
+
+def preload(app):
+    """Build every LazyApp mounted (at any depth) on app."""
+    for route in getattr(app, "routes", ()):
+        mounted = getattr(route, "app", None)
+        if isinstance(mounted, LazyApp):
+            preload(mounted.load())
+        elif mounted is not None:
+            preload(mounted)
+
+
+def profile(module=DEFAULT_MODULE):
+    """Import module in a fresh interpreter.
+
+    Returns (wall-clock seconds, [(module name, self us, cumulative us)]).
+    """
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    seconds = float(result.stdout.strip().splitlines()[-1]) if result.stdout.strip() else elapsed
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return seconds, modules
+
+
+def report(module=DEFAULT_MODULE, top=15):
+    """Format the import profile of module as text."""
+    seconds, modules = profile(module)
+    packages = {}
+    for name, self_us, _ in modules:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    lines = [f"import {module}: {seconds * 1000:.0f} ms ({len(modules)} modules)", "", "by package (self time):"]
+    for package, us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {us / 1000:8.1f} ms  {package}")
+    lines += ["", "slowest modules (self / cumulative):"]
+    for name, self_us, cumulative_us in sorted(modules, key=lambda item: -item[1])[:top]:
+        lines.append(f"  {self_us / 1000:8.1f} ms  {cumulative_us / 1000:8.1f} ms  {name}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report where importing a module spends its time")
+    parser.add_argument("module", nargs="?", default=DEFAULT_MODULE)
+    parser.add_argument("--top", type=int, default=15, help="packages and modules to list")
+    args = parser.parse_args(argv)
+    print(report(args.module, args.top))
+
+
+if __name__ == "__main__":
+    main()
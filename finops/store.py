@@ -0,0 +1,366 @@
+"""Process-wide, Project_ID-indexed view of the project ledger.
+
+Agents used to parse data.csv on every call. The store loads it once per
+process, from the memory-mapped columnar cache (see finops.columnar), and
+after that only ingests what changed:
+
+- Rows appended to data.csv (by finance's export or by append()) are
+  tailed from the last consumed byte offset, so ingesting k new rows
+  costs O(k) whatever the ledger size.
+- A later row for an existing Project_ID replaces the earlier one.
+- A change that does not look like an append (the file shrank, kept its
+  size, or its bytes just before the offset changed) triggers a full
+  reload.
+
+Ingested rows live in a small overlay on top of the mapped base frame.
+Point lookups check the overlay first; record() reads a base row straight
+from the column arrays into a PurchaseOrder (see finops.records). frame() merges the two on demand,
+and the overlay is folded into the base once it grows large.
+
+page() lists projects in Project_ID order, a page at a time, from a sorted
+index of the base frame (built once per base) merged with the sorted
+overlay IDs, so browsing and prefix search never sort or scan the ledger.
+"""
+import bisect
+import csv
+import heapq
+import io
+import itertools
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from finops import tenants
+from finops.columnar import CATEGORICAL_COLUMNS, SEPARATOR, load_ledger
+from finops.records import COLUMNS as RECORD_COLUMNS, PurchaseOrder, native
+
+DEFAULT_DATA_PATH = Path(__file__).resolve().parent.parent / "data.csv"
+
+# Bytes just before the consumed offset that must be unchanged for the
+# file to count as appended-to rather than rewritten.
+FINGERPRINT_BYTES = 64
+# Fold the overlay into the base frame once it exceeds this share of it.
+COMPACT_RATIO = 0.1
+# Sorted base positions examined per step when filtering a page
+PAGE_SCAN_ROWS = 4096
+# Sorts after every Project_ID that starts with a given prefix
+PREFIX_END = "\U0010ffff"
+
+
+class ProjectStore:
+    """Ledger indexed on Project_ID for O(1) lookups, updated incrementally."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.version = 0
+        self._lock = threading.RLock()
+        self._signature = None
+        self._offset = 0
+        self._fingerprint = b""
+        self._base = None
+        self._overlay = {}
+        self._overlay_ids = []  # sorted keys of _overlay
+        self._sorted = None     # (base, sorted Project_IDs, their positions in base)
+        self._record_columns = None  # (base, [(categories or None, values)] per record field)
+        self._merged = None
+        self._casts = {}
+        self._listeners = []
+
+    def _stat_signature(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    @property
+    def signature(self):
+        """Identifies the file contents the store reflects, across store instances."""
+        return self._signature
+
+    def subscribe(self, listener):
+        """Call listener(rows) after each change.
+
+        rows is the list of ingested row dicts, or None after a full reload
+        (listeners should then rebuild from frame()).
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, rows):
+        self.version += 1
+        for listener in self._listeners:
+            listener(rows)
+
+    def _read_fingerprint(self, f, offset):
+        start = max(0, offset - FINGERPRINT_BYTES)
+        f.seek(start)
+        return f.read(offset - start)
+
+    def _load(self, size):
+        # Imported here rather than at module level so that importing the
+        # store (for DEFAULT_DATA_PATH, say) stays cheap; see finops.startup
+        import pandas as pd
+
+        df = load_ledger(self.path)
+        df = df.drop_duplicates("Project_ID", keep="last")
+        self._base = df.set_index("Project_ID", drop=False)
+        self._overlay = {}
+        self._overlay_ids = []
+        self._merged = None
+        self._casts = {
+            name: float if pd.api.types.is_float_dtype(dtype) else int
+            for name, dtype in df.dtypes.items()
+            if pd.api.types.is_numeric_dtype(dtype)
+        }
+        with open(self.path, "rb") as f:
+            self._fingerprint = self._read_fingerprint(f, size)
+        self._offset = size
+
+    def _parse(self, text):
+        columns = list(self._base.columns)
+        rows = []
+        for values in csv.reader(io.StringIO(text), delimiter=SEPARATOR):
+            if not values:
+                continue
+            row = dict(zip(columns, values))
+            for name, cast in self._casts.items():
+                row[name] = cast(row[name])
+            rows.append(row)
+        return rows
+
+    def _tail(self, size):
+        """Ingest complete lines appended since the last offset.
+
+        Returns the ingested rows, or None if the file was rewritten.
+        """
+        with open(self.path, "rb") as f:
+            if size <= self._offset or self._read_fingerprint(f, self._offset) != self._fingerprint:
+                return None
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        # Leave a partially written last line for the next refresh
+        end = chunk.rfind(b"\n") + 1
+        rows = self._parse(chunk[:end].decode("utf-8"))
+        self._offset += end
+        self._fingerprint = (self._fingerprint + chunk[:end])[-FINGERPRINT_BYTES:]
+        self._upsert(rows)
+        return rows
+
+    def _upsert(self, rows):
+        for row in rows:
+            if row["Project_ID"] not in self._overlay:
+                bisect.insort(self._overlay_ids, row["Project_ID"])
+            self._overlay[row["Project_ID"]] = row
+        self._merged = None
+        if len(self._overlay) > COMPACT_RATIO * max(len(self._base), 1000):
+            self._base = self._merge()
+            self._overlay = {}
+            self._overlay_ids = []
+
+    def _merge(self):
+        import pandas as pd
+
+        if not self._overlay:
+            return self._base
+        overlay = pd.DataFrame(list(self._overlay.values()), columns=self._base.columns)
+        overlay = overlay.set_index("Project_ID", drop=False)
+        base = self._base[~self._base.index.isin(overlay.index)]
+        merged = pd.concat([base, overlay])
+        for name in CATEGORICAL_COLUMNS:
+            merged[name] = merged[name].astype("category")
+        return merged
+
+    def refresh(self):
+        """Bring the store up to date with the file; returns True if it changed."""
+        signature = self._stat_signature()
+        if signature == self._signature:
+            return False
+        with self._lock:
+            if signature == self._signature:
+                return False
+            rows = None
+            if self._base is not None:
+                rows = self._tail(signature[1])
+            if rows is None:
+                self._load(signature[1])
+            self._signature = signature
+            if rows != []:
+                self._notify(rows)
+            return True
+
+    def append(self, rows):
+        """Append ledger rows (dicts keyed by column) to the file and ingest them.
+
+        A row whose Project_ID already exists replaces it. Returns the
+        number of rows ingested.
+        """
+        with self._lock:
+            self.refresh()
+            columns = list(self._base.columns)
+            missing = [name for name in columns if any(name not in row for row in rows)]
+            if missing:
+                raise ValueError(f"Rows are missing ledger columns: {', '.join(sorted(set(missing)))}")
+            # Validate before writing so a bad row never reaches the file
+            records = []
+            for row in rows:
+                try:
+                    records.append([
+                        self._casts[name](row[name]) if name in self._casts else row[name]
+                        for name in columns
+                    ])
+                except (TypeError, ValueError) as e:
+                    raise ValueError(f"Invalid ledger row {row.get('Project_ID')!r}: {e}") from e
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, delimiter=SEPARATOR, lineterminator="\n")
+            writer.writerows(records)
+            with open(self.path, "ab") as f:
+                f.write(buffer.getvalue().encode("utf-8"))
+            self.refresh()
+        return len(rows)
+
+    def frame(self):
+        """Return the current ledger DataFrame, indexed on Project_ID."""
+        self.refresh()
+        merged = self._merged
+        if merged is None:
+            with self._lock:
+                merged = self._merged = self._merge()
+        return merged
+
+    def frames(self):
+        """Yield the ledger as frames; the store already holds it, so as one frame."""
+        yield self.frame()
+
+    def get(self, project_id):
+        """Return the ledger row for project_id; raises KeyError if absent."""
+        self.refresh()
+        row = self._overlay.get(project_id)
+        if row is not None:
+            return row
+        return self._base.loc[project_id]
+
+    def _columns(self, base):
+        cached = self._record_columns
+        if cached is None or cached[0] is not base:
+            columns = []
+            for name in RECORD_COLUMNS:
+                series = base[name]
+                if name in CATEGORICAL_COLUMNS:
+                    columns.append((series.cat.categories.tolist(), series.cat.codes.to_numpy()))
+                else:
+                    columns.append((None, series.to_numpy()))
+            cached = self._record_columns = (base, columns)
+        return cached[1]
+
+    def record(self, project_id):
+        """Return the ledger row for project_id as a PurchaseOrder; raises KeyError if absent."""
+        self.refresh()
+        row = self._overlay.get(project_id)
+        if row is not None:
+            return PurchaseOrder.from_row(row)
+        base = self._base
+        position = base.index.get_loc(project_id)
+        return PurchaseOrder(*(
+            categories[values[position]] if categories is not None else native(values[position])
+            for categories, values in self._columns(base)
+        ))
+
+    def __contains__(self, project_id):
+        self.refresh()
+        return project_id in self._overlay or project_id in self._base.index
+
+    def select(self, project_ids=None, cost_center=None):
+        """Return the rows for project_ids and/or a cost center as a frame.
+
+        Raises KeyError listing any project IDs missing from the ledger.
+        """
+        frame = self.frame()
+        if project_ids is not None:
+            missing = [pid for pid in dict.fromkeys(project_ids) if pid not in frame.index]
+            if missing:
+                raise KeyError(f"Unknown project IDs: {', '.join(missing)}")
+            frame = frame.loc[list(project_ids)]
+        if cost_center is not None:
+            frame = frame[frame["Cost_Center"] == cost_center]
+        return frame
+
+    def _sorted_index(self):
+        if self._sorted is None or self._sorted[0] is not self._base:
+            ids = self._base.index.to_numpy()
+            order = np.argsort(ids, kind="stable")
+            self._sorted = (self._base, ids[order], order)
+        return self._sorted[1:]
+
+    def page(self, prefix="", cost_center=None, after=None, limit=50):
+        """Return up to limit rows, in Project_ID order, as a frame.
+
+        Only projects whose ID starts with prefix (and that belong to
+        cost_center, if given) are listed; after continues from the last
+        Project_ID of the previous page.
+        """
+        import pandas as pd
+
+        self.refresh()
+        start = max(prefix, after) if after is not None else prefix
+        end = prefix + PREFIX_END if prefix else None
+        with self._lock:
+            ids, order = self._sorted_index()
+            overlay = self._overlay
+            side = "right" if after is not None and after >= prefix else "left"
+            lo = int(np.searchsorted(ids, start, side=side))
+            hi = int(np.searchsorted(ids, end)) if end is not None else len(ids)
+            code = None
+            if cost_center is not None:
+                code = self._base["Cost_Center"].cat.categories.get_indexer([cost_center])[0]
+                codes = self._base["Cost_Center"].cat.codes.to_numpy()
+
+            def base_ids():
+                # Rows replaced by the overlay are listed from there
+                for block in range(lo, hi, PAGE_SCAN_ROWS):
+                    stop = min(hi, block + PAGE_SCAN_ROWS)
+                    candidates = ids[block:stop]
+                    if code is not None:
+                        candidates = candidates[codes[order[block:stop]] == code]
+                    for project_id in candidates.tolist():
+                        if project_id not in overlay:
+                            yield project_id
+
+            def overlay_ids():
+                k = (bisect.bisect_right if side == "right" else bisect.bisect_left)(self._overlay_ids, start)
+                for project_id in itertools.islice(self._overlay_ids, k, None):
+                    if end is not None and project_id >= end:
+                        return
+                    if cost_center is None or overlay[project_id]["Cost_Center"] == cost_center:
+                        yield project_id
+
+            if code == -1:
+                page = list(itertools.islice(overlay_ids(), limit))
+            else:
+                page = list(itertools.islice(heapq.merge(base_ids(), overlay_ids()), limit))
+            # Assemble the page directly rather than through frame(), which
+            # would merge the whole overlay into a new frame
+            frame = self._base.loc[[project_id for project_id in page if project_id not in overlay]]
+            replaced = [overlay[project_id] for project_id in page if project_id in overlay]
+        if replaced:
+            replaced = pd.DataFrame(replaced, columns=frame.columns).set_index("Project_ID", drop=False)
+            frame = pd.concat([frame.astype(object), replaced.astype(object)]).loc[page]
+        return frame
+
+    def flagged_projects(self):
+        """Return the set of Project_IDs with a non-zero Compliance_Flag."""
+        frame = self.frame()
+        return set(frame.index[frame["Compliance_Flag"].to_numpy() != 0])
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+tenants.on_evict(lambda tenant: _stores.pop(tenant.data_path, None))
+
+
+def get_store(path=None):
+    """Return the shared store for path (the current tenant's ledger, FINOPS_DATA_PATH or data.csv)."""
+    path = Path(path or tenants.setting("data_path") or os.environ.get("FINOPS_DATA_PATH", DEFAULT_DATA_PATH)).resolve()
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(path, ProjectStore(path))
+    return store
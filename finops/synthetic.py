@@ -0,0 +1,193 @@
+"""Synthetic project ledgers in the data.csv schema, for scale testing.
+
+Rows are generated and written in fixed-size chunks, so memory stays
+bounded however many rows are requested:
+
+    python -m finops.synthetic ledger_50m.csv --rows 50000000
+
+The amounts follow the relationships of the real ledger
+(Budget_Remaining = Forecast_Amount - PO_Requested,
+Variance = Actuals_Amount - Forecast_Amount, actuals within 20% of
+forecast). Cost centers and suppliers are drawn from a Zipf-like
+distribution (--skew, 0 for uniform), so a few of them dominate as in
+production.
+
+Each row is given an intended workflow outcome, with the default rules
+and no outstanding budget reservations:
+
+- approved: the PO fits the remaining budget and the supplier passes
+- budget: the PO exceeds the remaining budget ("Budget exceeded")
+- compliance: the PO fits but the supplier is on the blocklist
+  ("Compliance issue")
+
+in the ratio given by --approval-rate and --compliance-rejection-rate;
+the rest are budget rejections.
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from finops.columnar import SEPARATOR
+from finops.sources import COLUMNS
+
+COST_CENTERS = ("Finance", "HR", "Logistics", "Marketing", "Operations", "Sales", "Technology")
+# Spelled exactly as they appear in data.csv
+SUPPLIERS = (
+    "Anthrax", "Dio", "Iron Maiden", "Judas Priest", "Manowar", "Megadeth", "Metallica",
+    "Mot√∂rhead", "Pantera", "Queensr√øche", "Saxon", "Slayer", "Twisted Sister", "Venom",
+    "W.A.S.P.",
+)
+BLOCKED_SUPPLIERS = ("VendorY",)
+CHUNK_ROWS = 500_000
+
+FORECAST_RANGE = (10_000, 100_000)
+PO_RANGE = (5_000, 50_000)
+OVERRUN_RANGE = (1, 45_000)
+
+
+def _zipf_weights(n, skew):
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return weights / weights.sum()
+
+
+def project_id(i, rows, prefix="CUST-"):
+    """The Project_ID of the i-th row of a rows-row synthetic ledger."""
+    return f"{prefix}{i + 1:0{max(4, len(str(rows)))}d}"
+
+
+def project_ids(rows, count, seed=1, prefix="CUST-", unique=False):
+    """Sample count Project_IDs (with replacement unless unique, then at most rows) of a synthetic ledger."""
+    rng = np.random.default_rng(seed)
+    if unique:
+        rows_drawn = rng.choice(rows, min(count, rows), replace=False)
+    else:
+        rows_drawn = rng.integers(0, rows, count)
+    return [project_id(i, rows, prefix) for i in rows_drawn.tolist()]
+
+
+def generate_chunks(
+    rows,
+    seed=0,
+    approval_rate=0.5,
+    compliance_rejection_rate=0.05,
+    flag_rate=0.1,
+    skew=1.0,
+    cost_centers=COST_CENTERS,
+    suppliers=SUPPLIERS,
+    blocked_suppliers=BLOCKED_SUPPLIERS,
+    prefix="CUST-",
+    chunk_rows=CHUNK_ROWS,
+):
+    """Yield (first_row_index, columns) for successive chunks of rows.
+
+    columns maps each ledger column to a numpy array of at most
+    chunk_rows values. Output is deterministic for a given seed and
+    chunk_rows.
+    """
+    budget_rejection_rate = 1.0 - approval_rate - compliance_rejection_rate
+    if min(approval_rate, compliance_rejection_rate, budget_rejection_rate) < 0:
+        raise ValueError("approval_rate and compliance_rejection_rate must be non-negative and sum to at most 1")
+    if not 0 <= flag_rate <= 1:
+        raise ValueError("flag_rate must be between 0 and 1")
+    if compliance_rejection_rate > 0 and not blocked_suppliers:
+        raise ValueError("compliance_rejection_rate needs at least one blocked supplier")
+    rng = np.random.default_rng(seed)
+    cost_centers = np.asarray(cost_centers, dtype=object)
+    suppliers = np.asarray(suppliers, dtype=object)
+    blocked = np.asarray(blocked_suppliers, dtype=object)
+    cost_center_weights = _zipf_weights(len(cost_centers), skew)
+    supplier_weights = _zipf_weights(len(suppliers), skew)
+    # Shuffle which names are the popular ones so skew is not alphabetical
+    cost_centers = cost_centers[rng.permutation(len(cost_centers))]
+    suppliers = suppliers[rng.permutation(len(suppliers))]
+    width = max(4, len(str(rows)))
+
+    for start in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - start)
+        outcome = rng.random(n)
+        over_budget = outcome >= approval_rate + compliance_rejection_rate
+        non_compliant = (outcome >= approval_rate) & ~over_budget
+
+        forecast = rng.integers(*FORECAST_RANGE, n, endpoint=True)
+        # budget_ok is PO <= Forecast - PO, i.e. PO <= Forecast // 2
+        fits = np.minimum(PO_RANGE[1], forecast // 2)
+        po = np.where(
+            over_budget,
+            forecast // 2 + rng.integers(*OVERRUN_RANGE, n, endpoint=True),
+            PO_RANGE[0] + (rng.random(n) * (fits - PO_RANGE[0] + 1)).astype(np.int64),
+        )
+        actuals = (forecast * rng.uniform(0.8, 1.2, n)).astype(np.int64)
+
+        supplier = suppliers[rng.choice(len(suppliers), n, p=supplier_weights)]
+        if non_compliant.any():
+            supplier[non_compliant] = blocked[rng.integers(0, len(blocked), non_compliant.sum())]
+
+        yield start, {
+            "Project_ID": np.array([f"{prefix}{i:0{width}d}" for i in range(start + 1, start + n + 1)], dtype=object),
+            "Cost_Center": cost_centers[rng.choice(len(cost_centers), n, p=cost_center_weights)],
+            "Supplier": supplier,
+            "PO_Requested": po,
+            "Forecast_Amount": forecast,
+            "Actuals_Amount": actuals,
+            "Budget_Remaining": forecast - po,
+            "Compliance_Flag": (rng.random(n) < flag_rate).astype(np.int64),
+            "Variance": actuals - forecast,
+        }
+
+
+def write_ledger(path, rows, seed=0, **options):
+    """Write a tab-separated synthetic ledger of rows rows to path ("-" for stdout).
+
+    options are passed to generate_chunks().
+    """
+    f = sys.stdout if str(path) == "-" else open(path, "w", newline="")
+    try:
+        f.write(SEPARATOR.join(COLUMNS) + "\n")
+        for _, columns in generate_chunks(rows, seed=seed, **options):
+            values = [columns[name].tolist() for name in COLUMNS]
+            f.writelines(SEPARATOR.join(map(str, row)) + "\n" for row in zip(*values))
+    finally:
+        if f is not sys.stdout:
+            f.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="ledger file to write, or - for stdout")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--approval-rate", type=float, default=0.5)
+    parser.add_argument("--compliance-rejection-rate", type=float, default=0.05)
+    parser.add_argument("--flag-rate", type=float, default=0.1, help="share of rows with Compliance_Flag=1")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent for cost centers and suppliers")
+    parser.add_argument("--cost-centers", type=int, help="use this many generated cost center names")
+    parser.add_argument("--suppliers", type=int, help="use this many generated supplier names")
+    parser.add_argument("--prefix", default="CUST-", help="Project_ID prefix")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    options = {}
+    if args.cost_centers:
+        options["cost_centers"] = [f"CC-{i:03d}" for i in range(1, args.cost_centers + 1)]
+    if args.suppliers:
+        options["suppliers"] = [f"Supplier-{i:05d}" for i in range(1, args.suppliers + 1)]
+    try:
+        write_ledger(
+            args.output, args.rows, seed=args.seed,
+            approval_rate=args.approval_rate,
+            compliance_rejection_rate=args.compliance_rejection_rate,
+            flag_rate=args.flag_rate,
+            skew=args.skew,
+            prefix=args.prefix,
+            chunk_rows=args.chunk_rows,
+            **options,
+        )
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.output != "-":
+        print(f"Wrote {args.rows} rows to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
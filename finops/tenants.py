@@ -0,0 +1,209 @@
+"""Tenant routing: one ledger, rule set and budget ledger per business unit.
+
+Tenants are declared in a JSON file named by FINOPS_TENANTS:
+
+    {
+      "emea": {
+        "data_path": "tenants/emea/data.csv",         # required
+        "rules_path": "tenants/emea/rules.json",      # default: the global rules
+        "budget_db": "tenants/emea/budget.sqlite3",   # default: next to data_path
+        "sqlite_path": "tenants/emea/ledger.sqlite3", # default: next to data_path
+        "max_concurrency": 4                          # default: FINOPS_TENANT_CONCURRENCY
+      }
+    }
+
+Relative paths are resolved against the file's directory, and the file is
+re-read when it changes. Give each tenant its own directory, since the
+files derived from a ledger (columnar cache, budget database) are kept
+next to it.
+
+A request selects its tenant with the X-FinOps-Tenant header or, for
+graph invocations, with the FINOPS_TENANT_KEY key (default "tenant") of
+the config's "configurable" block. use() makes it current for the
+request's context, which the thread pool and graph executor inherit, and
+get_store(), get_source(), get_engine() and get_budget_ledger() then
+resolve the tenant's files instead of the global ones. Without a tenant
+everything behaves as in a single-tenant deployment.
+
+Only FINOPS_MAX_TENANTS tenants keep their ledger, compiled rules and
+aggregates in memory. Activating another evicts the least recently used
+one's caches (the modules holding them register with on_evict()); they
+are rebuilt if it comes back.
+
+quota() caps the graph runs and bulk evaluations a tenant has in flight
+at its max_concurrency. Requests over it wait up to
+FINOPS_TENANT_QUEUE_TIMEOUT seconds for a slot, then fail with
+QuotaExceeded, so one tenant's month-end batch queues behind itself
+instead of occupying every worker thread. The default (no) tenant is not
+limited.
+"""
+import asyncio
+import contextvars
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+
+TENANT_KEY = os.environ.get("FINOPS_TENANT_KEY", "tenant")
+TENANT_HEADER = "X-FinOps-Tenant"
+MAX_RESIDENT = int(os.environ.get("FINOPS_MAX_TENANTS", 8))
+DEFAULT_CONCURRENCY = int(os.environ.get("FINOPS_TENANT_CONCURRENCY", 8))
+QUEUE_TIMEOUT = float(os.environ.get("FINOPS_TENANT_QUEUE_TIMEOUT", 10))
+
+_current = contextvars.ContextVar("finops_tenant", default=None)
+
+
+class UnknownTenant(LookupError):
+    """A request named a tenant that is not configured."""
+
+
+class QuotaExceeded(RuntimeError):
+    """A tenant's concurrency quota stayed full for the whole queue timeout."""
+
+
+class Tenant:
+    """Resolved configuration of one tenant."""
+
+    __slots__ = ("name", "data_path", "rules_path", "budget_db", "sqlite_path", "max_concurrency")
+
+    def __init__(self, name, spec, base_dir):
+        def path(key, default=None):
+            value = spec.get(key)
+            return (base_dir / value).resolve() if value is not None else default
+
+        self.name = name
+        if "data_path" not in spec:
+            raise ValueError(f"Tenant {name!r} has no data_path")
+        self.data_path = path("data_path")
+        self.rules_path = path("rules_path")
+        self.budget_db = path("budget_db", self.data_path.with_name("budget_reservations.sqlite3"))
+        self.sqlite_path = path("sqlite_path", self.data_path.with_name("ledger.sqlite3"))
+        self.max_concurrency = int(spec.get("max_concurrency", DEFAULT_CONCURRENCY))
+
+
+class _Registry:
+    """The tenants file, re-read when it changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature = None
+        self._tenants = {}
+
+    def get(self, name):
+        path = os.environ.get("FINOPS_TENANTS")
+        if not path:
+            raise UnknownTenant(f"Unknown tenant {name!r}: FINOPS_TENANTS is not set")
+        path = Path(path).resolve()
+        stat = os.stat(path)
+        signature = (path, stat.st_mtime_ns, stat.st_size)
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    spec = json.loads(path.read_text())
+                    self._tenants = {key: Tenant(key, value, path.parent) for key, value in spec.items()}
+                    self._signature = signature
+        tenant = self._tenants.get(name)
+        if tenant is None:
+            raise UnknownTenant(f"Unknown tenant {name!r}")
+        return tenant
+
+
+_registry = _Registry()
+_resident = OrderedDict()  # tenant name -> Tenant, least recently used first
+_resident_lock = threading.Lock()
+_evict_hooks = []
+_semaphores = {}  # tenant name -> (event loop, limit, asyncio.Semaphore)
+
+
+def get_tenant(name):
+    """Return the Tenant called name (None for the default tenant)."""
+    if name is None:
+        return None
+    return _registry.get(name)
+
+
+def from_config(config):
+    """Tenant named in a runnable config's configurable block, else the current one."""
+    name = ((config or {}).get("configurable") or {}).get(TENANT_KEY)
+    return get_tenant(name) if name is not None else current()
+
+
+def current():
+    """The tenant of the current context (None for the default tenant)."""
+    return _current.get()
+
+
+def current_name():
+    """Name of the current tenant (None for the default tenant)."""
+    tenant = _current.get()
+    return tenant.name if tenant is not None else None
+
+
+def on_evict(hook):
+    """Call hook(tenant) when a tenant's caches are evicted."""
+    _evict_hooks.append(hook)
+    return hook
+
+
+def _touch(tenant):
+    evicted = []
+    with _resident_lock:
+        _resident[tenant.name] = tenant
+        _resident.move_to_end(tenant.name)
+        while len(_resident) > MAX_RESIDENT:
+            evicted.append(_resident.popitem(last=False)[1])
+    for tenant in evicted:
+        for hook in _evict_hooks:
+            hook(tenant)
+
+
+@contextmanager
+def use(tenant):
+    """Make tenant (a Tenant or None) current for the enclosed code."""
+    if tenant is not None:
+        _touch(tenant)
+    token = _current.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current.reset(token)
+
+
+def setting(attribute):
+    """attribute of the current tenant, or None without one."""
+    tenant = _current.get()
+    return getattr(tenant, attribute) if tenant is not None else None
+
+
+def _semaphore(tenant):
+    loop = asyncio.get_running_loop()
+    entry = _semaphores.get(tenant.name)
+    if entry is None or entry[0] is not loop or entry[1] != tenant.max_concurrency:
+        # New tenant, a new event loop, or a changed limit
+        entry = _semaphores[tenant.name] = (loop, tenant.max_concurrency, asyncio.Semaphore(tenant.max_concurrency))
+    return entry[2]
+
+
+@asynccontextmanager
+async def quota():
+    """Hold one of the current tenant's concurrency slots.
+
+    Raises QuotaExceeded if none frees up within QUEUE_TIMEOUT.
+    """
+    tenant = _current.get()
+    if tenant is None:
+        yield
+        return
+    semaphore = _semaphore(tenant)
+    try:
+        await asyncio.wait_for(semaphore.acquire(), QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise QuotaExceeded(
+            f"Tenant {tenant.name!r} already has {tenant.max_concurrency} requests in flight"
+        ) from None
+    try:
+        yield
+    finally:
+        semaphore.release()
@@ -0,0 +1,191 @@
+"""OpenTelemetry-style spans with an optional OTLP/HTTP exporter.
+
+Every graph run opens a root span and every node a child span (see
+finops.graph); code inside a node can open further children with
+
+    with span("registry lookup", supplier=supplier):
+        ...
+
+Spans carry W3C-sized trace and span IDs and nest through contextvars, so
+they follow work into the graph's thread pool and asyncio tasks.
+
+Set FINOPS_OTLP_ENDPOINT (or OTEL_EXPORTER_OTLP_TRACES_ENDPOINT) to a local
+collector, e.g. http://localhost:4318/v1/traces, to export finished spans
+as OTLP/JSON. A background thread sends them in batches; when the queue is
+full spans are dropped (and counted) rather than slowing callers down.
+Without an endpoint spans are created but not kept.
+"""
+import atexit
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+from finops import metrics
+from finops.log import get_logger
+
+SERVICE_NAME = os.environ.get("OTEL_SERVICE_NAME", "finops-workflow")
+MAX_QUEUE = 10_000
+MAX_EXPORT_BATCH = 512
+EXPORT_INTERVAL = 1.0
+EXPORT_TIMEOUT = 2.0
+
+logger = get_logger("tracing")
+SPANS_DROPPED = metrics.counter("finops_spans_dropped_total", "Finished spans not exported", ("reason",))
+
+_current = contextvars.ContextVar("finops_span", default=None)
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def end(self, error=None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+        if _exporter is not None:
+            _exporter.submit(self)
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class OtlpExporter:
+    """Batches finished spans and POSTs them to an OTLP/HTTP JSON endpoint."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self._queue = queue.Queue(MAX_QUEUE)
+        self._thread = threading.Thread(target=self._export_loop, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            SPANS_DROPPED.inc("queue_full")
+
+    def _export_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + EXPORT_INTERVAL
+            while len(batch) < MAX_EXPORT_BATCH:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self._send(batch)
+            except Exception as exc:
+                SPANS_DROPPED.inc("export_failed", amount=len(batch))
+                logger.debug("span export failed", extra={"endpoint": self.endpoint, "error": str(exc)})
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _send(self, spans):
+        body = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{"scope": {"name": "finops"}, "spans": [s.to_otlp() for s in spans]}],
+            }]
+        }
+        request = urllib.request.Request(
+            self.endpoint, data=json.dumps(body).encode(),
+            headers={"Content-Type": "application/json"}, method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=EXPORT_TIMEOUT) as response:
+            response.read()
+
+    def flush(self):
+        """Block until every queued span has been sent (or dropped)."""
+        self._queue.join()
+
+
+_endpoint = os.environ.get("FINOPS_OTLP_ENDPOINT") or os.environ.get("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT")
+_exporter = OtlpExporter(_endpoint) if _endpoint else None
+
+
+def flush():
+    """Block until every finished span has been exported (or dropped)."""
+    if _exporter is not None:
+        _exporter.flush()
+
+
+def _after_fork():
+    # The exporter thread does not survive fork; start one for the child
+    global _exporter
+    if _endpoint:
+        _exporter = OtlpExporter(_endpoint)
+
+
+atexit.register(flush)
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def current_span():
+    return _current.get()
+
+
+def start_span(name, parent=None, **attributes):
+    """Start a span under parent (default: the current span); call end() on it."""
+    return Span(name, parent if parent is not None else _current.get(), attributes)
+
+
+@contextmanager
+def span(name, parent=None, **attributes):
+    """Run the block in a new current span, recording any exception on it."""
+    s = start_span(name, parent, **attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as exc:
+        s.end(exc)
+        raise
+    finally:
+        _current.reset(token)
+        s.end()
@@ -0,0 +1,408 @@
+"""Variance analytics over the ledger, served from precomputed aggregates.
+
+For each cost center and each supplier, VarianceAnalytics keeps:
+
+- totals: row count and sums of Forecast_Amount, Actuals_Amount and
+  Variance
+- the group's Variance values in sorted order, for percentile ranks and
+  bands
+- the mean and variance of Variance over the whole group, kept current
+  with Welford's updates, for z-scores
+
+Everything is built once from the ledger frame (a SqliteSource's a chunk
+at a time, so its table is never loaded as one frame) and then maintained
+incrementally from the source's change notifications: an upserted row
+removes its previous values from its groups and adds the new ones, in
+O(log n) per group. Sorted values follow the store's overlay pattern, a
+sorted base array plus small sorted lists of added and removed values
+that are merged back in once they grow. So answering "which percentile
+of Logistics is this PO's variance in" is a few binary searches, with no
+scan of the ledger.
+
+A PO is flagged as anomalous when the absolute z-score of its variance
+within its cost center or supplier reaches FINOPS_VARIANCE_Z_THRESHOLD
+(default 3). The z-scores are against the group's current population, not
+a rolling window: the ledger has no dates, and a SqliteSource keeps no
+insertion order, so "the last N POs" of a group is not defined the same
+way for both sources. An upserted PO leaves the statistics in O(1), so
+they always describe the group as the ledger stands.
+"""
+import bisect
+import os
+import threading
+
+import numpy as np
+
+from finops import tenants
+from finops.sources import SqliteSource, get_source
+
+DIMENSIONS = {"cost_center": "Cost_Center", "supplier": "Supplier"}
+BANDS = (5, 25, 50, 75, 95, 99)
+Z_THRESHOLD = float(os.environ.get("FINOPS_VARIANCE_Z_THRESHOLD", 3.0))
+# Merge a group's added/removed values into its sorted base past this share
+COMPACT_RATIO = 0.01
+
+
+def _percentile(at_or_below, count):
+    return round(100.0 * at_or_below / count, 2) if count else None
+
+
+def _zscore(value, mean, std):
+    return round((value - mean) / std, 3) if std > 0 else 0.0
+
+
+class _Group:
+    """Aggregates for one cost center or supplier."""
+
+    __slots__ = ("count", "forecast", "actuals", "variance", "mean", "m2", "base", "added", "removed")
+
+    def __init__(self, count, forecast, actuals, variance, mean, m2, base):
+        self.count = count
+        self.forecast = forecast
+        self.actuals = actuals
+        self.variance = variance
+        self.mean = mean
+        self.m2 = m2
+        self.base = base  # sorted numpy array of Variance values
+        self.added = []
+        self.removed = []
+
+    @property
+    def std(self):
+        return (self.m2 / self.count) ** 0.5 if self.count else 0.0
+
+    def add(self, forecast, actuals, variance):
+        self.count += 1
+        self.forecast += forecast
+        self.actuals += actuals
+        self.variance += variance
+        delta = variance - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (variance - self.mean)
+        i = bisect.bisect_left(self.removed, variance)
+        if i < len(self.removed) and self.removed[i] == variance:
+            del self.removed[i]
+        else:
+            bisect.insort(self.added, variance)
+        self._maybe_compact()
+
+    def remove(self, forecast, actuals, variance):
+        self.count -= 1
+        self.forecast -= forecast
+        self.actuals -= actuals
+        self.variance -= variance
+        if self.count == 0:
+            self.mean = self.m2 = 0.0
+        else:
+            mean = self.mean - (variance - self.mean) / self.count
+            self.m2 = max(0.0, self.m2 - (variance - self.mean) * (variance - mean))
+            self.mean = mean
+        i = bisect.bisect_left(self.added, variance)
+        if i < len(self.added) and self.added[i] == variance:
+            del self.added[i]
+        else:
+            bisect.insort(self.removed, variance)
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if len(self.added) + len(self.removed) > COMPACT_RATIO * max(len(self.base), 100_000):
+            self.compact()
+
+    def compact(self):
+        """Merge the added and removed values into the sorted base array."""
+        merged = np.sort(np.concatenate([self.base, np.asarray(self.added, dtype=self.base.dtype)]))
+        if self.removed:
+            removed = np.asarray(self.removed, dtype=self.base.dtype)
+            # Position of each removed value, shifted past earlier duplicates
+            duplicates = np.arange(len(removed)) - np.searchsorted(removed, removed, side="left")
+            merged = np.delete(merged, np.searchsorted(merged, removed, side="left") + duplicates)
+        self.base = merged
+        self.added = []
+        self.removed = []
+
+    def at_or_below(self, variance):
+        """Number of values in the group that are <= variance."""
+        return (
+            int(np.searchsorted(self.base, variance, side="right"))
+            + bisect.bisect_right(self.added, variance)
+            - bisect.bisect_right(self.removed, variance)
+        )
+
+    def at_or_below_many(self, variances):
+        counts = np.searchsorted(self.base, variances, side="right")
+        if self.added:
+            counts = counts + np.searchsorted(self.added, variances, side="right")
+        if self.removed:
+            counts = counts - np.searchsorted(self.removed, variances, side="right")
+        return counts
+
+    def quantile(self, q):
+        """Value at quantile q (0-100) by the nearest-rank method."""
+        if not self.count:
+            return None
+        if self.added or self.removed:
+            self.compact()
+        return self.base[max(1, int(np.ceil(q / 100 * self.count))) - 1].item()
+
+
+class VarianceAnalytics:
+    """Per-cost-center and per-supplier variance aggregates for one source."""
+
+    def __init__(self, source, z_threshold=Z_THRESHOLD):
+        self.source = source
+        self.z_threshold = z_threshold
+        self.version = 0
+        self._lock = threading.RLock()
+        self._groups = None  # dimension -> {name: _Group}
+        self._dirty = False
+        self._index = None
+        self._base = None
+        self._changed = {}
+        source.subscribe(self._on_ledger_change)
+
+    def _build(self, frame):
+        """Return (groups, index, base) for an in-memory ledger frame."""
+        variance = frame["Variance"].to_numpy()
+        forecast = frame["Forecast_Amount"].to_numpy()
+        actuals = frame["Actuals_Amount"].to_numpy()
+        groups = {}
+        labels = []
+        for dimension, column in DIMENSIONS.items():
+            names = frame[column].astype("category")
+            codes = names.cat.codes.to_numpy()
+            labels.append((codes, names.cat.categories))
+            order = np.lexsort((variance, codes))
+            sorted_codes = codes[order]
+            bounds = np.searchsorted(sorted_codes, np.arange(len(names.cat.categories) + 1))
+            counts = np.diff(bounds)
+            forecast_sums = np.bincount(codes, weights=forecast, minlength=len(counts))
+            actuals_sums = np.bincount(codes, weights=actuals, minlength=len(counts))
+            variance_sums = np.bincount(codes, weights=variance, minlength=len(counts))
+            means = np.divide(variance_sums, counts, out=np.zeros(len(counts)), where=counts > 0)
+            m2 = np.bincount(codes, weights=(variance - means[codes]) ** 2, minlength=len(counts))
+            groups[dimension] = {
+                name: _Group(
+                    int(counts[i]), int(forecast_sums[i]), int(actuals_sums[i]), int(variance_sums[i]),
+                    float(means[i]), float(m2[i]), variance[order[bounds[i]:bounds[i + 1]]],
+                )
+                for i, name in enumerate(names.cat.categories)
+                if counts[i]
+            }
+        # Previous values of rows upserted later are looked up here
+        return groups, frame.index, (labels, forecast, actuals, variance)
+
+    def _build_streamed(self, frames):
+        """Return (groups, index, base) from a chunked ledger (SqliteSource.frames()).
+
+        Only the Variance values, which the sorted arrays need anyway, are
+        kept across chunks. A SqliteSource only ever notifies full reloads,
+        so no index of previous values is needed.
+        """
+        parts = {dimension: {} for dimension in DIMENSIONS}  # name -> [forecast, actuals, [variances]]
+        for frame in frames:
+            variance = frame["Variance"].to_numpy()
+            forecast = frame["Forecast_Amount"].to_numpy()
+            actuals = frame["Actuals_Amount"].to_numpy()
+            for dimension, column in DIMENSIONS.items():
+                names = frame[column].astype("category")
+                codes = names.cat.codes.to_numpy()
+                order = np.argsort(codes, kind="stable")
+                bounds = np.searchsorted(codes[order], np.arange(len(names.cat.categories) + 1))
+                forecast_sums = np.bincount(codes, weights=forecast, minlength=len(names.cat.categories))
+                actuals_sums = np.bincount(codes, weights=actuals, minlength=len(names.cat.categories))
+                for i, name in enumerate(names.cat.categories):
+                    if bounds[i] == bounds[i + 1]:
+                        continue
+                    part = parts[dimension].setdefault(name, [0, 0, []])
+                    part[0] += int(forecast_sums[i])
+                    part[1] += int(actuals_sums[i])
+                    part[2].append(variance[order[bounds[i]:bounds[i + 1]]])
+        groups = {}
+        for dimension, named in parts.items():
+            groups[dimension] = {}
+            for name in sorted(named):
+                forecast_sum, actuals_sum, values = named.pop(name)
+                values = np.sort(np.concatenate(values))
+                count = len(values)
+                variance_sum = int(values.sum())
+                mean = variance_sum / count
+                groups[dimension][name] = _Group(
+                    count, forecast_sum, actuals_sum, variance_sum,
+                    mean, float(((values - mean) ** 2).sum()), values,
+                )
+        return groups, (), None
+
+    @staticmethod
+    def _values(row):
+        return (
+            row["Cost_Center"], row["Supplier"],
+            int(row["Forecast_Amount"]), int(row["Actuals_Amount"]), int(row["Variance"]),
+        )
+
+    def _previous(self, project_id):
+        values = self._changed.get(project_id)
+        if values is not None:
+            return values
+        if project_id in self._index:
+            i = self._index.get_loc(project_id)
+            labels, forecast, actuals, variance = self._base
+            (cc_codes, cost_centers), (supplier_codes, suppliers) = labels
+            return (
+                cost_centers[cc_codes[i]], suppliers[supplier_codes[i]],
+                int(forecast[i]), int(actuals[i]), int(variance[i]),
+            )
+        return None
+
+    def _on_ledger_change(self, rows):
+        with self._lock:
+            if rows is None or self._groups is None:
+                self._groups = None
+                self._dirty = True
+                return
+            for row in rows:
+                previous = self._previous(row["Project_ID"])
+                if previous is not None:
+                    self._apply(previous, remove=True)
+                values = self._values(row)
+                self._apply(values)
+                self._changed[row["Project_ID"]] = values
+            self.version += 1
+
+    def _apply(self, values, remove=False):
+        cost_center, supplier, forecast, actuals, variance = values
+        for dimension, name in (("cost_center", cost_center), ("supplier", supplier)):
+            groups = self._groups[dimension]
+            group = groups.get(name)
+            if remove:
+                group.remove(forecast, actuals, variance)
+            else:
+                if group is None:
+                    group = groups[name] = _Group(0, 0, 0, 0, 0.0, 0.0, np.empty(0, dtype=np.int64))
+                group.add(forecast, actuals, variance)
+
+    def groups(self):
+        """Return {dimension: {name: group}}, building or refreshing as needed."""
+        # Never call into the source while holding our lock: the source
+        # notifies us while holding its own.
+        self.source.refresh()
+        groups = self._groups
+        while groups is None:
+            self._dirty = False
+            if isinstance(self.source, SqliteSource):
+                built = self._build_streamed(self.source.frames())
+            else:
+                built = self._build(self.source.frame())
+            with self._lock:
+                if self._groups is None and not self._dirty:
+                    self._groups, self._index, self._base = built
+                    self._changed = {}
+                    self.version += 1
+                groups = self._groups
+        return groups
+
+    def describe(self, row):
+        """Percentile rank, z-score and anomaly flag of a ledger row's (or PurchaseOrder's) variance."""
+        variance = int(row["Variance"])
+        percentile = {}
+        zscore = {}
+        groups = self.groups()
+        with self._lock:
+            for dimension, column in DIMENSIONS.items():
+                group = groups[dimension].get(row[column])
+                if group is None or not group.count:
+                    percentile[dimension] = None
+                    zscore[dimension] = 0.0
+                    continue
+                percentile[dimension] = _percentile(group.at_or_below(variance), group.count)
+                zscore[dimension] = _zscore(variance, group.mean, group.std)
+        return {
+            "variance_percentile": percentile,
+            "variance_zscore": zscore,
+            "variance_anomaly": any(abs(z) >= self.z_threshold for z in zscore.values()),
+        }
+
+    def describe_frame(self, frame):
+        """describe() for every row of a ledger frame, as lists of the same values."""
+        variance = frame["Variance"].to_numpy()
+        percentile = {}
+        zscore = {}
+        groups = self.groups()
+        with self._lock:
+            for dimension, column in DIMENSIONS.items():
+                p = np.full(len(frame), None, dtype=object)
+                z = np.zeros(len(frame))
+                names = frame[column].to_numpy()
+                for name in np.unique(names.astype(str)) if len(frame) else ():
+                    group = groups[dimension].get(name)
+                    if group is None or not group.count:
+                        continue
+                    mask = names == name
+                    values = variance[mask]
+                    counts = group.at_or_below_many(values)
+                    p[mask] = [_percentile(c, group.count) for c in counts.tolist()]
+                    z[mask] = [_zscore(v, group.mean, group.std) for v in values.tolist()]
+                percentile[dimension] = p.tolist()
+                zscore[dimension] = z.tolist()
+        anomaly = np.zeros(len(frame), dtype=bool)
+        for values in zscore.values():
+            anomaly |= np.abs(np.asarray(values)) >= self.z_threshold
+        return [
+            {
+                "variance_percentile": {dimension: percentile[dimension][i] for dimension in DIMENSIONS},
+                "variance_zscore": {dimension: zscore[dimension][i] for dimension in DIMENSIONS},
+                "variance_anomaly": bool(anomaly[i]),
+            }
+            for i in range(len(frame))
+        ]
+
+    def totals(self, dimension):
+        """{name: {"count", "forecast", "actuals", "variance"}} for a dimension."""
+        groups = self.groups()
+        with self._lock:
+            return {
+                name: {
+                    "count": group.count,
+                    "forecast": group.forecast,
+                    "actuals": group.actuals,
+                    "variance": group.variance,
+                }
+                for name, group in groups[dimension].items()
+                if group.count
+            }
+
+    def bands(self, dimension):
+        """{name: {"mean", "std", "p5", ..., "p99"}} of Variance for a dimension."""
+        groups = self.groups()
+        with self._lock:
+            return {
+                name: {
+                    "mean": round(group.mean, 2),
+                    "std": round(group.std, 2),
+                    **{f"p{q}": group.quantile(q) for q in BANDS},
+                }
+                for name, group in groups[dimension].items()
+                if group.count
+            }
+
+
+_analytics = {}
+_analytics_lock = threading.Lock()
+
+
+@tenants.on_evict
+def _evict(tenant):
+    _analytics.pop(tenant.data_path, None)
+    _analytics.pop(tenant.sqlite_path, None)
+
+
+def get_analytics(source=None):
+    """Return the shared VarianceAnalytics for source (the configured one by default)."""
+    if source is None:
+        source = get_source()
+    analytics = _analytics.get(source.path)
+    if analytics is None:
+        with _analytics_lock:
+            analytics = _analytics.get(source.path)
+            if analytics is None:
+                analytics = _analytics[source.path] = VarianceAnalytics(source)
+    return analytics
@@ -0,0 +1,271 @@
+"""What-if simulation of approval outcomes over the whole ledger.
+
+A scenario is a list of hypothetical changes:
+
+    {"name": "marketing-cut",
+     "changes": [
+         {"kind": "budget", "pct": -20, "cost_center": "Marketing"},
+         {"kind": "po_amount", "pct": 5},
+         {"kind": "block", "supplier": "Venom"},
+         {"kind": "unblock", "supplier": "VendorY"}]}
+
+- budget: change the budget (Forecast_Amount) of matching projects by pct
+  percent, which moves Budget_Remaining by the same amount. cost_center is
+  optional (default: every project).
+- po_amount: scale PO_Requested by 1 + pct/100. Optionally restricted to a
+  cost_center or a supplier.
+- block / unblock: add a supplier to, or remove it from, the compliance
+  blocklist.
+
+Changes of the same kind compose (budget percentages add up, PO factors
+multiply). Each scenario is evaluated with the checks of mira, jordan and
+sam_decision, as in finops.batch, and compared with the unchanged ledger.
+All scenarios are evaluated together: per-cost-center and per-supplier
+parameters are gathered into (scenarios x rows) arrays by broadcasting,
+processed in row chunks so memory stays bounded.
+
+    python -m finops.whatif --budget Marketing:-20 --po 5 --block Venom
+    python -m finops.whatif --scenarios sweep.json --json
+"""
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from finops.budget import get_budget_ledger
+from finops.compliance import get_engine
+from finops.registry import registry
+from finops.sources import get_source
+
+KINDS = ("budget", "po_amount", "block", "unblock")
+# Upper bound on scenario x row cells held in memory at once
+MAX_CELLS = 4_000_000
+MAX_IDS = 100
+
+
+class Scenarios:
+    """Scenario changes compiled into arrays over the ledger's categories."""
+
+    def __init__(self, scenarios, cost_centers, suppliers, blocked):
+        count = len(scenarios) + 1  # row 0 is the unchanged ledger
+        self.names = ["baseline"]
+        cc_index = {name: i for i, name in enumerate(cost_centers)}
+        supplier_index = {name: i for i, name in enumerate(suppliers)}
+        self.budget_pct = np.zeros((count, len(cost_centers)))
+        # PO multipliers by cost center and by supplier; a row's is the product
+        self.cc_factor = np.ones((count, len(cost_centers)))
+        self.supplier_factor = np.ones((count, len(suppliers)))
+        self.blocked = [set(blocked)]
+        for s, scenario in enumerate(scenarios, 1):
+            self.names.append(str(scenario.get("name") or f"scenario-{s}"))
+            scenario_blocked = set(blocked)
+            for change in scenario.get("changes", ()):
+                kind = change.get("kind")
+                if kind not in KINDS:
+                    raise ValueError(f"Unknown change kind {kind!r}; expected one of {', '.join(KINDS)}")
+                if kind in ("block", "unblock"):
+                    if not change.get("supplier"):
+                        raise ValueError(f"{kind} change needs a supplier")
+                    if kind == "block":
+                        scenario_blocked.add(change["supplier"])
+                    else:
+                        scenario_blocked.discard(change["supplier"])
+                    continue
+                if not isinstance(change.get("pct"), (int, float)):
+                    raise ValueError(f"{kind} change needs a numeric pct")
+                pct = float(change["pct"])
+                cc = self._select(cc_index, change.get("cost_center"), "cost center")
+                if kind == "budget":
+                    if change.get("supplier") is not None:
+                        raise ValueError("budget changes apply to a cost center, not a supplier")
+                    self.budget_pct[s, cc] += pct
+                elif change.get("supplier") is None:
+                    self.cc_factor[s, cc] *= 1 + pct / 100
+                elif change.get("cost_center") is None:
+                    self.supplier_factor[s, self._select(supplier_index, change["supplier"], "supplier")] *= 1 + pct / 100
+                else:
+                    raise ValueError("po_amount changes take a cost_center or a supplier, not both")
+            self.blocked.append(scenario_blocked)
+
+    @staticmethod
+    def _select(index, name, what):
+        if name is None:
+            return slice(None)
+        if name not in index:
+            raise ValueError(f"Unknown {what} {name!r}")
+        return index[name]
+
+    def __len__(self):
+        return len(self.names)
+
+
+def simulate(scenarios, frame=None, max_ids=MAX_IDS):
+    """Evaluate scenarios against the ledger (frame defaults to the whole source).
+
+    Returns {"baseline": summary, "scenarios": [summary, ...]}. Each summary
+    has approval counts, rejections by reason and the approved PO amount;
+    scenario summaries add the POs that flip outcome relative to the
+    baseline (count and up to max_ids project IDs each) and
+    impact_by_cost_center, the change in approved PO dollars.
+
+    Raises ValueError for malformed scenarios or unknown names.
+    """
+    if frame is None:
+        frame = get_source().frame()
+    cc_names = frame["Cost_Center"].astype("category")
+    supplier_names = frame["Supplier"].astype("category")
+    cost_centers = cc_names.cat.categories.tolist()
+    suppliers = supplier_names.cat.categories.tolist()
+    cc_codes = cc_names.cat.codes.to_numpy()
+    supplier_codes = supplier_names.cat.codes.to_numpy()
+
+    rules = get_engine().rules()
+    compiled = Scenarios(scenarios, cost_centers, suppliers, rules.blocked)
+
+    # Inputs shared by every scenario, as in finops.batch
+    project_ids = frame["Project_ID"].to_numpy()
+    ids = project_ids.tolist()
+    reserved = np.asarray(get_budget_ledger().reserved_by_others_many(ids, ids))
+    available = frame["Budget_Remaining"].to_numpy() - reserved
+    forecast = frame["Forecast_Amount"].to_numpy()
+    po_amount = frame["PO_Requested"].to_numpy()
+    row_ok = rules.row_mask(frame)
+    category_series = supplier_names.cat.categories.to_series()
+    sanctioned = category_series.isin(registry.screen(suppliers)).to_numpy()
+    # supplier_ok[s, p]: supplier p passes the supplier-level rules in scenario s
+    supplier_ok = np.stack([
+        rules.supplier_mask(category_series, blocked) & ~sanctioned for blocked in compiled.blocked
+    ]) if suppliers else np.zeros((len(compiled), 0), dtype=bool)
+    supplier_array = frame["Supplier"].to_numpy()
+
+    n_cc = len(cost_centers)
+    rejected_budget = np.zeros(len(compiled), dtype=np.int64)
+    rejected_compliance = np.zeros(len(compiled), dtype=np.int64)
+    approved_count = np.zeros(len(compiled), dtype=np.int64)
+    approved_by_cc = np.zeros((len(compiled), n_cc))
+    flipped = {"newly_rejected": [[] for _ in compiled.names], "newly_approved": [[] for _ in compiled.names]}
+    flipped_count = {key: np.zeros(len(compiled), dtype=np.int64) for key in flipped}
+
+    step = max(1, MAX_CELLS // len(compiled))
+    for start in range(0, len(frame), step):
+        rows = slice(start, start + step)
+        cc = cc_codes[rows]
+        # (scenarios x rows) by broadcasting the per-category parameters
+        po = po_amount[rows] * compiled.cc_factor[:, cc] * compiled.supplier_factor[:, supplier_codes[rows]]
+        remaining = available[rows] + forecast[rows] * compiled.budget_pct[:, cc] / 100
+        budget_ok = po <= remaining
+        compliance_ok = supplier_ok[:, supplier_codes[rows]] & row_ok[rows]
+        if rules.amount_ranges:
+            compliance_ok &= ~rules.amount_blocked(supplier_array[rows], po)
+        approved = budget_ok & compliance_ok
+
+        approved_count += approved.sum(axis=1)
+        rejected_budget += (~budget_ok).sum(axis=1)
+        rejected_compliance += (budget_ok & ~compliance_ok).sum(axis=1)
+        offsets = (np.arange(len(compiled)) * n_cc)[:, None]
+        approved_by_cc += np.bincount(
+            (offsets + cc).ravel(), weights=np.where(approved, po, 0).ravel(), minlength=len(compiled) * n_cc,
+        ).reshape(len(compiled), n_cc)
+        for key, changed in (("newly_rejected", approved[0] & ~approved), ("newly_approved", ~approved[0] & approved)):
+            flipped_count[key] += changed.sum(axis=1)
+            for s in np.flatnonzero(changed.any(axis=1) & (np.array([len(i) for i in flipped[key]]) < max_ids)):
+                needed = max_ids - len(flipped[key][s])
+                flipped[key][s].extend(project_ids[rows][changed[s]][:needed].tolist())
+
+    results = []
+    for s, name in enumerate(compiled.names):
+        result = {
+            "name": name,
+            "approved": int(approved_count[s]),
+            "rejected": {
+                "Budget exceeded": int(rejected_budget[s]), "Compliance issue": int(rejected_compliance[s]),
+            },
+            "approved_amount": round(float(approved_by_cc[s].sum()), 2),
+        }
+        if s:
+            for key in flipped:
+                result[key] = {"count": int(flipped_count[key][s]), "project_ids": flipped[key][s]}
+            impact = approved_by_cc[s] - approved_by_cc[0]
+            result["impact_by_cost_center"] = {
+                name: round(float(value), 2) for name, value in zip(cost_centers, impact.tolist())
+            }
+        results.append(result)
+    return {"baseline": results[0], "scenarios": results[1:]}
+
+
+def _scenario_from_args(args):
+    changes = []
+    for spec in args.budget:
+        cost_center, _, pct = spec.rpartition(":")
+        change = {"kind": "budget", "pct": float(pct)}
+        if cost_center:
+            change["cost_center"] = cost_center
+        changes.append(change)
+    for spec in args.po:
+        scope, _, pct = spec.rpartition(":")
+        change = {"kind": "po_amount", "pct": float(pct)}
+        if scope:
+            change[args.po_scope] = scope
+        changes.append(change)
+    changes += [{"kind": "block", "supplier": supplier} for supplier in args.block]
+    changes += [{"kind": "unblock", "supplier": supplier} for supplier in args.unblock]
+    return {"name": args.name, "changes": changes}
+
+
+def _print_table(result, out=sys.stdout):
+    baseline = result["baseline"]
+    print(f"{'scenario':<24} {'approved':>9} {'delta':>7} {'newly rej':>9} {'newly ok':>9} {'$ impact':>16}", file=out)
+    print(f"{'baseline':<24} {baseline['approved']:>9} {'':>7} {'':>9} {'':>9} {'':>16}", file=out)
+    for scenario in result["scenarios"]:
+        impact = sum(scenario["impact_by_cost_center"].values())
+        print(
+            f"{scenario['name'][:24]:<24} {scenario['approved']:>9} "
+            f"{scenario['approved'] - baseline['approved']:>+7} "
+            f"{scenario['newly_rejected']['count']:>9} {scenario['newly_approved']['count']:>9} "
+            f"{impact:>+16,.2f}",
+            file=out,
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", help="JSON file (or - for stdin) holding a scenario or a list of them")
+    parser.add_argument("--name", default="what-if", help="name of the scenario built from the options below")
+    parser.add_argument("--budget", action="append", default=[], metavar="[COST_CENTER:]PCT",
+                        help="change budgets by PCT percent")
+    parser.add_argument("--po", action="append", default=[], metavar="[SCOPE:]PCT",
+                        help="change PO amounts by PCT percent")
+    parser.add_argument("--po-scope", choices=("cost_center", "supplier"), default="cost_center",
+                        help="what the SCOPE of --po names")
+    parser.add_argument("--block", action="append", default=[], metavar="SUPPLIER")
+    parser.add_argument("--unblock", action="append", default=[], metavar="SUPPLIER")
+    parser.add_argument("--max-ids", type=int, default=MAX_IDS, help="project IDs listed per flip direction")
+    parser.add_argument("--json", action="store_true", help="print the full result as JSON")
+    args = parser.parse_args(argv)
+
+    scenarios = []
+    if args.scenarios:
+        with (sys.stdin if args.scenarios == "-" else open(args.scenarios)) as f:
+            loaded = json.load(f)
+        scenarios += loaded if isinstance(loaded, list) else [loaded]
+    if args.budget or args.po or args.block or args.unblock:
+        try:
+            scenarios.append(_scenario_from_args(args))
+        except ValueError as exc:
+            parser.error(str(exc))
+    if not scenarios:
+        parser.error("give --scenarios or at least one of --budget, --po, --block, --unblock")
+    try:
+        result = simulate(scenarios, max_ids=args.max_ids)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        _print_table(result)
+
+
+if __name__ == "__main__":
+    main()
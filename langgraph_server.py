@@ -1,28 +1,293 @@
 import os
-from typing import Dict, Any
-from fastapi import FastAPI
-from langserve import add_routes
-from langgraph.graph import StateGraph
-from agents import alex, sam, mira, jordan, sam_decision, taylor, alex_summary
+import time
+from typing import Dict, Any, List, Optional
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+import orjson
 
-# Import the main graph
-from main import graph
+# The main graph is compiled on first use of main.graph
+import main
+from finops import metrics, tenants
+from finops.approvals import DIMENSIONS as APPROVAL_DIMENSIONS, get_approval_stats
+from finops.audit import get_audit_log
+from finops.batch import run_batch
+from finops.checkpoint import RunMismatch
+from finops.responses import ORJSONResponse, compact, dumps, response_format, states_response
+from finops.server import readiness
+from finops.sources import get_source
+from finops.startup import LazyApp
+from finops.variance import DIMENSIONS, get_analytics
+from finops.whatif import MAX_IDS, simulate
 
 # Create a FastAPI app
 app = FastAPI(
     title="FinOps Approval Workflow",
     description="A LangGraph application for financial operations approval workflow",
     version="1.0",
+    default_response_class=ORJSONResponse,
 )
 
-# Add routes for the graph with config for LangGraph Smith
-add_routes(
-    app,
-    graph,
-    path="/finops-workflow",
-    input_type=Dict[str, Any],
-    config_keys=["configurable"],
+HTTP_LATENCY = metrics.histogram(
+    "finops_http_request_latency_seconds", "HTTP request latency", ("method", "path", "status")
 )
+HTTP_IN_FLIGHT = metrics.gauge("finops_http_requests_in_flight", "HTTP requests being served")
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Time every request; streaming responses are timed to their first byte."""
+    HTTP_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        # Label by route template so path parameters do not explode cardinality
+        route = request.scope.get("route")
+        path = getattr(route, "path", request.url.path)
+        HTTP_LATENCY.observe(time.perf_counter() - start, request.method, path, str(status))
+
+def _unknown_tenant(request: Request, exc: tenants.UnknownTenant):
+    return ORJSONResponse({"detail": str(exc.args[0])}, status_code=404)
+
+def _quota_exceeded(request: Request, exc: tenants.QuotaExceeded):
+    # Tell the client to back off for about as long as the request queued
+    return ORJSONResponse({"detail": str(exc)}, status_code=429,
+                          headers={"Retry-After": str(int(tenants.QUEUE_TIMEOUT))})
+
+TENANT_ERRORS = {tenants.UnknownTenant: _unknown_tenant, tenants.QuotaExceeded: _quota_exceeded}
+for exc_class, handler in TENANT_ERRORS.items():
+    app.add_exception_handler(exc_class, handler)
+
+@app.middleware("http")
+async def route_tenant(request: Request, call_next):
+    """Serve the request against the tenant named in the X-FinOps-Tenant header, if any."""
+    name = request.headers.get(tenants.TENANT_HEADER)
+    if name is None:
+        return await call_next(request)
+    try:
+        tenant = tenants.get_tenant(name)
+    except tenants.UnknownTenant as e:
+        return _unknown_tenant(request, e)
+    with tenants.use(tenant):
+        return await call_next(request)
+
+class BatchRequest(BaseModel):
+    """Projects to evaluate: explicit IDs, a cost center, or both."""
+    project_ids: Optional[List[str]] = None
+    cost_center: Optional[str] = None
+    # langserve-style batch payload: [{"project_id": ...}, ...]
+    inputs: Optional[List[Dict[str, Any]]] = None
+    # The tenant key of config["configurable"] selects the tenant, as for /invoke
+    config: Optional[Dict[str, Any]] = None
+
+# Single runs and vectorized batch evaluation. Registered before the
+# langserve mount so they take precedence over langserve's /invoke and
+# per-input /batch routes at the same paths.
+@app.post("/finops-workflow/invoke")
+async def invoke(request: Request, format: Optional[str] = None):
+    """Run the workflow for one input; same request and response shape as langserve's /invoke.
+
+    format=compact returns only the decision fields of the final state.
+    """
+    if format not in (None, "json", "compact"):
+        raise HTTPException(status_code=422, detail="Unknown format; expected json or compact")
+    try:
+        payload = orjson.loads(await request.body())
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid JSON: {e}")
+    input = payload.get("input") if isinstance(payload, dict) else None
+    if not isinstance(input, dict):
+        raise HTTPException(status_code=422, detail='Expected a body of the form {"input": {...}}')
+    try:
+        state = await main.graph.ainvoke(input, payload.get("config"))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Unknown project ID: {e.args[0]}")
+    except RunMismatch as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return ORJSONResponse({
+        "output": compact(state) if format == "compact" else state,
+        # The checkpointed run, to resume with; null when the input named none
+        "metadata": {"run_id": input.get("run_id"), "feedback_tokens": []},
+    })
+
+@app.post("/finops-workflow/batch")
+async def batch(request: BatchRequest, http_request: Request, format: Optional[str] = None):
+    """Evaluate the approval workflow for many projects in one pass.
+
+    format=compact returns a {"fields", "rows"} table of the decision
+    fields; format=ndjson (or Accept: application/x-ndjson) streams one
+    state per line.
+    """
+    format = response_format(http_request, format)
+    project_ids = request.project_ids
+    if request.inputs is not None:
+        project_ids = (project_ids or []) + [item["project_id"] for item in request.inputs]
+    if project_ids is None and request.cost_center is None:
+        raise HTTPException(status_code=422, detail="Provide project_ids, inputs or cost_center")
+    try:
+        with tenants.use(tenants.from_config(request.config)):
+            # A month-end batch holds one of its tenant's slots, not the server
+            async with tenants.quota():
+                output = await run_in_threadpool(run_batch, project_ids, request.cost_center)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    approved = sum(1 for state in output if state["approved"])
+    return states_response(output, format, {"count": len(output), "approved": approved})
+
+class WhatIfRequest(BaseModel):
+    """Scenarios to simulate (see finops.whatif), optionally over a subset of the ledger."""
+    scenarios: List[Dict[str, Any]]
+    project_ids: Optional[List[str]] = None
+    cost_center: Optional[str] = None
+    max_ids: int = MAX_IDS
+    config: Optional[Dict[str, Any]] = None
+
+@app.post("/finops-workflow/whatif")
+async def whatif(request: WhatIfRequest):
+    """Recompute approval outcomes under hypothetical changes and diff them against today's."""
+    def run():
+        frame = None
+        if request.project_ids is not None or request.cost_center is not None:
+            frame = get_source().select(request.project_ids, request.cost_center)
+        return simulate(request.scenarios, frame, request.max_ids)
+    try:
+        with tenants.use(tenants.from_config(request.config)):
+            async with tenants.quota():
+                return ORJSONResponse(await run_in_threadpool(run))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+class LedgerRows(BaseModel):
+    """Ledger rows keyed by data.csv column name."""
+    rows: List[Dict[str, Any]]
+
+@app.post("/ledger/rows")
+async def append_ledger_rows(request: LedgerRows):
+    """Append or upsert (by Project_ID) ledger rows in the configured source, without a full reload."""
+    try:
+        count = await run_in_threadpool(get_source().append, request.rows)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"ingested": count}
+
+class EventsRequest(BaseModel):
+    """Same payload shape as /finops-workflow/invoke."""
+    input: Dict[str, Any]
+    config: Optional[Dict[str, Any]] = None
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+@app.post("/finops-workflow/events")
+async def stream_events(request: EventsRequest):
+    """Stream one server-sent event per node as it completes, then the final state."""
+    # Resolved up front so an unknown tenant is a 404, not an error event
+    tenant = tenants.from_config(request.config)
+
+    async def events():
+        try:
+            with tenants.use(tenant):
+                async for event in main.graph.astream_nodes(request.input):
+                    yield _sse(event.pop("event"), event)
+        except Exception as e:
+            yield _sse("error", {"detail": f"{type(e).__name__}: {e}"})
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def workflow_routes():
+    """langserve's routes for the graph (invoke, stream, playground, ...)."""
+    from langserve import add_routes
+
+    routes = FastAPI(title="FinOps Approval Workflow", exception_handlers=TENANT_ERRORS)
+    # Add routes for the graph with config for LangGraph Smith
+    add_routes(
+        routes,
+        main.graph,
+        path="",
+        input_type=Dict[str, Any],
+        # configurable carries the tenant key (see finops.tenants)
+        config_keys=["configurable"],
+    )
+    return routes
+
+# Importing langserve and compiling the graph is most of a cold start, so
+# they happen on the first request under /finops-workflow instead (the
+# routes above still take precedence over the mount).
+app.mount("/finops-workflow", LazyApp(workflow_routes))
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Node latency, in-flight and error metrics plus cache hit ratio, in Prometheus format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/analytics/variance/{dimension}")
+async def variance_analytics(dimension: str):
+    """Forecast/actuals totals and variance percentile bands per cost center or supplier."""
+    if dimension not in DIMENSIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown dimension; expected one of {', '.join(DIMENSIONS)}")
+    analytics = get_analytics()
+    totals, bands = await run_in_threadpool(lambda: (analytics.totals(dimension), analytics.bands(dimension)))
+    return ORJSONResponse({name: {**totals[name], **bands[name]} for name in totals})
+
+MAX_PAGE_SIZE = 1000
+
+@app.get("/projects")
+async def list_projects(prefix: str = "", cost_center: Optional[str] = None,
+                        after: Optional[str] = None, limit: int = 50):
+    """One page of projects in Project_ID order; pass next as after for the following page."""
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    frame = await run_in_threadpool(get_source().page, prefix, cost_center, after, limit + 1)
+    items = frame.iloc[:limit].to_dict("records")
+    return ORJSONResponse({"items": items, "next": items[-1]["Project_ID"] if len(frame) > limit else None})
+
+@app.get("/projects/{project_id}")
+async def get_project(project_id: str):
+    """The ledger row of one project."""
+    try:
+        frame = await run_in_threadpool(get_source().select, [project_id])
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown project ID: {project_id}")
+    return ORJSONResponse(frame.to_dict("records")[0])
+
+@app.get("/analytics/approvals/{dimension}")
+async def approval_rates(dimension: str):
+    """Approval counts, rates and amounts per cost center or supplier."""
+    if dimension not in APPROVAL_DIMENSIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown dimension; expected one of {', '.join(APPROVAL_DIMENSIONS)}")
+    return ORJSONResponse(await run_in_threadpool(get_approval_stats().view, dimension))
+
+@app.get("/audit")
+async def audit_records(project_id: Optional[str] = None, since: Optional[float] = None,
+                        until: Optional[float] = None, limit: int = 100):
+    """The tenant's recorded approval decisions, oldest first, for a project and/or a time range (epoch seconds)."""
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=422, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    records = await run_in_threadpool(
+        get_audit_log().query, project_id, since, until, limit, tenants.current_name(),
+    )
+    return ORJSONResponse({"records": records})
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the worker's event loop is serving requests."""
+    return {"status": "ok", "pid": os.getpid()}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: ledger, compliance rules and budget ledger are usable."""
+    ready, checks = await run_in_threadpool(readiness)
+    return JSONResponse(
+        {"status": "ready" if ready else "not ready", "pid": os.getpid(), "checks": checks},
+        status_code=200 if ready else 503,
+    )
 
 # Root endpoint for health check
 @app.get("/")
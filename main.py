@@ -1,21 +1,43 @@
-from langgraph.graph import StateGraph
-from agents import alex, sam, mira, jordan, sam_decision, taylor, alex_summary
-
-workflow = StateGraph()
-workflow.add_node("alex", alex.run)
-workflow.add_node("sam", sam.run)
-workflow.add_node("mira", mira.run)
-workflow.add_node("jordan", jordan.run)
-workflow.add_node("sam_decision", sam_decision.run)
-workflow.add_node("taylor", taylor.run)
-workflow.add_node("alex_summary", alex_summary.run)
-
-workflow.set_entry_node("alex")
-workflow.set_conditional("sam", lambda state: ["mira", "jordan"])
-workflow.set_conditional("mira", lambda state: ["sam_decision"])
-workflow.set_conditional("jordan", lambda state: ["sam_decision"])
-workflow.set_conditional("sam_decision", lambda state: ["taylor"])
-workflow.set_conditional("taylor", lambda state: ["alex_summary"])
-workflow.set_exit_node("alex_summary")
-
-graph = workflow.compile()
\ No newline at end of file
+"""The approval workflow graph.
+
+The graph is compiled on first access of main.graph (PEP 562 module
+__getattr__) and reused after that; its agents are registered by import
+path, so each agent module is imported on its node's first call.
+"""
+import threading
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def build_workflow():
+    from finops.graph import StateGraph
+
+    workflow = StateGraph()
+    for name in ("alex", "sam", "mira", "jordan", "sam_decision", "taylor", "alex_summary"):
+        workflow.add_node(name, f"agents.{name}:run", f"agents.{name}:arun")
+
+    workflow.set_entry_node("alex")
+    workflow.set_conditional("alex", lambda state: ["sam"])
+    workflow.set_conditional("sam", lambda state: ["mira", "jordan"])
+    workflow.set_conditional("mira", lambda state: ["sam_decision"])
+    workflow.set_conditional("jordan", lambda state: ["sam_decision"])
+    workflow.set_conditional("sam_decision", lambda state: ["taylor"])
+    workflow.set_conditional("taylor", lambda state: ["alex_summary"])
+    workflow.set_exit_node("alex_summary")
+    return workflow
+
+
+def __getattr__(name):
+    global _graph
+    if name != "graph":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                from finops.audit import get_audit_log
+                from finops.checkpoint import get_checkpointer
+                from finops.decision_cache import CachedGraph
+
+                _graph = CachedGraph(build_workflow().compile(checkpointer=get_checkpointer(), audit=get_audit_log()))
+    return _graph
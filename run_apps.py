@@ -1,3 +1,4 @@
+import argparse
 import os
 import uvicorn
 from langgraph_server import app
@@ -7,5 +8,21 @@ def run_server():
     port = int(os.environ.get("PORT", 8000))
     uvicorn.run(app, host="0.0.0.0", port=port)
 
+def run_production(workers, pin_cores=True):
+    """Run pre-forked workers sharing state built once in this process"""
+    from finops.server import serve
+    port = int(os.environ.get("PORT", 8000))
+    serve(app, host="0.0.0.0", port=port, workers=workers, pin_cores=pin_cores, log_level="warning")
+
 if __name__ == "__main__":
-    run_server()
+    parser = argparse.ArgumentParser(description="Run the FinOps approval workflow server")
+    parser.add_argument(
+        "--workers", type=int, default=int(os.environ.get("FINOPS_WORKERS", 1)),
+        help="worker processes; more than 1 starts the pre-forking production server",
+    )
+    parser.add_argument("--no-pin", action="store_true", help="do not pin workers to CPU cores")
+    args = parser.parse_args()
+    if args.workers > 1:
+        run_production(args.workers, pin_cores=not args.no_pin)
+    else:
+        run_server()
@@ -5,6 +5,7 @@ import json
 import time
 import os
 from dotenv import load_dotenv
+from finops.client import FinOpsClient, api_base_url
 
 # Load environment variables
 load_dotenv()
@@ -133,27 +134,29 @@ def add_log(persona, message):
         "message": message
     })
 
-# Function to load sample data
-@st.cache_data
-def load_data():
-    try:
-        df = pd.read_csv("data.csv")
-        return df
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        # Create a simple sample dataframe if file is not found
-        data = {
-            "Project_ID": ["P0001", "P0002", "P0003"],
-            "PO_Requested": [5000, 15000, 8000],
-            "Cost_Center": ["IT-001", "HR-002", "FIN-003"],
-            "Supplier": ["VendorX", "VendorY", "VendorZ"],
-            "Budget_Remaining": [10000, 5000, 20000],
-            "Variance": [0.05, 0.15, 0.02]
-        }
-        return pd.DataFrame(data)
+# The ledger stays on the server: the app pages through project lists and
+# reads pre-aggregated views from the API. Responses are cached across all
+# sessions for a short time, so concurrent users share each request.
+PAGE_SIZE = 50
+
+# One pooled keep-alive client per API, shared by every session
+@st.cache_resource
+def get_client(api_base):
+    return FinOpsClient(api_base)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_projects(api_base, prefix, cost_center, after):
+    return get_client(api_base).projects(prefix, cost_center, after, PAGE_SIZE)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def fetch_approval_rates(api_base, dimension):
+    return get_client(api_base).approval_rates(dimension)
 
-# Load data
-df = load_data()
+# Budget and compliance outcome of one project, from the vectorized batch
+# endpoint (which places no budget reservation)
+@st.cache_data(ttl=10, show_spinner=False)
+def evaluate_project(api_base, project_id):
+    return get_client(api_base).batch([project_id])[0]
 
 # App title and description
 st.title("🏢 FinOps Approval Workflow")
@@ -173,17 +176,49 @@ with st.sidebar:
         help="URL of the deployed LangGraph workflow API"
     )
     
-    # Project selection
+    api_base = api_base_url(api_url)
+    
+    # Project search and selection, one page of projects at a time
+    search = st.text_input("Search Projects", value="", help="Project ID prefix, e.g. CUST-01").strip()
+    try:
+        cost_centers = sorted(fetch_approval_rates(api_base, "cost_center")["groups"])
+    except requests.RequestException as e:
+        st.error(f"Cannot reach the API at {api_base}: {e}")
+        st.stop()
+    cost_center_filter = st.selectbox("Cost Center", options=["All"] + cost_centers)
+    cost_center_filter = None if cost_center_filter == "All" else cost_center_filter
+    
+    # Cursors of the pages visited so far; a new search starts over
+    if st.session_state.get("project_filter") != (search, cost_center_filter):
+        st.session_state.project_filter = (search, cost_center_filter)
+        st.session_state.page_cursors = [None]
+    try:
+        page = fetch_projects(api_base, search, cost_center_filter, st.session_state.page_cursors[-1])
+    except requests.RequestException as e:
+        st.error(f"Error loading projects: {e}")
+        st.stop()
+    projects = {item["Project_ID"]: item for item in page["items"]}
+    
+    prev_col, next_col = st.columns(2)
+    if prev_col.button("◀ Previous", disabled=len(st.session_state.page_cursors) == 1, use_container_width=True):
+        st.session_state.page_cursors.pop()
+        st.rerun()
+    if next_col.button("Next ▶", disabled=page["next"] is None, use_container_width=True):
+        st.session_state.page_cursors.append(page["next"])
+        st.rerun()
+    
     selected_project = st.selectbox(
         "Select Project",
-        options=df["Project_ID"].tolist(),
-        index=0,
+        options=list(projects),
+        index=0 if projects else None,
         help="Select a project to process"
     )
+    if not projects:
+        st.info("No projects match the search.")
     
     # Display project details
-    if selected_project:
-        project_data = df[df["Project_ID"] == selected_project].iloc[0]
+    project_data = projects.get(selected_project)
+    if project_data is not None:
         st.subheader("Project Details")
         st.info(f"""
         **Project ID:** {project_data['Project_ID']}
@@ -197,7 +232,7 @@ with st.sidebar:
     st.subheader("Demo Controls")
     
     if st.session_state.workflow_stage == 0:
-        if st.button("Start Workflow", use_container_width=True):
+        if st.button("Start Workflow", use_container_width=True, disabled=project_data is None):
             st.session_state.workflow_stage = 1
             add_log("System", f"Starting workflow for project {selected_project}")
     else:
@@ -277,7 +312,6 @@ with col1:
         
         if st.session_state.workflow_stage >= 2:
             # Sam stage
-            project_data = df[df["Project_ID"] == selected_project].iloc[0]
             add_log("Sam", f"Retrieved data for project {selected_project}")
             add_log("Sam", f"PO Amount: ${project_data['PO_Requested']:,.2f}, Budget: ${project_data['Budget_Remaining']:,.2f}, Supplier: {project_data['Supplier']}")
             
@@ -291,9 +325,9 @@ with col1:
         
         if st.session_state.workflow_stage >= 3:
             # Mira and Jordan stage
-            project_data = df[df["Project_ID"] == selected_project].iloc[0]
-            budget_ok = project_data['PO_Requested'] <= project_data['Budget_Remaining']
-            compliance_ok = project_data['Supplier'] != "VendorY"
+            outcome = evaluate_project(api_base, selected_project)
+            budget_ok = outcome["budget_ok"]
+            compliance_ok = outcome["compliance_ok"]
             
             add_log("Mira", f"Budget check: {'✅ PASSED' if budget_ok else '❌ FAILED'}")
             add_log("Jordan", f"Compliance check: {'✅ PASSED' if compliance_ok else '❌ FAILED'}")
@@ -308,16 +342,9 @@ with col1:
         
         if st.session_state.workflow_stage >= 4:
             # Sam Decision stage
-            project_data = df[df["Project_ID"] == selected_project].iloc[0]
-            budget_ok = project_data['PO_Requested'] <= project_data['Budget_Remaining']
-            compliance_ok = project_data['Supplier'] != "VendorY"
-            approved = budget_ok and compliance_ok
-            
-            reason = ""
-            if not budget_ok:
-                reason = "Budget exceeded"
-            elif not compliance_ok:
-                reason = "Compliance issue with supplier"
+            outcome = evaluate_project(api_base, selected_project)
+            approved = outcome["approved"]
+            reason = outcome.get("reason", "")
                 
             st.session_state.api_response = {"approved": approved, "reason": reason}
             
@@ -333,7 +360,6 @@ with col1:
         
         if st.session_state.workflow_stage >= 5:
             # Taylor stage
-            project_data = df[df["Project_ID"] == selected_project].iloc[0]
             variance = project_data['Variance']
             
             add_log("Taylor", f"Variance analysis: {variance:.2%}")
@@ -374,6 +400,35 @@ with col2:
         </div>
         """, unsafe_allow_html=True)
 
+# Approval rates, aggregated on the server over the whole ledger
+st.header("Approval Rates")
+for tab, dimension in zip(st.tabs(["By Cost Center", "By Supplier"]), ["cost_center", "supplier"]):
+    with tab:
+        try:
+            rates = fetch_approval_rates(api_base, dimension)
+        except requests.RequestException as e:
+            st.error(f"Error loading approval rates: {e}")
+            continue
+        table = pd.DataFrame.from_dict(rates["groups"], orient="index").sort_values("approval_rate")
+        st.bar_chart(table["approval_rate"])
+        st.dataframe(table, use_container_width=True)
+        st.caption(f"As of {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(rates['as_of']))}")
+
+# Run the workflow for several projects at once; results are shown as they arrive
+st.header("Bulk Approvals")
+bulk_projects = st.multiselect("Projects to approve", options=list(projects), max_selections=50)
+if st.button("Run Approvals", disabled=not bulk_projects):
+    progress = st.progress(0.0, text="Submitting approvals...")
+    results = st.container()
+    for done, (project_id, state, error) in enumerate(get_client(api_base).invoke_many(bulk_projects), 1):
+        progress.progress(done / len(bulk_projects), text=f"{done} of {len(bulk_projects)} complete")
+        if error is not None:
+            results.error(f"{project_id}: {error}")
+        elif state.get("approved"):
+            results.success(f"{project_id}: ✅ Approved")
+        else:
+            results.warning(f"{project_id}: ❌ Rejected - {state.get('reason', 'Unknown reason')}")
+
 # Add a section for API integration
 st.header("API Integration")
 with st.expander("View API Request/Response"):
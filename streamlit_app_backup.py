@@ -5,6 +5,16 @@ import time
 import os
 from pathlib import Path
 import json
+from finops.client import FinOpsClient, api_base_url
+from finops.store import get_store
+
+# alex, sam, mira, jordan, sam_decision, taylor, alex_summary
+WORKFLOW_NODES = 7
+
+# One pooled keep-alive client per API, shared by every session
+@st.cache_resource
+def get_client(api_base):
+    return FinOpsClient(api_base)
 
 # Set page configuration
 st.set_page_config(
@@ -284,13 +294,12 @@ def add_log(persona, message):
         "message": message
     })
 
-# Load sample data
-@st.cache_data
+# Load sample data (shared memory-mapped ledger, reloaded when data.csv changes)
 def load_data():
     try:
         current_dir = Path(__file__).parent
         data_path = current_dir / 'data.csv'
-        return pd.read_csv(data_path)
+        return get_store(data_path).frame()
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return pd.DataFrame({"Project_ID": ["P0001"], "PO_Requested": [5000], "Cost_Center": ["IT"], 
@@ -387,18 +396,25 @@ with col1:
         st.session_state.workflow_stage = 1
         add_log("System", f"Starting approval workflow for project {selected_project}")
         
-        # Call the API to get real data
+        # Call the API and follow the per-node progress events as they arrive
         try:
-            with st.spinner("Processing approval workflow..."):
-                # Make API call to the backend
-                payload = {"project_id": selected_project}
-                response = requests.post(api_url, json=payload)
-                
-                if response.status_code == 200:
-                    st.session_state.api_response = response.json()
+            progress = st.progress(0.0, text="Processing approval workflow...")
+            completed_nodes = 0
+            for event, data in get_client(api_base_url(api_url)).events(selected_project):
+                if event == "node":
+                    completed_nodes += 1
+                    progress.progress(
+                        min(completed_nodes / WORKFLOW_NODES, 1.0),
+                        text=f"{data['node']} finished in {data['elapsed_ms']:.1f} ms",
+                    )
+                elif event == "end":
+                    progress.progress(1.0, text="Workflow complete")
+                    st.session_state.api_response = data["state"]
                     add_log("System", "API call successful")
-                else:
-                    add_log("System", f"API Error: {response.status_code} - {response.text}")
+                elif event == "error":
+                    add_log("System", f"API Error: {data['detail']}")
+        except requests.HTTPError as e:
+            add_log("System", f"API Error: {e.response.status_code} - {e.response.text}")
         except Exception as e:
             add_log("System", f"Error connecting to API: {str(e)}")
     
@@ -0,0 +1,70 @@
+"""Fixtures pointing every store, ledger and log at a scratch copy of the sample data.
+
+The finops getters share one instance per resolved path, so a fresh
+directory per test gets fresh ledgers, engines, budget ledgers,
+checkpointers and audit logs without resetting any module state.
+"""
+import json
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """tmp_path with data.csv and compliance_rules.json, configured as the default tenant's."""
+    shutil.copy(REPO_ROOT / "data.csv", tmp_path / "data.csv")
+    shutil.copy(REPO_ROOT / "compliance_rules.json", tmp_path / "compliance_rules.json")
+    monkeypatch.setenv("FINOPS_DATA_SOURCE", "csv")
+    monkeypatch.setenv("FINOPS_DATA_PATH", str(tmp_path / "data.csv"))
+    monkeypatch.setenv("FINOPS_RULES_PATH", str(tmp_path / "compliance_rules.json"))
+    monkeypatch.setenv("FINOPS_BUDGET_DB", str(tmp_path / "budget.sqlite3"))
+    monkeypatch.setenv("FINOPS_CHECKPOINT_DB", str(tmp_path / "checkpoints.sqlite3"))
+    monkeypatch.setenv("FINOPS_AUDIT_DIR", str(tmp_path / "audit"))
+    monkeypatch.delenv("FINOPS_BUDGET_SHARED", raising=False)
+    monkeypatch.delenv("FINOPS_TENANTS", raising=False)
+
+    import main
+
+    # Compile the graph again, against this test's checkpointer and audit log
+    monkeypatch.setattr(main, "_graph", None)
+    return tmp_path
+
+
+@pytest.fixture
+def tenant_dirs(workdir, monkeypatch):
+    """Two tenants, emea and apac, each with its own copy of the ledger.
+
+    emea's ledger renames every project CUST-* to EMEA-*, and its rules
+    also block Venom.
+    """
+    text = (workdir / "data.csv").read_text()
+    rules = json.loads((workdir / "compliance_rules.json").read_text())
+    spec = {}
+    for name, ledger, blocked in (("emea", text.replace("CUST-", "EMEA-"), ["Venom"]), ("apac", text, [])):
+        (workdir / name).mkdir()
+        (workdir / name / "data.csv").write_text(ledger)
+        (workdir / name / "rules.json").write_text(json.dumps({**rules, "blocklist": rules["blocklist"] + blocked}))
+        spec[name] = {"data_path": f"{name}/data.csv", "rules_path": f"{name}/rules.json"}
+    (workdir / "tenants.json").write_text(json.dumps(spec))
+    monkeypatch.setenv("FINOPS_TENANTS", str(workdir / "tenants.json"))
+    return workdir
+
+
+@pytest.fixture
+def write_rules():
+    """write_rules(path, **rules) rewrites a rules file atomically, the way an editor should."""
+    return _write_rules
+
+
+def _write_rules(path, **rules):
+    spec = {"blocklist": [], "allowlist": [], "cost_center_restrictions": {},
+            "blocked_amount_ranges": [], "honor_compliance_flag": False, **rules}
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(spec))
+    tmp.replace(path)
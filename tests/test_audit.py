@@ -0,0 +1,51 @@
+import sqlite3
+import subprocess
+import sys
+import time
+
+import orjson
+
+from finops.audit import INDEX_NAME, AuditLog
+
+
+def decision(project_id, approved=True):
+    return {"project_id": project_id, "approved": approved, "budget_ok": approved, "compliance_ok": True}
+
+
+def test_records_survive_a_restart_and_are_queried_by_project_and_time(tmp_path):
+    log = AuditLog(tmp_path)
+    log.record(decision("CUST-0001"))
+    log.record(decision("CUST-0002", approved=False))
+    assert log.flush()
+    time.sleep(0.01)
+    middle = time.time()
+    log.record(decision("CUST-0001", approved=False))
+    assert log.flush()
+
+    restarted = AuditLog(tmp_path)
+    assert [r["approved"] for r in restarted.query(project_id="CUST-0001")] == [True, False]
+    assert [r["project_id"] for r in restarted.query(until=middle)] == ["CUST-0001", "CUST-0002"]
+    assert [(r["project_id"], r["approved"]) for r in restarted.query(since=middle)] == [("CUST-0001", False)]
+    assert len(restarted.query(limit=2)) == 2
+
+
+def test_records_a_dead_process_wrote_but_did_not_index_are_recovered(tmp_path):
+    log = AuditLog(tmp_path)
+    log.record(decision("CUST-0001"))
+    assert log.flush()
+
+    # A worker that crashed between its fsync and its index commit
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    name = f"0000000000000-{dead.pid}-0000.ndjson"
+    lines = [{"ts": time.time(), "cache_hit": False, **decision(f"CUST-000{i}")} for i in (2, 3)]
+    (tmp_path / name).write_bytes(b"".join(orjson.dumps(line) + b"\n" for line in lines) + b'{"torn')
+    conn = sqlite3.connect(tmp_path / INDEX_NAME)
+    with conn:
+        conn.execute("INSERT INTO segments (name, pid, created_at) VALUES (?, ?, ?)", (name, dead.pid, time.time()))
+    conn.close()
+
+    restarted = AuditLog(tmp_path)
+    restarted.record(decision("CUST-0004"))
+    assert restarted.flush()
+    assert [r["project_id"] for r in restarted.query()] == ["CUST-0001", "CUST-0002", "CUST-0003", "CUST-0004"]
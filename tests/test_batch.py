@@ -0,0 +1,21 @@
+from finops.batch import run_batch
+
+
+def test_batch_matches_the_graph_across_the_sample_ledger(workdir, write_rules):
+    import main
+
+    # Rules that reject on every check, so each branch is compared
+    write_rules(
+        workdir / "compliance_rules.json",
+        blocklist=["Venom"], cost_center_restrictions={"HR": ["Anthrax"]},
+        blocked_amount_ranges=[{"supplier": "Saxon", "min": 40_000, "max": None}], honor_compliance_flag=True,
+    )
+    batch = run_batch()
+    assert len(batch) > 1000
+    outcomes = set()
+    for expected in batch:
+        state = main.graph.invoke({"project_id": expected["project_id"]})
+        shared = expected.keys() & state.keys()
+        assert {key: state[key] for key in shared} == {key: expected[key] for key in shared}
+        outcomes.add((state["budget_ok"], state["compliance_ok"]))
+    assert outcomes == {(True, True), (True, False), (False, True), (False, False)}
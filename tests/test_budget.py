@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+from finops.budget import BudgetLedger, SharedBudgetLedger
+
+
+@pytest.fixture(params=[BudgetLedger, SharedBudgetLedger])
+def ledger(request, tmp_path):
+    return request.param(tmp_path / "budget.sqlite3")
+
+
+def test_concurrent_reservations_never_overspend(ledger):
+    threads = 32
+    barrier = threading.Barrier(threads)
+    granted = []
+
+    def reserve(i):
+        barrier.wait()
+        if ledger.reserve("CUST-0001", f"po-{i}", 10, budget_remaining=100):
+            granted.append(i)
+
+    workers = [threading.Thread(target=reserve, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert len(granted) == 10
+    assert ledger.reserved_by_others("CUST-0001", "nobody") == 100
+
+
+def test_reserving_the_same_po_again_does_not_consume_budget_twice(ledger):
+    assert ledger.reserve("CUST-0001", "po-1", 60, budget_remaining=100)
+    assert ledger.reserve("CUST-0001", "po-1", 60, budget_remaining=100)
+    assert not ledger.reserve("CUST-0001", "po-2", 60, budget_remaining=100)
+    assert ledger.release("po-1")
+    assert ledger.reserve("CUST-0001", "po-2", 60, budget_remaining=100)
+
+
+def test_reservations_survive_a_restart(tmp_path):
+    ledger = BudgetLedger(tmp_path / "budget.sqlite3")
+    ledger.reserve("CUST-0001", "po-1", 30, budget_remaining=100)
+    ledger.reserve("CUST-0002", "po-2", 40, budget_remaining=100)
+    ledger.release("po-2")
+    assert ledger.flush()
+
+    restarted = BudgetLedger(tmp_path / "budget.sqlite3")
+    assert restarted.reserved_by_others_many(["CUST-0001", "CUST-0002"], ["x", "x"]) == [30, 0]
+    assert not restarted.reserve("CUST-0001", "po-3", 80, budget_remaining=100)
@@ -0,0 +1,58 @@
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client(workdir):
+    import langgraph_server
+
+    with TestClient(langgraph_server.app) as client:
+        yield client
+
+
+def test_invoke_returns_the_checkpointed_run_id_and_409_on_a_reused_one(client):
+    response = client.post("/finops-workflow/invoke", json={"input": {"project_id": "CUST-0001", "run_id": "r1"}})
+    assert response.status_code == 200, response.text
+    assert response.json()["metadata"]["run_id"] == "r1"
+
+    reused = client.post("/finops-workflow/invoke", json={"input": {"project_id": "CUST-0002", "run_id": "r1"}})
+    assert reused.status_code == 409
+    assert "r1" in reused.json()["detail"]
+
+    unnamed = client.post("/finops-workflow/invoke", json={"input": {"project_id": "CUST-0001"}})
+    assert unnamed.json()["metadata"]["run_id"] is None
+
+
+def test_a_run_resumes_after_its_last_completed_node(workdir):
+    import main
+    from finops.checkpoint import Checkpointer
+
+    calls = []
+
+    def compiled(fail_at=None):
+        # A fresh checkpointer per graph, as after a restart
+        graph = main.build_workflow().compile(checkpointer=Checkpointer(workdir / "checkpoints.sqlite3"))
+        for name in list(graph.nodes):
+            node = graph._node(name)
+
+            def counted(*args, name=name, node=node):
+                calls.append(name)
+                if name == fail_at:
+                    raise RuntimeError(f"{name} crashed")
+                return node(*args)
+            graph.nodes[name] = counted
+        return graph
+
+    input = {"project_id": "CUST-0002", "run_id": "month-end"}
+    crashing = compiled(fail_at="taylor")
+    with pytest.raises(RuntimeError):
+        crashing.run(input)
+    assert crashing.checkpointer.flush()
+    assert "sam_decision" in calls
+
+    calls.clear()
+    resumed = compiled().run(input).state
+    assert calls == ["taylor", "alex_summary"]
+
+    uninterrupted = main.build_workflow().compile().run({"project_id": "CUST-0002"}).state
+    assert {**resumed, "run_id": None} == {**uninterrupted, "run_id": None}
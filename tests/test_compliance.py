@@ -0,0 +1,22 @@
+import time
+
+from finops.compliance import get_engine
+
+
+def test_invalid_rules_file_keeps_the_previous_rules(workdir, write_rules):
+    rules_path = workdir / "compliance_rules.json"
+    write_rules(rules_path, blocklist=["Venom"])
+    engine = get_engine()
+    assert engine.check("CUST-0001", "HR", "Venom", 1) is False
+
+    # A half-written file: still the previous rules, not an exception
+    time.sleep(0.01)
+    rules_path.write_text('{"blocklist": ["Anthrax"')
+    assert engine.check("CUST-0001", "HR", "Venom", 1) is False
+    assert engine.check("CUST-0001", "HR", "Anthrax", 1) is True
+
+    # Once the write completes, the new rules apply
+    time.sleep(0.01)
+    write_rules(rules_path, blocklist=["Anthrax"])
+    assert engine.check("CUST-0001", "HR", "Venom", 1) is True
+    assert engine.check("CUST-0001", "HR", "Anthrax", 1) is False
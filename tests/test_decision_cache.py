@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+INPUT = {"project_id": "CUST-0002"}
+
+
+@pytest.fixture
+def graph(workdir):
+    import main
+
+    return main.graph
+
+
+def run(graph):
+    state = graph.invoke(dict(INPUT))
+    return state["run_metadata"]["cache_hit"], state["approved"]
+
+
+def test_repeated_decisions_are_served_from_the_cache(graph):
+    assert run(graph) == (False, True)
+    assert run(graph) == (True, True)
+
+
+def test_a_ledger_append_invalidates_cached_decisions(graph):
+    from finops.sources import get_source
+
+    run(graph)
+    row = get_source().get("CUST-0002")
+    get_source().append([{**row, "Project_ID": "CUST-9999"}])
+    assert run(graph) == (False, True)
+    assert run(graph) == (True, True)
+
+
+def test_a_rules_change_invalidates_cached_decisions(graph, workdir, write_rules):
+    run(graph)
+    time.sleep(0.01)
+    write_rules(workdir / "compliance_rules.json", blocklist=["Anthrax"])
+    assert run(graph) == (False, False)
+
+
+def test_a_budget_change_invalidates_cached_decisions(graph):
+    from finops.budget import get_budget_ledger
+
+    run(graph)
+    # Another PO takes most of the budget this run reserved
+    ledger = get_budget_ledger()
+    assert ledger.release("CUST-0002")
+    assert ledger.reserve("CUST-0002", "another-po", 10_000, budget_remaining=14_241)
+    assert run(graph) == (False, False)
+
+
+def test_another_process_writing_a_sqlite_ledger_invalidates_cached_decisions(workdir, monkeypatch):
+    import sqlite3
+
+    import main
+    from finops.sources import COLUMNS, UPSERT_SQL, build_sqlite, get_source
+
+    build_sqlite(workdir / "data.csv", workdir / "ledger.sqlite3")
+    monkeypatch.setenv("FINOPS_DATA_SOURCE", "sqlite")
+    monkeypatch.setenv("FINOPS_SQLITE_PATH", str(workdir / "ledger.sqlite3"))
+    graph = main.graph
+    run(graph)
+    assert run(graph) == (True, True)
+    row = get_source().get("CUST-0002")
+
+    # A new project changes taylor's analytics for everyone, not CUST-0002's row
+    conn = sqlite3.connect(workdir / "ledger.sqlite3")
+    with conn:
+        conn.execute(UPSERT_SQL, [row[name] if name != "Project_ID" else "CUST-9999" for name in COLUMNS])
+    conn.close()
+    assert run(graph) == (False, True)
@@ -0,0 +1,27 @@
+import sqlite3
+
+from finops.sources import COLUMNS, UPSERT_SQL, SqliteSource, build_sqlite
+from finops.store import get_store
+
+
+def test_sqlite_select_without_filters_returns_every_row(workdir):
+    build_sqlite(workdir / "data.csv", workdir / "ledger.sqlite3")
+    source = SqliteSource(workdir / "ledger.sqlite3")
+    assert sorted(source.select().index) == sorted(get_store().frame().index)
+
+
+def test_sqlite_reads_notice_writes_by_other_connections(workdir):
+    build_sqlite(workdir / "data.csv", workdir / "ledger.sqlite3")
+    source = SqliteSource(workdir / "ledger.sqlite3")
+    row = source.get("CUST-0001")
+    signature, version = source.signature, source.version
+
+    # Another process's writer, bypassing source.append()
+    conn = sqlite3.connect(workdir / "ledger.sqlite3")
+    with conn:
+        conn.execute(UPSERT_SQL, [row[name] if name != "Actuals_Amount" else row[name] + 1 for name in COLUMNS])
+    conn.close()
+
+    assert source.get("CUST-0001")["Actuals_Amount"] == row["Actuals_Amount"] + 1
+    assert source.signature != signature
+    assert source.version == version + 1
@@ -0,0 +1,81 @@
+import pytest
+from fastapi.testclient import TestClient
+
+TENANT = "X-FinOps-Tenant"
+
+
+@pytest.fixture
+def client(tenant_dirs):
+    import langgraph_server
+
+    with TestClient(langgraph_server.app) as client:
+        yield client
+
+
+def invoke(client, project_id, headers=None):
+    response = client.post("/finops-workflow/invoke", json={"input": {"project_id": project_id}}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["output"]
+
+
+def audit(client, headers=None):
+    from finops.audit import get_audit_log
+
+    get_audit_log().flush()
+    response = client.get("/audit", params={"limit": 1000}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["records"]
+
+
+def test_audit_log_only_returns_the_requesting_tenants_decisions(client):
+    invoke(client, "CUST-0002")
+    invoke(client, "EMEA-0001", headers={TENANT: "emea"})
+    invoke(client, "CUST-0003", headers={TENANT: "apac"})
+
+    assert [r["project_id"] for r in audit(client)] == ["CUST-0002"]
+    emea = audit(client, headers={TENANT: "emea"})
+    assert [(r["project_id"], r["tenant"]) for r in emea] == [("EMEA-0001", "emea")]
+    assert [r["project_id"] for r in audit(client, headers={TENANT: "apac"})] == ["CUST-0003"]
+
+
+@pytest.mark.parametrize("route, body", [
+    ("/finops-workflow/batch", {"cost_center": "HR"}),
+    ("/finops-workflow/whatif", {"scenarios": [{"name": "none"}], "cost_center": "HR"}),
+])
+def test_bulk_routes_take_the_tenant_from_the_configurable_block(client, route, body):
+    configured = client.post(route, json={**body, "config": {"configurable": {"tenant": "emea"}}})
+    by_header = client.post(route, json=body, headers={TENANT: "emea"})
+    default = client.post(route, json=body)
+    assert configured.status_code == by_header.status_code == default.status_code == 200, configured.text
+    assert configured.json() == by_header.json() != default.json()
+    if route.endswith("batch"):
+        assert {state["project_id"][:5] for state in configured.json()["output"]} == {"EMEA-"}
+
+    unknown = client.post(route, json={**body, "config": {"configurable": {"tenant": "nowhere"}}})
+    assert unknown.status_code == 404
+
+
+def test_decisions_budgets_and_runs_are_not_shared_between_tenants(client, tenant_dirs, write_rules):
+    # apac's ledger has the same project IDs as the default tenant's
+    write_rules(tenant_dirs / "apac" / "rules.json", blocklist=["Anthrax"])
+    default = invoke(client, "CUST-0002")
+    assert default["approved"] is True
+    assert invoke(client, "CUST-0002")["run_metadata"]["cache_hit"] is True
+
+    apac = invoke(client, "CUST-0002", headers={TENANT: "apac"})
+    assert apac["run_metadata"]["cache_hit"] is False
+    assert (apac["compliance_ok"], apac["approved"]) == (False, False)
+
+    # The default tenant's reservation does not count against apac's budget
+    from finops import tenants
+    from finops.budget import get_budget_ledger
+
+    with tenants.use(tenants.from_config({"configurable": {"tenant": "apac"}})):
+        assert get_budget_ledger().reserved_by_others("CUST-0002", "another-po") == 0
+    assert get_budget_ledger().reserved_by_others("CUST-0002", "another-po") == default["po_amount"]
+
+    # A run_id is per tenant, so reusing one with another input is no conflict
+    for headers, project_id in ((None, "CUST-0002"), ({TENANT: "apac"}, "CUST-0003")):
+        response = client.post("/finops-workflow/invoke", headers=headers,
+                               json={"input": {"project_id": project_id, "run_id": "month-end"}})
+        assert response.status_code == 200, response.text